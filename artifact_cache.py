@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Content-addressed local artifact store shared by all pipeline stages.
+
+Artifacts (converted sections, the generated ``main.tex``, image derivatives,
+figure PDFs, ``.aux``/``.bbl`` files, ...) are stored under a key derived from
+the stage name, the content of the stage's inputs and the version of the tool
+that produced them. The store is a plain directory, so it can live on a
+shared filesystem: a teammate who has already built the same inputs makes
+the next build on a fresh checkout nearly instant.
+
+Layout::
+
+    <root>/objects/ab/abcdef...   file contents, named by their SHA-256
+    <root>/entries/12/1234...     JSON manifest: {relative name: object digest}
+    <root>/stats.jsonl            hit/miss counters appended by each process
+
+All writes go through a temporary file and an atomic rename, so concurrent
+builds never observe partial artifacts. When the objects exceed the size cap
+the least recently used ones are evicted (use updates the file mtime, which
+unlike atime also works on ``noatime`` mounts).
+
+Configuration (environment):
+    ARTIFACT_CACHE_DIR      store location (default: .artifact_cache)
+    ARTIFACT_CACHE_MAX_MB   size cap in MiB (default: 1024)
+    ARTIFACT_CACHE_DISABLE  set to 1 to bypass the store entirely
+
+Usage:
+    python3 artifact_cache.py stats | evict | clear
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger('md2latex.cache')
+
+DEFAULT_CACHE_DIR = '.artifact_cache'
+DEFAULT_MAX_MB = 1024
+# Eviction trims the store to this fraction of the cap to avoid thrashing
+EVICT_TARGET = 0.9
+
+InputPart = Union[str, bytes, Path]
+
+_tool_versions: Dict[str, str] = {}
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """Return the SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_version(*paths: Union[str, Path]) -> str:
+    """
+    Version string for Python stages: a digest of their source files.
+
+    Any edit to the converter changes the version and therefore every key
+    produced with it.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            digest.update(Path(path).read_bytes())
+        except OSError:
+            digest.update(str(path).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def tool_version(executable: str) -> str:
+    """
+    Version string for external tools: the first line of ``<tool> --version``.
+
+    Results are memoised per process; a missing tool yields ``"unavailable"``.
+    """
+    if executable not in _tool_versions:
+        try:
+            result = subprocess.run([executable, '--version'], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, timeout=10)
+            first_line = result.stdout.strip().splitlines()[:1]
+            _tool_versions[executable] = first_line[0] if first_line else 'unknown'
+        except (OSError, subprocess.SubprocessError):
+            _tool_versions[executable] = 'unavailable'
+    return _tool_versions[executable]
+
+
+def _tmp_suffix() -> str:
+    # Unique per process and thread (build_dag runs tasks in executor threads)
+    return f"{os.getpid()}.{threading.get_ident()}.{time.monotonic_ns()}.tmp"
+
+
+class ArtifactCache:
+    """
+    A directory-backed, content-addressed artifact store with LRU eviction.
+
+    Args:
+        root: Store directory (default: ``$ARTIFACT_CACHE_DIR`` or ``.artifact_cache``)
+        max_bytes: Size cap for stored objects (default: ``$ARTIFACT_CACHE_MAX_MB`` MiB)
+        enabled: When False every lookup misses and nothing is written
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.root = Path(root or os.environ.get('ARTIFACT_CACHE_DIR') or DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('ARTIFACT_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        if enabled is None:
+            enabled = os.environ.get('ARTIFACT_CACHE_DISABLE', '') not in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0,
+                      'bytes_read': 0, 'bytes_written': 0}
+        self._size: Optional[int] = None
+
+    # Keys
+
+    @staticmethod
+    def key(stage: str, inputs: Iterable[InputPart], tool: str = '') -> str:
+        """
+        Build a cache key from a stage name, its inputs and a tool version.
+
+        Path inputs contribute their file contents (and name); str and bytes
+        inputs contribute themselves. Missing files contribute a marker so a
+        later appearance of the file changes the key.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{stage}\0{tool}\0".encode('utf-8'))
+        for part in inputs:
+            if isinstance(part, Path):
+                digest.update(f"path:{part.as_posix()}\0".encode('utf-8'))
+                try:
+                    digest.update(file_digest(part).encode('ascii'))
+                except OSError:
+                    digest.update(b'<missing>')
+            elif isinstance(part, bytes):
+                digest.update(b'bytes:' + _sha256(part).encode('ascii'))
+            else:
+                digest.update(b'str:' + _sha256(str(part).encode('utf-8')).encode('ascii'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    # Paths
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / 'objects' / digest[:2] / digest
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / 'entries' / key[:2] / f"{key}.json"
+
+    def _atomic_write(self, dest: Path, data: bytes) -> None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{_tmp_suffix()}")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, dest)
+
+    # Reading
+
+    def get_files(self, key: str, dest_root: Union[str, Path] = '.') -> Optional[List[Path]]:
+        """
+        Restore every file stored under ``key`` below ``dest_root``.
+
+        Returns:
+            The restored paths, or None on a miss (nothing is written then)
+        """
+        manifest = self._read_manifest(key)
+        if manifest is None:
+            return None
+        sources = {name: self._object_path(digest) for name, digest in manifest.items()}
+        if not all(p.exists() for p in sources.values()):
+            # An object was evicted; drop the dangling entry
+            self._entry_path(key).unlink(missing_ok=True)
+            return self._miss()
+        restored = []
+        for name, source in sources.items():
+            dest = Path(dest_root) / name
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_name(f".{dest.name}.{_tmp_suffix()}")
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, dest)
+            self._touch(source)
+            self.stats['bytes_read'] += source.stat().st_size
+            restored.append(dest)
+        self.stats['hits'] += 1
+        return restored
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Return the single blob stored under ``key``, or None on a miss."""
+        manifest = self._read_manifest(key)
+        if manifest is None:
+            return None
+        path = self._object_path(manifest.get('', ''))
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self._entry_path(key).unlink(missing_ok=True)
+            return self._miss()
+        self._touch(path)
+        self.stats['hits'] += 1
+        self.stats['bytes_read'] += len(data)
+        return data
+
+    def get_text(self, key: str) -> Optional[str]:
+        """Return the text stored under ``key``, or None on a miss."""
+        data = self.get_bytes(key)
+        return data.decode('utf-8') if data is not None else None
+
+    def _read_manifest(self, key: str) -> Optional[Dict[str, str]]:
+        if not self.enabled:
+            return self._miss()
+        entry = self._entry_path(key)
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return self._miss()
+        self._touch(entry)
+        return manifest
+
+    def _miss(self):
+        self.stats['misses'] += 1
+        return None
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    # Writing
+
+    def _store_object(self, data: bytes) -> str:
+        digest = _sha256(data)
+        path = self._object_path(digest)
+        if not path.exists():
+            self._atomic_write(path, data)
+            self.stats['bytes_written'] += len(data)
+            if self._size is not None:
+                self._size += len(data)
+        else:
+            self._touch(path)
+        return digest
+
+    def put_files(self, key: str, files: Dict[str, Union[str, Path]]) -> None:
+        """
+        Store several files under one key.
+
+        Args:
+            key: Cache key from :meth:`key`
+            files: Mapping of name (relative restore path) to source file
+        """
+        if not self.enabled:
+            return
+        try:
+            manifest = {name: self._store_object(Path(src).read_bytes()) for name, src in files.items()}
+            self._atomic_write(self._entry_path(key), json.dumps(manifest, sort_keys=True).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Could not write artifact {key[:12]}: {e}")
+            return
+        self.stats['writes'] += 1
+        self._maybe_evict()
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """Store a single blob under ``key``."""
+        if not self.enabled:
+            return
+        try:
+            manifest = {'': self._store_object(data)}
+            self._atomic_write(self._entry_path(key), json.dumps(manifest).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Could not write artifact {key[:12]}: {e}")
+            return
+        self.stats['writes'] += 1
+        self._maybe_evict()
+
+    def put_text(self, key: str, text: str) -> None:
+        """Store text under ``key``."""
+        self.put_bytes(key, text.encode('utf-8'))
+
+    # Eviction
+
+    def _objects(self) -> List[os.DirEntry]:
+        objects_dir = self.root / 'objects'
+        entries = []
+        if not objects_dir.exists():
+            return entries
+        for bucket in os.scandir(objects_dir):
+            if bucket.is_dir():
+                entries.extend(e for e in os.scandir(bucket.path) if e.is_file() and not e.name.startswith('.'))
+        return entries
+
+    def size(self) -> int:
+        """Total size in bytes of the stored objects."""
+        return sum(e.stat().st_size for e in self._objects())
+
+    def _maybe_evict(self) -> None:
+        if self._size is None:
+            self._size = self.size()
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove least recently used objects until the store fits the cap.
+
+        Returns:
+            Number of objects removed
+        """
+        cap = self.max_bytes if max_bytes is None else max_bytes
+        objects = sorted(self._objects(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in objects)
+        target = cap * EVICT_TARGET
+        removed = 0
+        for entry in objects:
+            if total <= target:
+                break
+            size = entry.stat().st_size
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._size = total
+        self.stats['evictions'] += removed
+        if removed:
+            logger.info(f"Evicted {removed} artifacts from {self.root}")
+        return removed
+
+    def clear(self) -> None:
+        """Delete everything in the store."""
+        shutil.rmtree(self.root, ignore_errors=True)
+        self._size = 0
+
+    # Statistics
+
+    def hit_rate(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        """One-line summary of this process's cache activity."""
+        s = self.stats
+        return (f"artifact cache: {s['hits']} hits, {s['misses']} misses "
+                f"({self.hit_rate():.0%}), {s['writes']} writes, {s['evictions']} evictions")
+
+    def flush_stats(self) -> None:
+        """Append this process's counters to ``stats.jsonl`` and reset them."""
+        if not self.enabled or not any(self.stats.values()):
+            return
+        record = dict(self.stats, time=time.time(), pid=os.getpid())
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / 'stats.jsonl', 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError:
+            return
+        for name in self.stats:
+            self.stats[name] = 0
+
+    def lifetime_stats(self) -> Dict[str, float]:
+        """Sum the counters recorded by every process that used this store."""
+        totals = {name: 0 for name in self.stats}
+        try:
+            with open(self.root / 'stats.jsonl', 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    for name in totals:
+                        totals[name] += record.get(name, 0)
+        except (OSError, ValueError):
+            pass
+        return totals
+
+
+_default_cache: Optional[ArtifactCache] = None
+
+
+def default_cache() -> ArtifactCache:
+    """Return the process-wide cache configured from the environment."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArtifactCache()
+    return _default_cache
+
+
+def main() -> int:
+    """Inspect or maintain the artifact store."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the local artifact cache')
+    parser.add_argument('action', choices=['stats', 'evict', 'clear'])
+    parser.add_argument('--dir', default=None, help='Store location (default: $ARTIFACT_CACHE_DIR)')
+    parser.add_argument('--max-mb', type=float, default=None, help='Size cap for evict')
+    args = parser.parse_args()
+
+    max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+    cache = ArtifactCache(args.dir, max_bytes=max_bytes)
+    if args.action == 'stats':
+        totals = cache.lifetime_stats()
+        lookups = totals['hits'] + totals['misses']
+        print(f"Store: {cache.root} ({cache.size() / 1024 / 1024:.1f} MiB of "
+              f"{cache.max_bytes / 1024 / 1024:.0f} MiB, {len(cache._objects())} objects)")
+        print(f"Hits: {totals['hits']}  Misses: {totals['misses']}  "
+              f"Hit rate: {totals['hits'] / lookups if lookups else 0:.0%}")
+        print(f"Writes: {totals['writes']}  Evictions: {totals['evictions']}")
+    elif args.action == 'evict':
+        print(f"Evicted {cache.evict()} objects")
+        cache.flush_stats()
+    else:
+        cache.clear()
+        print(f"Cleared {cache.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,33 @@
 import os
 import re
 import glob
+from functools import partial
+
+import artifact_cache
+import image_pipeline
+import listing_cache
+import section_chunks
+from build_metrics import metrics
+from prefilter import Prefilter
+from time_budget import BudgetExceeded, section_budget, time_budget
 
 # Paths
 MD_FILE = os.path.join("..", "wip", "experiments", "GASing_Arithmetic.md")
 SECTIONS_DIR = "sections"
 IMAGES_DIR = "images"
+# Column-width derivatives of large images (see image_pipeline.py)
+DERIVED_IMAGES_DIR = os.path.join(IMAGES_DIR, image_pipeline.DERIVED_SUBDIR)
+PREPROCESS_IMAGES = True
+# Code blocks pre-rendered once into cached fragments (see listing_cache.py)
+LISTINGS_DIR = os.path.join(SECTIONS_DIR, listing_cache.LISTINGS_SUBDIR)
+PRERENDER_LISTINGS = True
+
+# Converted sections are cached by Markdown content, referenced images and
+# the converter's own source (see artifact_cache.py)
+CONVERTER_VERSION = artifact_cache.source_version(__file__, image_pipeline.__file__, listing_cache.__file__)
 
-# Ensure images directory exists
-os.makedirs(IMAGES_DIR, exist_ok=True)
+# Fenced code blocks, with the language in group 1 and the code in group 2
+CODE_FENCE_PATTERN = r'```(?:([a-zA-Z]*))?\s*\n([\s\S]*?)```'
 
 # Helper: Convert a section title to a normalized filename
 def section_title_to_filename(title):
@@ -129,6 +148,16 @@ def find_image_file(image_name):
 
 def process_image_links(text):
     """Process standard Markdown image links: ![Label](image.png)"""
+    # Find all patterns like ![Label](image.png) with optional spaces
+    pattern = image_pipeline.IMAGE_LINK_PATTERN
+    
+    # Downscale every referenced image up front, in parallel, so the figure
+    # blocks below can point at the cached column-width derivatives
+    derivatives = {}
+    if PREPROCESS_IMAGES:
+        image_files = image_pipeline.referenced_images(text, find_image_file)
+        derivatives = image_pipeline.preprocess_images(image_files, DERIVED_IMAGES_DIR)
+    
     def replace_image(match):
         # Get the full match, label, and image path
         full_match = match.group(0)
@@ -145,6 +174,9 @@ def process_image_links(text):
             print(f"Warning: Image '{image_name}' not found in {IMAGES_DIR}")
             return full_match
             
+        # Embed the derivative when one was produced
+        image_file = derivatives.get(image_file, image_file)
+            
         try:
             # Get the relative path from the LaTeX output directory to the image
             output_dir = os.path.dirname(os.path.abspath('main.tex'))
@@ -187,8 +219,6 @@ def process_image_links(text):
             print(f"Error processing image {image_name}: {str(e)}")
             return full_match
     
-    # Find all patterns like ![Label](image.png) with optional spaces
-    pattern = r'!\s*\[([^\]]*)\]\s*\(\s*([^)\s]+)\s*\)'
     return re.sub(pattern, replace_image, text, flags=re.MULTILINE)
 
 
@@ -198,53 +228,53 @@ def strip_section_numbering(header_text):
     # followed by a space and the actual section title
     return re.sub(r'^(\d+(\.\d+)*)\s+(.+)$', r'\3', header_text)
 
+# Unicode mathematical symbols and their LaTeX equivalents (replaced inside $...$)
+UNICODE_MATH_SYMBOLS = {
+    'ℕ': '\\mathbb{N}',  # Natural numbers
+    'ℤ': '\\mathbb{Z}',  # Integers
+    'ℚ': '\\mathbb{Q}',  # Rational numbers
+    'ℝ': '\\mathbb{R}',  # Real numbers
+    'ℂ': '\\mathbb{C}',  # Complex numbers
+    '∈': '\\in',         # Element of
+    '∉': '\\notin',      # Not an element of
+    '∩': '\\cap',        # Intersection
+    '∪': '\\cup',        # Union
+    '⊆': '\\subseteq',   # Subset or equal
+    '⊂': '\\subset',     # Proper subset
+    '⊇': '\\supseteq',   # Superset or equal
+    '⊃': '\\supset',     # Proper superset
+    '∅': '\\emptyset',   # Empty set
+    '∀': '\\forall',     # For all
+    '∃': '\\exists',     # Exists
+    '∄': '\\nexists',    # Does not exist
+    '∞': '\\infty',      # Infinity
+    '≠': '\\neq',        # Not equal
+    '≤': '\\leq',        # Less than or equal
+    '≥': '\\geq',        # Greater than or equal
+    '≈': '\\approx',     # Approximately equal
+    '≡': '\\equiv',      # Equivalent
+    '∑': '\\sum',        # Summation
+    '∏': '\\prod',       # Product
+    '√': '\\sqrt',       # Square root
+    '∫': '\\int',        # Integral
+    '∂': '\\partial',    # Partial derivative
+    '∇': '\\nabla',      # Nabla/Del operator
+    '⊕': '\\oplus',      # Direct sum
+    '⊗': '\\otimes',     # Tensor product
+    '±': '\\pm',         # Plus-minus
+    '∓': '\\mp',         # Minus-plus
+    '→': '\\rightarrow', # Right arrow
+    '←': '\\leftarrow',  # Left arrow
+    '↔': '\\leftrightarrow', # Left-right arrow
+    '⇒': '\\Rightarrow', # Implies
+    '⇐': '\\Leftarrow',  # Is implied by
+    '⇔': '\\Leftrightarrow', # If and only if
+}
+
 def replace_unicode_math_symbols(text):
     """Replace Unicode mathematical symbols with their LaTeX equivalents"""
-    # Common mathematical symbols
-    math_symbols = {
-        'ℕ': '\\mathbb{N}',  # Natural numbers
-        'ℤ': '\\mathbb{Z}',  # Integers
-        'ℚ': '\\mathbb{Q}',  # Rational numbers
-        'ℝ': '\\mathbb{R}',  # Real numbers
-        'ℂ': '\\mathbb{C}',  # Complex numbers
-        '∈': '\\in',         # Element of
-        '∉': '\\notin',      # Not an element of
-        '∩': '\\cap',        # Intersection
-        '∪': '\\cup',        # Union
-        '⊆': '\\subseteq',   # Subset or equal
-        '⊂': '\\subset',     # Proper subset
-        '⊇': '\\supseteq',   # Superset or equal
-        '⊃': '\\supset',     # Proper superset
-        '∅': '\\emptyset',   # Empty set
-        '∀': '\\forall',     # For all
-        '∃': '\\exists',     # Exists
-        '∄': '\\nexists',    # Does not exist
-        '∞': '\\infty',      # Infinity
-        '≠': '\\neq',        # Not equal
-        '≤': '\\leq',        # Less than or equal
-        '≥': '\\geq',        # Greater than or equal
-        '≈': '\\approx',     # Approximately equal
-        '≡': '\\equiv',      # Equivalent
-        '∑': '\\sum',        # Summation
-        '∏': '\\prod',       # Product
-        '√': '\\sqrt',       # Square root
-        '∫': '\\int',        # Integral
-        '∂': '\\partial',    # Partial derivative
-        '∇': '\\nabla',      # Nabla/Del operator
-        '⊕': '\\oplus',      # Direct sum
-        '⊗': '\\otimes',     # Tensor product
-        '±': '\\pm',         # Plus-minus
-        '∓': '\\mp',         # Minus-plus
-        '→': '\\rightarrow', # Right arrow
-        '←': '\\leftarrow',  # Left arrow
-        '↔': '\\leftrightarrow', # Left-right arrow
-        '⇒': '\\Rightarrow', # Implies
-        '⇐': '\\Leftarrow',  # Is implied by
-        '⇔': '\\Leftrightarrow', # If and only if
-    }
-    
     # Replace each Unicode symbol with its LaTeX equivalent
-    for symbol, replacement in math_symbols.items():
+    for symbol, replacement in UNICODE_MATH_SYMBOLS.items():
         # Only replace within math environments (between $ signs)
         parts = re.split(r'(\$[^\$]*\$)', text)
         for i in range(1, len(parts), 2):  # Only check math parts
@@ -254,22 +284,46 @@ def replace_unicode_math_symbols(text):
     
     return text
 
+# Passes of md_to_latex and the literals they cannot change a text without
+# (see prefilter.py); the brace cleanup also fixes the headers' output
+PREFILTER = Prefilter('md_to_latex', {
+    'clean_headers': ('#',),
+    'image_links': ('!',),
+    'unicode_math': tuple(UNICODE_MATH_SYMBOLS),
+    'underscores': ('_',),
+    'headers': ('#',),
+    'section_braces': ('#', '}', '\\section{', '\\subsection{', '\\subsubsection{'),
+    'bold_italics': ('[[',),
+    'dash_bullets': ('-',),
+    'labeled_bullets': ('*',),
+    'regular_bullets': ('*',),
+    'simple_bullets': ('*',),
+    'emphasis': ('*',),
+    'mcfile': ('<mcfile',),
+    'inline_code': ('`',),
+})
+
 def md_to_latex(md):
+    present = PREFILTER.scan(md)
+    
     # Preprocessing: Clean up all header-related patterns
-    md = clean_header_lines(md)
+    if PREFILTER.wants('clean_headers', present):
+        md = clean_header_lines(md)
     
     # Handle images (with proper handling for positioning and caption text)
-    md = process_image_links(md)
+    if PREFILTER.wants('image_links', present):
+        md = process_image_links(md)
     
     # Replace Unicode math symbols with LaTeX equivalents
-    md = replace_unicode_math_symbols(md)
+    if PREFILTER.wants('unicode_math', present):
+        md = replace_unicode_math_symbols(md)
     
     # Split into code and non-code segments
     segments = []
     last_end = 0
     
     # Extract code blocks with language info
-    for match in re.finditer(r'```(?:([a-zA-Z]*))?\s*\n([\s\S]*?)```', md):
+    for match in re.finditer(CODE_FENCE_PATTERN, md):
         # Non-code segment before this code block
         if match.start() > last_end:
             segments.append(('text', md[last_end:match.start()]))
@@ -329,67 +383,80 @@ def md_to_latex(md):
             else:
                 caption_text = ""
                 
-            # Use exact format from appendix.tex that we know works in LaTeX
-            tex_code = f"\\begin{{lstlisting}}[language={listings_lang}{caption_text}]\n{seg.rstrip()}\n\\end{{lstlisting}}"
+            # Highlighted once and input from the listing cache; the
+            # lstlisting environment remains the fallback
+            tex_code = None
+            if PRERENDER_LISTINGS:
+                tex_code = listing_cache.render_listing(
+                    seg, listings_lang, escaped_caption if caption else '', LISTINGS_DIR, LISTINGS_DIR)
+            if tex_code is None:
+                # Use exact format from appendix.tex that we know works in LaTeX
+                tex_code = f"\\begin{{lstlisting}}[language={listings_lang}{caption_text}]\n{seg.rstrip()}\n\\end{{lstlisting}}"
             latex_parts.append(tex_code)
         else:
             # Get the text content
             seg = item[1]
+            present = PREFILTER.scan(seg)
             
             # Escape underscores outside code blocks
-            seg = re.sub(r'(?<!\\)_', r'\\_', seg)
+            if PREFILTER.wants('underscores', present):
+                seg = re.sub(r'(?<!\\)_', r'\\_', seg)
             # Convert headers to LaTeX section commands
             # Use a consistent approach for all header levels with defensive programming
             
-            # First normalize any headers that might have unusual patterns
-            seg = clean_header_lines(seg)
-            
-            # Now convert using the normalized headers
-            # Order matters! Process deeper header levels first (###) before shallower ones (#)
-            # Also strip section numbering
-            seg = re.sub(r'^\s*#{3,}\s+(.+)$', 
-                      lambda m: '\\paragraph{' + strip_section_numbering(m.group(1)) + '}', 
-                      seg, flags=re.MULTILINE)  # ### or more (now paragraph with no numbering)
-            seg = re.sub(r'^\s*#{2}\s+(.+)$', 
-                      lambda m: '\\subsection{' + strip_section_numbering(m.group(1)) + '}', 
-                      seg, flags=re.MULTILINE)  # ##
-            seg = re.sub(r'^\s*#{1}\s+(.+)$', 
-                      lambda m: '\\section{' + strip_section_numbering(m.group(1)) + '}', 
-                      seg, flags=re.MULTILINE)  # #
-            
-            # For any headers that might have been missed with unusual patterns
-            # (defensive approach for anything remaining)
-            seg = re.sub(r'^\s*\\*#+\s+(.+)$', 
-                        lambda m: '\\' + ('sub' * min(2, m.group(0).count('#')-1)) + 'section{' + 
-                                strip_section_numbering(m.group(1).strip()) + '}', 
-                        seg, flags=re.MULTILINE)
-            
-            # 3. Escape any stray # at the start of a line (not already converted)
-            seg = re.sub(r'^(?P<pre>[^\\].*?)#', lambda m: m.group('pre') + r'\#', seg, flags=re.MULTILINE)
+            if PREFILTER.wants('headers', present):
+                # First normalize any headers that might have unusual patterns
+                seg = clean_header_lines(seg)
+            
+                # Now convert using the normalized headers
+                # Order matters! Process deeper header levels first (###) before shallower ones (#)
+                # Also strip section numbering
+                seg = re.sub(r'^\s*#{3,}\s+(.+)$', 
+                          lambda m: '\\paragraph{' + strip_section_numbering(m.group(1)) + '}', 
+                          seg, flags=re.MULTILINE)  # ### or more (now paragraph with no numbering)
+                seg = re.sub(r'^\s*#{2}\s+(.+)$', 
+                          lambda m: '\\subsection{' + strip_section_numbering(m.group(1)) + '}', 
+                          seg, flags=re.MULTILINE)  # ##
+                seg = re.sub(r'^\s*#{1}\s+(.+)$', 
+                          lambda m: '\\section{' + strip_section_numbering(m.group(1)) + '}', 
+                          seg, flags=re.MULTILINE)  # #
+            
+                # For any headers that might have been missed with unusual patterns
+                # (defensive approach for anything remaining)
+                seg = re.sub(r'^\s*\\*#+\s+(.+)$', 
+                            lambda m: '\\' + ('sub' * min(2, m.group(0).count('#')-1)) + 'section{' + 
+                                    strip_section_numbering(m.group(1).strip()) + '}', 
+                            seg, flags=re.MULTILINE)
+            
+                # 3. Escape any stray # at the start of a line (not already converted)
+                seg = re.sub(r'^(?P<pre>[^\\].*?)#', lambda m: m.group('pre') + r'\#', seg, flags=re.MULTILINE)
             
             # 4. Clean up any malformed LaTeX section commands
             # Ensure section commands have proper closing braces on the same line
-            for cmd in ['section', 'subsection', 'subsubsection']:
-                # Make sure each section command has a closing brace on the same line
-                seg = re.sub(r'^(\\' + cmd + r'\{[^}]*?)$', r'\1}', seg, flags=re.MULTILINE)
+            if PREFILTER.wants('section_braces', present):
+                for cmd in ['section', 'subsection', 'subsubsection']:
+                    # Make sure each section command has a closing brace on the same line
+                    seg = re.sub(r'^(\\' + cmd + r'\{[^}]*?)$', r'\1}', seg, flags=re.MULTILINE)
                 
-                # Fix any cases where a section command doesn't have a closing brace
-                # Pattern matches a section command that doesn't have a closing brace
-                pattern = r'^(\\' + cmd + r'\{[^}]*[^}\n])$'
-                seg = re.sub(pattern, r'\1}', seg, flags=re.MULTILINE)
+                    # Fix any cases where a section command doesn't have a closing brace
+                    # Pattern matches a section command that doesn't have a closing brace
+                    pattern = r'^(\\' + cmd + r'\{[^}]*[^}\n])$'
+                    seg = re.sub(pattern, r'\1}', seg, flags=re.MULTILINE)
                 
-                # Remove any standalone closing braces at the start of lines
-                # (these are likely leftover from previous processing)
-                seg = re.sub(r'^}\s*$', '', seg, flags=re.MULTILINE)
+                    # Remove any standalone closing braces at the start of lines
+                    # (these are likely leftover from previous processing)
+                    seg = re.sub(r'^}\s*$', '', seg, flags=re.MULTILINE)
             # Convert [[text_content]] to \textbf{\textit{text_content}} for bold italics
-            seg = re.sub(r'\[\[([^\]]+)\]\]', r'\\textbf{\\textit{\1}}', seg)
+            if PREFILTER.wants('bold_italics', present):
+                seg = re.sub(r'\[\[([^\]]+)\]\]', r'\\textbf{\\textit{\1}}', seg)
             
-            # Process dash bullet points with more precise matching
-            # First handle the case with label: description format
-            seg = re.sub(r'(^|\n)[ \t]*-[ \t]*([^\n:]+):[ \t]*(.+)', r'\1\n\\noindent\\textbf{\2:} \3\n', seg)
+            if PREFILTER.wants('dash_bullets', present):
+                # Process dash bullet points with more precise matching
+                # First handle the case with label: description format
+                seg = re.sub(r'(^|\n)[ \t]*-[ \t]*([^\n:]+):[ \t]*(.+)', r'\1\n\\noindent\\textbf{\2:} \3\n', seg)
             
-            # Then handle regular dash bullet points (but avoid matching ones already processed)
-            seg = re.sub(r'(^|\n)[ \t]*-[ \t]*(?!\\noindent)(.+)', r'\1\n\\noindent \2\n', seg)
+                # Then handle regular dash bullet points (but avoid matching ones already processed)
+                seg = re.sub(r'(^|\n)[ \t]*-[ \t]*(?!\\noindent)(.+)', r'\1\n\\noindent \2\n', seg)
             
             # Convert special bullet points with labeled items first
             # Pattern: "* Label: Description" with text following
@@ -413,7 +480,8 @@ def md_to_latex(md):
                 return f"{prefix}\\begin{{itemize}}\n\\item \\textbf{{{label}:}} {description}{following_content}\n\\end{{itemize}}\n"
             
             # Process labeled bullets
-            seg = re.sub(labeled_pattern, process_labeled_bullets, seg, flags=re.DOTALL)
+            if PREFILTER.wants('labeled_bullets', present):
+                seg = re.sub(labeled_pattern, process_labeled_bullets, seg, flags=re.DOTALL)
             
             # Now handle regular bullet points with content following
             regular_pattern = r'(^|\n)\s*\*\s+([^\n:][^\n]*)(?:\n+([^\n*][^\n]+(?:\n+(?!\s*\*\s+)[^\n]+)*))?'
@@ -435,7 +503,8 @@ def md_to_latex(md):
                 return f"{prefix}\\begin{{itemize}}\n\\item {bullet_text}{following_content}\n\\end{{itemize}}\n"
             
             # Process regular bullets
-            seg = re.sub(regular_pattern, process_regular_bullets, seg, flags=re.DOTALL)
+            if PREFILTER.wants('regular_bullets', present):
+                seg = re.sub(regular_pattern, process_regular_bullets, seg, flags=re.DOTALL)
             
             # We'll not add package declarations to section files as they can only go in the preamble
             # Instead, we need to modify our approach to not rely on the enumitem package
@@ -457,19 +526,23 @@ def md_to_latex(md):
                 return f"{prefix}\\begin{{itemize}}\n\\item {bullet}\n\\end{{itemize}}\n"
             
             # Process simple bullet points
-            seg = re.sub(simple_bullet_pattern, process_simple_bullet, seg, flags=re.DOTALL)
+            if PREFILTER.wants('simple_bullets', present):
+                seg = re.sub(simple_bullet_pattern, process_simple_bullet, seg, flags=re.DOTALL)
             
             # No need to add packages in the middle of content
             # Convert bold and italics
-            seg = re.sub(r'\*\*(.+?)\*\*', r'\\textbf{\1}', seg)
-            seg = re.sub(r'\*(.+?)\*', r'\\emph{\1}', seg)
+            if PREFILTER.wants('emphasis', present):
+                seg = re.sub(r'\*\*(.+?)\*\*', r'\\textbf{\1}', seg)
+                seg = re.sub(r'\*(.+?)\*', r'\\emph{\1}', seg)
             
             # Handle <mcfile> tags with custom formatting to avoid overly long paths
-            seg = re.sub(r'<mcfile\s+name="([^"]+)"\s+path="([^"]+)"></mcfile>', 
-                       lambda m: f'\\textit{{\\href{{file://\{m.group(2)}}}{{{m.group(1)}}}}}', 
-                       seg)
+            if PREFILTER.wants('mcfile', present):
+                seg = re.sub(r'<mcfile\s+name="([^"]+)"\s+path="([^"]+)"></mcfile>', 
+                           lambda m: f'\\textit{{\\href{{file://\{m.group(2)}}}{{{m.group(1)}}}}}', 
+                           seg)
             # Inline code - handle special LaTeX characters including caret (^) which needs math mode
-            seg = re.sub(r'`([^`]+)`', lambda m: process_inline_code(m.group(1)), seg)
+            if PREFILTER.wants('inline_code', present):
+                seg = re.sub(r'`([^`]+)`', lambda m: process_inline_code(m.group(1)), seg)
             latex_parts.append(seg)
     return ''.join(latex_parts)
 
@@ -558,6 +631,73 @@ def extract_sections(content):
     
     return sections
 
+def section_cache_key(content):
+    """Artifact cache key for converting one section's Markdown to LaTeX"""
+    images = [artifact_cache.file_digest(p) for p in image_pipeline.referenced_images(content, find_image_file)]
+    return artifact_cache.ArtifactCache.key(
+        'section', [content, str(PREPROCESS_IMAGES), str(PRERENDER_LISTINGS)] + images, CONVERTER_VERSION)
+
+def _convert_chunk(preprocess_images, prerender_listings, chunk):
+    """md_to_latex in a worker process, with the parent's image and listing settings"""
+    global PREPROCESS_IMAGES, PRERENDER_LISTINGS
+    PREPROCESS_IMAGES = preprocess_images
+    PRERENDER_LISTINGS = prerender_listings
+    return md_to_latex(chunk)
+
+def restore_section_outputs(content, latex_content):
+    """Recreate the listing fragments and image derivatives that cached LaTeX refers to.
+
+    Returns False if one cannot be recreated and the section must be reconverted.
+    """
+    if PREPROCESS_IMAGES and not image_pipeline.restore_derivatives(
+            content, latex_content, find_image_file, DERIVED_IMAGES_DIR):
+        return False
+    return listing_cache.restore_fragments(latex_content)
+
+def convert_section(content, title='section'):
+    """Convert one section's Markdown to LaTeX, reusing a cached result if available.
+
+    Conversion is bounded by the per-section time budget (see time_budget.py)
+    and raises BudgetExceeded instead of hanging on pathological input.
+    Very large sections are split into chunks that are converted in
+    parallel and cached separately; other sections are cached block by
+    block, so an edit reconverts only the paragraphs it touched (see
+    section_chunks.py).
+    """
+    with metrics().stage('convert_section', section=title) as sample:
+        sample['bytes'] = len(content)
+        cache = artifact_cache.default_cache()
+        key = section_cache_key(content)
+        latex_content = cache.get_text(key)
+        # Pre-rendered listings and image derivatives it refers to may have been deleted since
+        if latex_content is not None and not restore_section_outputs(content, latex_content):
+            latex_content = None
+        sample['cache'] = 'hit' if latex_content is not None else 'miss'
+        if latex_content is None:
+            what = f"Converting section '{title}'"
+            if len(content) >= section_chunks.CHUNK_MIN_SECTION:
+                chunks = section_chunks.split_chunks(content, fence_pattern=CODE_FENCE_PATTERN)
+                if len(chunks) > 1:
+                    # A chunk converts exactly like a section with the same text, so it shares the key scheme
+                    latex_content = section_chunks.convert_chunks(
+                        chunks, partial(_convert_chunk, PREPROCESS_IMAGES, PRERENDER_LISTINGS), section_cache_key,
+                        section_budget(), what)
+            else:
+                blocks = section_chunks.split_blocks(content, fence_pattern=CODE_FENCE_PATTERN)
+                if len(blocks) > 1:
+                    # Unchanged blocks come from the cache; only edited ones are converted
+                    with time_budget(section_budget(), what):
+                        latex_content = section_chunks.convert_chunks(
+                            blocks, md_to_latex, section_cache_key, what=what, jobs=1)
+            # Chunks and blocks restored from the cache may refer to since-deleted files too
+            if latex_content is not None and not restore_section_outputs(content, latex_content):
+                latex_content = None
+            if latex_content is None:
+                with time_budget(section_budget(), what):
+                    latex_content = md_to_latex(content)
+            cache.put_text(key, latex_content)
+    return latex_content
+
 # This function is no longer used - consolidated into process_sections
 # Kept for backward compatibility with existing code
 def write_sections(sections):
@@ -580,6 +720,8 @@ def process_sections(sections):
     """
     if not os.path.exists(SECTIONS_DIR):
         os.makedirs(SECTIONS_DIR)
+    # Ensure images directory exists
+    os.makedirs(IMAGES_DIR, exist_ok=True)
         
     for section_title, section_data in sections.items():
         content = section_data['content']
@@ -596,14 +738,18 @@ def process_sections(sections):
             except Exception as e:
                 print(f"Warning: Failed to create backup of {filename}: {e}")
         
-        # Convert markdown to LaTeX
-        latex_content = md_to_latex(content)
+        # Convert markdown to LaTeX (or reuse the cached conversion)
+        latex_content = convert_section(content, section_data['title'])
         
         # Write updated content
         with open(tex_path, 'w') as f:
             f.write(latex_content + '\n')
             
         print(f"Updated {filename} from section '{section_title}'")
+    
+    cache = artifact_cache.default_cache()
+    print(cache.summary())
+    cache.flush_stats()
 
 if __name__ == "__main__":
     # Read markdown file
@@ -611,9 +757,15 @@ if __name__ == "__main__":
         content = f.read()
     
     # Extract sections from Markdown content
-    sections = extract_sections(content)
+    with metrics('convert').stage('extraction') as sample:
+        sample['bytes'] = len(content)
+        sections = extract_sections(content)
     
     # Process and write sections to LaTeX files
-    process_sections(sections)
+    try:
+        process_sections(sections)
+    except BudgetExceeded as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
     
     print(f"Processed {len(sections)} sections.")
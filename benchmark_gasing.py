@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Benchmark the GASing implementations and write pgfplots data files.
+
+The performance section's figures (``images/StringArithmetic.png``,
+``images/AlgorithmPerformanceComparison.png``) compare implementations on
+Fibonacci numbers, factorials, powers of two, primes, repdigits and
+alternating-digit numbers. This harness reproduces those runs: for every
+sequence family and digit count it builds a batch of operand pairs of that
+size, times each implementation several times and records the distribution.
+
+Outputs (default ``build/benchmarks/``):
+
+* ``samples.csv`` - every timing sample (seconds per operation)
+* ``<operation>-<family>.dat`` - whitespace-separated tables with a
+  ``digits`` column and, per implementation, the median (``<impl>``) and the
+  10th/90th percentiles (``<impl>_lo``/``<impl>_hi``) in microseconds per
+  operation, ready for ``\\addplot table[x=digits, y=gasing_tables]``
+  (see ``figures/gasing_benchmark_plot.tex``). Besides ``gasing_sequential``
+  and ``gasing_tables``, addition tables have ``gasing_lookahead`` (carry
+  lookahead) and multiplication tables ``gasing_auto`` (size-selected method)
+
+Results are keyed by the engine's source, the parameters and the machine,
+so an unchanged engine reuses the previous run (or a cached one from the
+artifact cache) instead of re-measuring.
+
+Usage:
+    python3 benchmark_gasing.py [--digits 10 30 100 300 1000] [--out build/benchmarks]
+"""
+import csv
+import json
+import logging
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from artifact_cache import ArtifactCache, default_cache, source_version
+
+logger = logging.getLogger('md2latex.bench')
+
+DEFAULT_OUT_DIR = Path('build') / 'benchmarks'
+DEFAULT_DIGITS = (10, 30, 100, 300, 1000)
+DEFAULT_PAIRS = 64
+DEFAULT_REPEATS = 7
+KEY_FILE = '.benchmark.key'
+
+FAMILIES = ('fibonacci', 'factorial', 'powers_of_two', 'primes', 'repdigits', 'alternating')
+OPERATIONS = ('add', 'multiply')
+
+# The string algorithms run one Python step per digit (per grid cell for
+# multiplication), so they are timed on a few pairs and multiplication is
+# skipped beyond a modest size rather than left to run for minutes.
+STRING_PAIRS = 8
+STRING_MULTIPLY_MAX_DIGITS = 100
+
+OperandPairs = List[Tuple[int, int]]
+
+
+# ---------------------------------------------------------------------------
+# Sequence families
+# ---------------------------------------------------------------------------
+
+def _fibonacci(digits: int, count: int) -> OperandPairs:
+    a, b = 0, 1
+    while len(str(b)) < digits:
+        a, b = b, a + b
+    pairs = []
+    for _ in range(count):
+        pairs.append((a, b))
+        a, b = b, a + b
+    return pairs
+
+
+def _factorial(digits: int, count: int) -> OperandPairs:
+    k, value = 1, 1
+    while len(str(value)) < digits:
+        k += 1
+        value *= k
+    pairs = []
+    for _ in range(count):
+        pairs.append((value, value * (k + 1)))
+        k += 1
+        value *= k
+    return pairs
+
+
+def _powers_of_two(digits: int, count: int) -> OperandPairs:
+    k = max(0, math.ceil((digits - 1) * math.log2(10)))
+    return [(2 ** (k + i), 2 ** (k + i + 1)) for i in range(count)]
+
+
+def _small_primes(limit: int) -> List[int]:
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b'\x00\x00'
+    for p in range(2, math.isqrt(limit) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = bytes(len(range(p * p, limit, p)))
+    return [p for p in range(limit) if sieve[p]]
+
+
+def _is_probable_prime(n: int, rng: random.Random, rounds: int = 8) -> bool:
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for witness in [2] + [rng.randrange(3, n - 1) for _ in range(rounds - 1)]:
+        x = pow(witness, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _primes(digits: int, count: int, distinct: int = 2) -> OperandPairs:
+    """
+    Consecutive probable primes from a seeded start.
+
+    A window of odd candidates is first sieved by the primes below 2^18, so
+    fewer than one in ten reaches the Miller-Rabin test. At 1000 digits that
+    still leaves about a hundred full modular exponentiations per prime, so
+    only ``distinct`` primes are found and the pairs cycle through them.
+    """
+    rng = random.Random(digits)
+    if digits < 6:
+        small = [p for p in _small_primes(10 ** digits) if p >= 10 ** (digits - 1)]
+        primes = small[:min(count + 1, distinct)]
+    else:
+        sieve_primes = _small_primes(1 << 18)[1:]
+        window = 4 * digits * 3  # ~2.3 * digits is the mean prime gap
+        start = rng.randrange(10 ** (digits - 1), 10 ** digits) | 1
+        primes = []
+        while len(primes) < min(count + 1, distinct):
+            # alive[i] stands for start + 2 * i
+            alive = bytearray([1]) * window
+            for p in sieve_primes:
+                first = (-start * pow(2, -1, p)) % p
+                alive[first::p] = bytes(len(range(first, window, p)))
+            for i in (i for i in range(window) if alive[i]):
+                if _is_probable_prime(start + 2 * i, rng):
+                    primes.append(start + 2 * i)
+                    if len(primes) == min(count + 1, distinct):
+                        break
+            start += 2 * window
+    return [(primes[i % len(primes)], primes[(i + 1) % len(primes)]) for i in range(count)]
+
+
+def _repdigits(digits: int, count: int) -> OperandPairs:
+    return [(int(str(1 + i % 9) * digits), int(str(9 - i % 9) * digits)) for i in range(count)]
+
+
+def _alternating(digits: int, count: int) -> OperandPairs:
+    patterns = ('10', '01', '90', '09', '12', '21', '98', '89')
+    pairs = []
+    for i in range(count):
+        x, y = patterns[i % len(patterns)], patterns[(i + 3) % len(patterns)]
+        pairs.append((int(('1' + x * digits)[:digits]), int(('9' + y * digits)[:digits])))
+    return pairs
+
+
+SEQUENCES: Dict[str, Callable[[int, int], OperandPairs]] = {
+    'fibonacci': _fibonacci,
+    'factorial': _factorial,
+    'powers_of_two': _powers_of_two,
+    'primes': _primes,
+    'repdigits': _repdigits,
+    'alternating': _alternating,
+}
+
+
+# ---------------------------------------------------------------------------
+# Implementations
+# ---------------------------------------------------------------------------
+
+def string_add(a: str, b: str) -> str:
+    """
+    String addition in the style of the appendix ``GASing_Addition`` listing.
+
+    Digits are read from strings and the result grows by one string
+    concatenation per digit, as in the listing; carries are taken from the
+    right so the result is exact.
+    """
+    width = max(len(a), len(b))
+    a, b = a.zfill(width), b.zfill(width)
+    result = ''
+    carry = 0
+    for i in range(width - 1, -1, -1):
+        digit_sum = int(a[i]) + int(b[i]) + carry
+        result = str(digit_sum % 10) + result
+        carry = digit_sum // 10
+    return ('1' + result) if carry else result
+
+
+def string_multiply(a: str, b: str) -> str:
+    """Grid multiplication on digit strings, each grid row added with :func:`string_add`."""
+    total = '0'
+    for shift, digit in enumerate(reversed(b)):
+        row = '0'
+        for _ in range(int(digit)):
+            row = string_add(row, a)
+        total = string_add(total, row + '0' * shift)
+    return total.lstrip('0') or '0'
+
+
+def implementations(operation: str) -> Dict[str, Tuple[Callable, Callable]]:
+    """
+    Map implementation names to ``(prepare, run)`` callables for one operation.
+
+    ``prepare(pairs)`` converts operands outside the timed region and
+    returns ``(prepared, count)``; ``run(prepared)`` performs ``count``
+    operations.
+    """
+    from gasing import batch_add, batch_multiply, to_digit_matrix
+    from gasing.tables import load_tables
+
+    def digit_matrices(pairs):
+        return (to_digit_matrix([x for x, _ in pairs]), to_digit_matrix([y for _, y in pairs])), len(pairs)
+
+    def strings(pairs):
+        return [(str(x), str(y)) for x, y in pairs[:STRING_PAIRS]], min(len(pairs), STRING_PAIRS)
+
+    def ints(pairs):
+        return pairs, len(pairs)
+
+    if operation == 'add':
+        add_tables = load_tables(10, 2)
+        return {
+            'python_int': (ints, lambda pairs: [x + y for x, y in pairs]),
+            'string': (strings, lambda pairs: [string_add(x, y) for x, y in pairs]),
+            'gasing_sequential': (digit_matrices, lambda m: batch_add(*m, carry='sequential')),
+            'gasing_lookahead': (digit_matrices, lambda m: batch_add(*m, carry='lookahead')),
+            'gasing_tables': (digit_matrices, lambda m: batch_add(*m, tables=add_tables)),
+        }
+    multiply_tables = load_tables(10, 3)
+    return {
+        'python_int': (ints, lambda pairs: [x * y for x, y in pairs]),
+        'string': (strings, lambda pairs: [string_multiply(x, y) for x, y in pairs]),
+        'gasing_sequential': (digit_matrices, lambda m: batch_multiply(*m, method='schoolbook')),
+        'gasing_auto': (digit_matrices, lambda m: batch_multiply(*m, method='auto')),
+        'gasing_tables': (digit_matrices, lambda m: batch_multiply(*m, tables=multiply_tables)),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Measurement and output
+# ---------------------------------------------------------------------------
+
+def measure(run: Callable, prepared, count: int, repeats: int) -> List[float]:
+    """Time ``run(prepared)`` ``repeats`` times after one warm-up, in seconds per operation."""
+    run(prepared)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(prepared)
+        samples.append((time.perf_counter() - start) / count)
+    return samples
+
+
+def _percentile(values: Sequence[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = fraction * (len(ordered) - 1)
+    low, high = math.floor(index), math.ceil(index)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+def run_benchmarks(digits: Sequence[int], families: Sequence[str], operations: Sequence[str],
+                   pairs: int, repeats: int) -> List[Dict[str, object]]:
+    """
+    Run every (operation, family, digits, implementation) combination.
+
+    Returns:
+        One row per timing sample
+    """
+    rows = []
+    for operation in operations:
+        impls = implementations(operation)
+        for family in families:
+            for size in digits:
+                operands = SEQUENCES[family](size, pairs)
+                for name, (prepare, run) in impls.items():
+                    if name == 'string' and operation == 'multiply' and size > STRING_MULTIPLY_MAX_DIGITS:
+                        continue
+                    samples = measure(run, *prepare(operands), repeats)
+                    logger.info(f"{operation:8s} {family:14s} {size:6d} digits {name:18s} "
+                                f"{statistics.median(samples) * 1e6:12.3f} us/op")
+                    rows.extend({'family': family, 'operation': operation, 'implementation': name,
+                                 'digits': size, 'repeat': i, 'seconds_per_op': s}
+                                for i, s in enumerate(samples))
+    return rows
+
+
+def write_outputs(rows: List[Dict[str, object]], out_dir: Path) -> List[Path]:
+    """Write ``samples.csv`` and one pgfplots ``.dat`` table per (operation, family)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    samples_path = out_dir / 'samples.csv'
+    with open(samples_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['family', 'operation', 'implementation', 'digits',
+                                               'repeat', 'seconds_per_op'])
+        writer.writeheader()
+        writer.writerows(rows)
+    written.append(samples_path)
+
+    grouped: Dict[Tuple[str, str], Dict[int, Dict[str, List[float]]]] = {}
+    # Columns per operation: addition's fourth series is gasing_lookahead,
+    # multiplication's gasing_auto
+    impl_order: Dict[str, Dict[str, None]] = {}
+    for row in rows:
+        table = grouped.setdefault((row['operation'], row['family']), {})
+        table.setdefault(row['digits'], {}).setdefault(row['implementation'], []).append(row['seconds_per_op'])
+        impl_order.setdefault(row['operation'], {}).setdefault(row['implementation'])
+
+    for (operation, family), table in grouped.items():
+        columns = ['digits']
+        for name in impl_order[operation]:
+            columns += [name, f"{name}_lo", f"{name}_hi"]
+        lines = [' '.join(columns)]
+        for size in sorted(table):
+            cells = [str(size)]
+            for name in impl_order[operation]:
+                samples = table[size].get(name)
+                if samples:
+                    us = [s * 1e6 for s in samples]
+                    cells += [f"{statistics.median(us):.6g}", f"{_percentile(us, 0.1):.6g}",
+                              f"{_percentile(us, 0.9):.6g}"]
+                else:
+                    # pgfplots skips nan points (unbounded coords=jump)
+                    cells += ['nan'] * 3
+            lines.append(' '.join(cells))
+        path = out_dir / f"{operation}-{family}.dat"
+        path.write_text('\n'.join(lines) + '\n')
+        written.append(path)
+    return written
+
+
+def benchmark_key(cache: ArtifactCache, params: Dict[str, object]) -> str:
+    """Key covering the engine source, this harness, the parameters and the machine."""
+    import numpy
+
+    engine = source_version(__file__, *sorted(Path(__file__).with_name('gasing').glob('*.py')))
+    machine = f"{platform.machine()} {platform.processor()} {platform.python_version()} numpy {numpy.__version__}"
+    return cache.key('gasing-benchmark', [engine, json.dumps(params, sort_keys=True)], machine)
+
+
+def main() -> int:
+    """Run the benchmarks (or reuse cached results) and write the data files."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark GASing implementations and write pgfplots data')
+    parser.add_argument('--digits', type=int, nargs='+', default=list(DEFAULT_DIGITS), help='Operand sizes')
+    parser.add_argument('--families', nargs='+', choices=FAMILIES, default=list(FAMILIES),
+                        help='Sequence families')
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS),
+                        help='Operations to time')
+    parser.add_argument('--pairs', type=int, default=DEFAULT_PAIRS, help='Operand pairs per batch')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='Timed repetitions')
+    parser.add_argument('--out', default=str(DEFAULT_OUT_DIR), help='Output directory')
+    parser.add_argument('--force', action='store_true', help='Re-measure even if results are cached')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every measurement')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s: %(message)s')
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(0)
+    out_dir = Path(args.out)
+    params = {'digits': args.digits, 'families': args.families, 'operations': args.operations,
+              'pairs': args.pairs, 'repeats': args.repeats}
+    cache = default_cache()
+    key = benchmark_key(cache, params)
+    key_path = out_dir / KEY_FILE
+
+    if not args.force:
+        if key_path.exists() and key_path.read_text().strip() == key:
+            print(f"Benchmark results in {out_dir} are up to date")
+            return 0
+        if cache.get_files(key, out_dir) is not None:
+            key_path.write_text(key + '\n')
+            print(f"Restored benchmark results into {out_dir} from the artifact cache")
+            cache.flush_stats()
+            return 0
+
+    rows = run_benchmarks(args.digits, args.families, args.operations, args.pairs, args.repeats)
+    written = write_outputs(rows, out_dir)
+    cache.put_files(key, {p.name: p for p in written})
+    key_path.write_text(key + '\n')
+    cache.flush_stats()
+    print(f"Wrote {len(written)} files to {out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
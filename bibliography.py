@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Bibliography stage: prune the .bib to the cited entries and cache the .bbl.
+
+BibTeX only needs to run when the set of cited keys, the cited entries
+themselves or the bibliography style change. This stage reads the cited keys,
+``\\bibstyle`` and ``\\bibdata`` from the ``.aux`` file (following
+``\\@input`` of per-section ``.aux`` files), writes a pruned ``.bib`` holding
+only the cited entries (plus ``@string``/``@preamble`` blocks and
+``crossref`` parents) and keys the resulting ``.bbl`` by
+(cited keys, entry hashes, style). When the key matches the one recorded for
+the current ``.bbl`` nothing runs; otherwise the ``.bbl`` is restored from the
+artifact cache or produced by running BibTeX on the pruned file.
+
+The caller only needs the extra pdflatex pass when :func:`update_bbl`
+reports that the ``.bbl`` changed.
+
+Usage:
+    python3 bibliography.py main [--dir .]     # prints "changed" or "unchanged"
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from artifact_cache import default_cache, tool_version
+from build_metrics import metrics
+
+logger = logging.getLogger('md2latex.bib')
+
+CITATION_PATTERN = re.compile(r'\\citation\{([^}]*)\}')
+BIBSTYLE_PATTERN = re.compile(r'\\bibstyle\{([^}]*)\}')
+BIBDATA_PATTERN = re.compile(r'\\bibdata\{([^}]*)\}')
+INPUT_PATTERN = re.compile(r'\\@input\{([^}]*)\}')
+ENTRY_START_PATTERN = re.compile(r'@\s*([A-Za-z]+)\s*([{(])')
+CROSSREF_PATTERN = re.compile(r'crossref\s*=\s*[{"]\s*([^}"]+?)\s*[}"]', re.IGNORECASE)
+
+# Entry types that are not citable records and must always be kept
+MACRO_ENTRY_TYPES = {'string', 'preamble'}
+
+
+def read_aux(aux_path: Path) -> Tuple[List[str], Optional[str], List[str]]:
+    """
+    Collect citation keys, style and data files from an ``.aux`` file.
+
+    Args:
+        aux_path: The main ``.aux`` file; ``\\@input`` files are followed
+
+    Returns:
+        Tuple of (cited keys in first-citation order, bibstyle, bibdata names)
+    """
+    keys: Dict[str, None] = {}
+    style = None
+    data: List[str] = []
+    seen = set()
+
+    def visit(path: Path):
+        nonlocal style
+        if path in seen or not path.exists():
+            return
+        seen.add(path)
+        text = path.read_text(encoding='utf-8', errors='replace')
+        for match in CITATION_PATTERN.finditer(text):
+            for key in match.group(1).split(','):
+                if key.strip():
+                    keys.setdefault(key.strip())
+        style_match = BIBSTYLE_PATTERN.search(text)
+        if style_match and style is None:
+            style = style_match.group(1).strip()
+        for match in BIBDATA_PATTERN.finditer(text):
+            data.extend(name.strip() for name in match.group(1).split(',') if name.strip())
+        for match in INPUT_PATTERN.finditer(text):
+            visit(aux_path.parent / match.group(1))
+
+    visit(aux_path)
+    return list(keys), style, list(dict.fromkeys(data))
+
+
+def parse_bib_entries(text: str) -> List[Tuple[str, Optional[str], str]]:
+    """
+    Split BibTeX source into entries.
+
+    Braces are matched so that nested groups (``{{Math for Thought}}``) and
+    ``@`` characters inside fields do not confuse the split.
+
+    Returns:
+        List of (entry type lowercased, key or None for macros, raw text)
+    """
+    entries = []
+    pos = 0
+    while True:
+        match = ENTRY_START_PATTERN.search(text, pos)
+        if not match:
+            break
+        entry_type = match.group(1).lower()
+        paren = match.group(2) == '('
+        depth = 0 if paren else 1
+        i = match.end()
+        while i < len(text):
+            ch = text[i]
+            i += 1
+            if ch == '{':
+                depth += 1
+            elif ch == '}':
+                depth -= 1
+                if depth == 0 and not paren:
+                    break
+            elif ch == ')' and paren and depth == 0:
+                break
+        raw = text[match.start():i]
+        key = None
+        if entry_type not in MACRO_ENTRY_TYPES and entry_type != 'comment':
+            key = raw[match.end() - match.start():].split(',', 1)[0].strip()
+        if entry_type != 'comment':
+            entries.append((entry_type, key, raw))
+        pos = i
+    return entries
+
+
+def load_bib(bib_names: List[str], search_dir: Path) -> List[Tuple[str, Optional[str], str]]:
+    """Parse every ``\\bibdata`` file (``.bib`` added when missing)."""
+    entries = []
+    for name in bib_names:
+        path = search_dir / (name if name.endswith('.bib') else f"{name}.bib")
+        if not path.exists():
+            logger.warning(f"Bibliography file not found: {path}")
+            continue
+        entries.extend(parse_bib_entries(path.read_text(encoding='utf-8', errors='replace')))
+    return entries
+
+
+def prune_entries(entries: List[Tuple[str, Optional[str], str]], cited: List[str]) -> List[Tuple[str, Optional[str], str]]:
+    """
+    Keep the cited entries, their ``crossref`` parents and all macro blocks.
+
+    ``\\nocite{*}`` (the ``*`` key) keeps every entry. Keys are compared
+    case-insensitively, as BibTeX does.
+    """
+    if '*' in cited:
+        return entries
+    by_key = {key.lower(): raw for _, key, raw in entries if key}
+    wanted: Set[str] = set()
+    pending = [k.lower() for k in cited]
+    while pending:
+        key = pending.pop()
+        if key in wanted or key not in by_key:
+            continue
+        wanted.add(key)
+        for parent in CROSSREF_PATTERN.findall(by_key[key]):
+            pending.append(parent.lower())
+    return [e for e in entries if e[1] is None or e[1].lower() in wanted]
+
+
+def bbl_key(cited: List[str], entries: List[Tuple[str, Optional[str], str]], style: Optional[str],
+            search_dir: Path) -> str:
+    """
+    Key for the ``.bbl``: cited keys (in order), entry hashes and the style.
+
+    The citation order matters for unsorted styles, so it is kept. A local
+    ``.bst`` file contributes its content.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(cited).encode('utf-8'))
+    for _, _, raw in entries:
+        digest.update(hashlib.sha256(raw.encode('utf-8')).digest())
+    digest.update(f"style:{style}".encode('utf-8'))
+    local_bst = search_dir / f"{style}.bst"
+    if style and local_bst.exists():
+        digest.update(local_bst.read_bytes())
+    return digest.hexdigest()
+
+
+def update_bbl(job: str, work_dir: Path = Path('.'), bib_dir: Optional[Path] = None,
+               bibtex: str = 'bibtex') -> bool:
+    """
+    Bring ``<job>.bbl`` up to date, running BibTeX only when necessary.
+
+    Args:
+        job: Job name (basename of the ``.aux``/``.bbl`` files)
+        work_dir: Directory holding the ``.aux`` (the pdflatex output directory)
+        bib_dir: Directory holding the ``.bib`` files (default: ``work_dir``)
+        bibtex: BibTeX executable
+
+    Returns:
+        True if the ``.bbl`` changed and another pdflatex pass is needed
+    """
+    with metrics().stage('bibtex', job=job) as sample:
+        work_dir = Path(work_dir)
+        bib_dir = Path(bib_dir) if bib_dir else work_dir
+        aux_path = work_dir / f"{job}.aux"
+        bbl_path = work_dir / f"{job}.bbl"
+        key_path = work_dir / f"{job}.bbl.key"
+
+        cited, style, data = read_aux(aux_path)
+        if not cited or not data:
+            logger.info("No citations or \\bibdata in the .aux file; skipping BibTeX")
+            sample['status'] = 'skipped'
+            return False
+
+        entries = prune_entries(load_bib(data, bib_dir), cited)
+        key = bbl_key(cited, entries, style, bib_dir)
+        if bbl_path.exists() and key_path.exists() and key_path.read_text().strip() == key:
+            logger.info("Bibliography unchanged; skipping BibTeX")
+            sample['cache'] = 'hit'
+            return False
+
+        old_bbl = bbl_path.read_bytes() if bbl_path.exists() else None
+        cache = default_cache()
+        cache_key = cache.key('bbl', [key], tool_version(bibtex))
+        if cache.get_files(cache_key, work_dir) is not None:
+            logger.info("Restored the .bbl from the artifact cache")
+            sample['cache'] = 'hit'
+        else:
+            sample['cache'] = 'miss'
+            if not _run_bibtex(job, work_dir, bib_dir, cited, style, entries, bibtex):
+                sample['status'] = 'failed'
+                return False
+            cache.put_files(cache_key, {bbl_path.name: bbl_path})
+
+        key_path.write_text(key + '\n')
+        sample['bytes'] = bbl_path.stat().st_size
+        return bbl_path.read_bytes() != old_bbl
+
+
+def _run_bibtex(job: str, work_dir: Path, bib_dir: Path, cited: List[str], style: Optional[str],
+                entries: List[Tuple[str, Optional[str], str]], bibtex: str) -> bool:
+    """Run BibTeX on a reduced ``.aux`` that points at the pruned ``.bib``."""
+    pruned_name = f"{job}-pruned"
+    bib_job = f"{job}-bib"
+    (work_dir / f"{pruned_name}.bib").write_text('\n\n'.join(raw for _, _, raw in entries) + '\n',
+                                                   encoding='utf-8')
+    aux_lines = [f"\\citation{{{key}}}" for key in cited]
+    if style:
+        aux_lines.append(f"\\bibstyle{{{style}}}")
+    aux_lines.append(f"\\bibdata{{{pruned_name}}}")
+    (work_dir / f"{bib_job}.aux").write_text('\n'.join(aux_lines) + '\n', encoding='utf-8')
+
+    env = dict(os.environ)
+    # Let BibTeX find a local .bst next to the sources
+    env['BSTINPUTS'] = f"{bib_dir.resolve()}{os.pathsep}{env.get('BSTINPUTS', '')}"
+    try:
+        result = subprocess.run([bibtex, bib_job], cwd=str(work_dir), env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except OSError as e:
+        logger.error(f"Could not run {bibtex}: {e}")
+        return False
+    if result.returncode != 0:
+        logger.warning(f"BibTeX reported problems:\n{result.stdout}")
+    produced = work_dir / f"{bib_job}.bbl"
+    if not produced.exists():
+        logger.error("BibTeX did not produce a .bbl file")
+        return False
+    os.replace(produced, work_dir / f"{job}.bbl")
+    logger.info(f"Ran BibTeX on {len(entries)} pruned entries")
+    return True
+
+
+def main() -> int:
+    """Update the .bbl for a job and print whether another pass is needed."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prune the bibliography and run BibTeX only when needed')
+    parser.add_argument('job', nargs='?', default='main', help='Job name (default: main)')
+    parser.add_argument('--dir', default='.', help='Directory holding the .aux file')
+    parser.add_argument('--bib-dir', default=None, help='Directory holding the .bib files')
+    parser.add_argument('--bibtex', default='bibtex', help='BibTeX executable')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s', stream=sys.stderr)
+    changed = update_bbl(args.job, Path(args.dir), Path(args.bib_dir) if args.bib_dir else None, args.bibtex)
+    default_cache().flush_stats()
+    print('changed' if changed else 'unchanged')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Asyncio build orchestrator for the PDF pipeline.
+
+The build is modelled as a DAG of tasks with declared inputs and outputs.
+Dependencies are inferred from the declared files (a task depends on the task
+that produces one of its inputs) plus any explicit ``deps``. Independent
+tasks - figure compilation, image preprocessing, section conversion - run
+concurrently under a configurable limit, up-to-date tasks are skipped, and a
+critical-path timing summary is printed at the end.
+
+A task is up to date when all of its outputs exist and the content hash of
+its inputs (plus its command) matches the one recorded after its last
+successful run in ``build/.dag_state.json``. Content hashes rather than
+mtimes are used because the pdflatex passes rewrite ``main.aux`` in place.
+
+Usage:
+    python3 build_dag.py [markdown_file] [-j 4] [--force] [--dry-run]
+"""
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from artifact_cache import ArtifactCache, default_cache, tool_version
+from build_metrics import metrics
+from latex_log import LatexLogParser
+
+logger = logging.getLogger('md2latex.dag')
+
+BUILD_DIR = Path('build')
+STATE_FILE = BUILD_DIR / '.dag_state.json'
+DEFAULT_JOBS = os.cpu_count() or 2
+
+Command = Union[Sequence[str], Callable[[], None]]
+
+
+@dataclass
+class BuildTask:
+    """
+    A node in the build graph.
+
+    Attributes:
+        name: Unique task name
+        inputs: Files the task reads (globs are expanded when the graph is built)
+        outputs: Files the task writes; an empty list means "always run"
+        command: Argument list for a subprocess, or a Python callable
+        deps: Extra task names that must finish first
+        cwd: Working directory for subprocess commands
+        latex: Parse the output as pdflatex output and stop at the first fatal error
+        optional: A failure is reported but does not fail the build
+        cacheable: Store/restore the outputs in the artifact cache (subprocess
+            tasks only; Python stages cache their own artifacts)
+        condition: Evaluated once the dependencies are done; the task is
+            skipped when it returns False
+    """
+    name: str
+    inputs: List[str]
+    outputs: List[str]
+    command: Command
+    deps: List[str] = field(default_factory=list)
+    cwd: Optional[str] = None
+    latex: bool = False
+    optional: bool = False
+    cacheable: bool = True
+    condition: Optional[Callable[[], bool]] = None
+
+
+@dataclass
+class TaskResult:
+    """Outcome of one task in a build."""
+    name: str
+    status: str  # 'built', 'cached', 'skipped', 'failed', 'blocked'
+    start: float = 0.0
+    end: float = 0.0
+    message: str = ''
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.end - self.start)
+
+
+class BuildGraph:
+    """A set of :class:`BuildTask` objects with dependency resolution and execution."""
+
+    def __init__(self, state_file: Path = STATE_FILE, cache: Optional[ArtifactCache] = None):
+        self.tasks: Dict[str, BuildTask] = {}
+        self.state_file = Path(state_file)
+        self.cache = cache
+
+    def add(self, task: BuildTask) -> BuildTask:
+        """Add a task, expanding glob patterns in its inputs."""
+        if task.name in self.tasks:
+            raise ValueError(f"Duplicate task name: {task.name}")
+        expanded = []
+        for pattern in task.inputs:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            expanded.extend(matches)
+        task.inputs = list(dict.fromkeys(expanded))
+        self.tasks[task.name] = task
+        return task
+
+    def dependencies(self) -> Dict[str, List[str]]:
+        """
+        Return the resolved dependency lists of every task.
+
+        Raises:
+            ValueError: On unknown explicit dependencies or cycles
+        """
+        # The first task declaring an output is its producer; later passes that
+        # rewrite the same file (e.g. main.aux) do not redirect dependencies
+        producers = {}
+        for task in self.tasks.values():
+            for output in task.outputs:
+                producers.setdefault(os.path.normpath(output), task.name)
+
+        deps = {}
+        for task in self.tasks.values():
+            names = []
+            for dep in task.deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task {task.name} depends on unknown task {dep}")
+                names.append(dep)
+            for path in task.inputs:
+                producer = producers.get(os.path.normpath(path))
+                if producer and producer != task.name:
+                    names.append(producer)
+            deps[task.name] = list(dict.fromkeys(names))
+
+        self._check_acyclic(deps)
+        return deps
+
+    @staticmethod
+    def _check_acyclic(deps: Dict[str, List[str]]) -> None:
+        visiting, done = set(), set()
+
+        def visit(name, trail):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle: {' -> '.join(trail + [name])}")
+            visiting.add(name)
+            for dep in deps[name]:
+                visit(dep, trail + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in deps:
+            visit(name, [])
+
+    # Up-to-date checks
+
+    def _signature(self, task: BuildTask) -> str:
+        digest = hashlib.sha256()
+        command = task.command if not callable(task.command) else [
+            getattr(task.command, '__module__', ''), getattr(task.command, '__qualname__', repr(task.command))]
+        digest.update(json.dumps(list(command), default=str).encode('utf-8'))
+        for path in task.inputs:
+            digest.update(path.encode('utf-8'))
+            try:
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 16), b''):
+                        digest.update(chunk)
+            except OSError:
+                digest.update(b'<missing>')
+        return digest.hexdigest()
+
+    def _load_state(self) -> Dict[str, str]:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: Dict[str, str]) -> None:
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_file)
+
+    def is_up_to_date(self, task: BuildTask, state: Dict[str, str]) -> bool:
+        """Return True if the task's outputs exist and its inputs are unchanged."""
+        if not task.outputs:
+            return False
+        if not all(os.path.exists(p) for p in task.outputs):
+            return False
+        return state.get(task.name) == self._signature(task)
+
+    # Artifact cache
+
+    def _cacheable(self, task: BuildTask) -> bool:
+        return self.cache is not None and task.cacheable and not callable(task.command) and bool(task.outputs)
+
+    def _cache_key(self, task: BuildTask) -> Optional[str]:
+        if not self._cacheable(task):
+            return None
+        return self.cache.key(f"task:{task.name}", [self._signature(task)], tool_version(task.command[0]))
+
+    def _restore_outputs(self, task: BuildTask) -> bool:
+        key = self._cache_key(task)
+        return key is not None and self.cache.get_files(key) is not None
+
+    def _store_outputs(self, task: BuildTask) -> None:
+        key = self._cache_key(task)
+        if key is not None and all(os.path.exists(p) for p in task.outputs):
+            self.cache.put_files(key, {os.path.normpath(p): p for p in task.outputs})
+
+    # Execution
+
+    async def _run_command(self, task: BuildTask) -> None:
+        if callable(task.command):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, task.command)
+            return
+
+        proc = await asyncio.create_subprocess_exec(
+            *task.command,
+            cwd=task.cwd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        parser = LatexLogParser()
+        fatal = None
+        async for raw in proc.stdout:
+            line = raw.decode('utf-8', errors='replace')
+            error = parser.feed(line)
+            logger.debug(f"[{task.name}] {line.rstrip()}")
+            if task.latex and error is not None:
+                fatal = error
+                proc.kill()
+                break
+        returncode = await proc.wait()
+        if fatal is not None:
+            raise RuntimeError(f"fatal LaTeX error: {fatal.message}")
+        if returncode != 0:
+            tail = '\n'.join(list(parser.ring)[-15:])
+            raise RuntimeError(f"exit code {returncode}\n{tail}")
+
+    async def run(self, jobs: int = DEFAULT_JOBS, force: bool = False, dry_run: bool = False) -> Dict[str, TaskResult]:
+        """
+        Execute the graph.
+
+        Args:
+            jobs: Maximum number of tasks running at once
+            force: Ignore up-to-date checks and run everything
+            dry_run: Only report which tasks would run
+
+        Returns:
+            dict: Mapping of task name to its TaskResult
+        """
+        deps = self.dependencies()
+        state = self._load_state()
+        semaphore = asyncio.Semaphore(max(1, jobs))
+        results: Dict[str, TaskResult] = {}
+        futures: Dict[str, asyncio.Future] = {}
+        origin = time.monotonic()
+        if not dry_run:
+            # Cache keys include the tools' versions; look them up (a subprocess
+            # each, memoised) off the event loop before any task needs one
+            loop = asyncio.get_running_loop()
+            tools = {task.command[0] for task in self.tasks.values() if self._cacheable(task)}
+            await asyncio.gather(*(loop.run_in_executor(None, tool_version, tool) for tool in sorted(tools)))
+
+        async def execute(name: str) -> TaskResult:
+            task = self.tasks[name]
+            upstream = [await futures[dep] for dep in deps[name]]
+            # A failed optional task does not block, but anything it blocked does
+            failed = [r.name for r in upstream if r.status == 'blocked'
+                      or (r.status == 'failed' and not self.tasks[r.name].optional)]
+            if failed:
+                return TaskResult(name, 'blocked', message=f"blocked by {', '.join(failed)}")
+
+            async with semaphore:
+                start = time.monotonic() - origin
+                if not force and self.is_up_to_date(task, state):
+                    return TaskResult(name, 'skipped', start, start)
+                if task.condition is not None and not task.condition():
+                    return TaskResult(name, 'skipped', start, start, message='condition not met')
+                if dry_run:
+                    return TaskResult(name, 'skipped', start, start, message='would run')
+                if not force and self._restore_outputs(task):
+                    logger.info(f"Restored {name} from the artifact cache")
+                    state[name] = self._signature(task)
+                    return TaskResult(name, 'cached', start, time.monotonic() - origin)
+                # The cache key is taken before the run, while the inputs are
+                # still the ones that determine the outputs
+                signature_before = self._signature(task)
+                logger.info(f"Running {name}")
+                try:
+                    await self._run_command(task)
+                except Exception as e:
+                    level = logging.WARNING if task.optional else logging.ERROR
+                    logger.log(level, f"Task {name} failed: {e}")
+                    return TaskResult(name, 'failed', start, time.monotonic() - origin, str(e))
+                if self._signature(task) == signature_before:
+                    self._store_outputs(task)
+                # Record the signature after the run so inputs it rewrites count
+                state[name] = self._signature(task)
+                return TaskResult(name, 'built', start, time.monotonic() - origin)
+
+        # All futures exist before any task runs and awaits its dependencies
+        for name in self.tasks:
+            futures[name] = asyncio.ensure_future(execute(name))
+        for name, future in futures.items():
+            results[name] = await future
+
+        if not dry_run:
+            self._save_state(state)
+        return results
+
+    def critical_path(self, results: Dict[str, TaskResult]) -> List[str]:
+        """Return the chain of tasks with the largest total duration."""
+        deps = self.dependencies()
+        best: Dict[str, float] = {}
+        prev: Dict[str, Optional[str]] = {}
+
+        def longest(name):
+            if name not in best:
+                own = results[name].duration if name in results else 0.0
+                candidates = [(longest(d), d) for d in deps[name]]
+                upstream, via = max(candidates, default=(0.0, None))
+                best[name] = own + upstream
+                prev[name] = via
+            return best[name]
+
+        end = max(self.tasks, key=longest, default=None)
+        path = []
+        while end is not None:
+            path.append(end)
+            end = prev[end]
+        return list(reversed(path))
+
+    def print_summary(self, results: Dict[str, TaskResult], wall_time: float) -> None:
+        """Print per-task timings and the critical path."""
+        print(f"\n{'Task':<28} {'Status':<8} {'Start':>8} {'Time':>8}")
+        for name, r in sorted(results.items(), key=lambda item: item[1].start):
+            print(f"{name:<28} {r.status:<8} {r.start:>7.2f}s {r.duration:>7.2f}s")
+        path = self.critical_path(results)
+        path_time = sum(results[n].duration for n in path)
+        busy = sum(r.duration for r in results.values())
+        print(f"\nCritical path ({path_time:.2f}s): {' -> '.join(path)}")
+        print(f"Wall time {wall_time:.2f}s, task time {busy:.2f}s "
+              f"(parallel speedup {busy / wall_time if wall_time else 1:.2f}x)")
+
+
+# Pipeline definition for this repository
+
+FIGURE_WRAPPER = r"""\documentclass[tikz,border=2pt]{standalone}
+\usepackage{amsmath,amssymb}
+\usepackage{xcolor}
+%(preamble)s
+\begin{document}
+\input{%(figure)s}
+\end{document}
+"""
+
+
+def _figure_preamble(main_tex: str = 'main.tex') -> str:
+    """Collect the TikZ/pgfplots setup lines from main.tex for standalone figures."""
+    try:
+        with open(main_tex, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return '\\usepackage{tikz}'
+    lines = re.findall(r'^\\(?:usepackage\{(?:tikz|pgfplots)\}|usetikzlibrary\{.*?\}|pgfplotsset\{.*?\})\s*$',
+                       text, flags=re.MULTILINE)
+    macros = re.search(r'^\\input\{figures/spivak_fong_wd_macros(?:\.tex)?\}', text, flags=re.MULTILINE)
+    if macros:
+        lines.append(macros.group(0))
+    return '\n'.join(lines) or '\\usepackage{tikz}'
+
+
+def _write_if_changed(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists() and path.read_text(encoding='utf-8') == content:
+        return
+    path.write_text(content, encoding='utf-8')
+
+
+def figure_tasks(graph: BuildGraph, figures_dir: str = 'figures') -> List[str]:
+    """Add one standalone-compile task per TikZ figure and return their names."""
+    out_dir = BUILD_DIR / 'figures'
+    preamble = _figure_preamble()
+    names = []
+    for source in sorted(glob.glob(os.path.join(figures_dir, '*.tex'))):
+        stem = Path(source).stem
+        # Macro files and complete documents are not standalone figures
+        with open(source, 'r', encoding='utf-8') as f:
+            text = f.read()
+        if '\\documentclass' in text or '\\begin{tikzpicture}' not in text:
+            continue
+        wrapper = out_dir / f"{stem}-standalone.tex"
+        _write_if_changed(wrapper, FIGURE_WRAPPER % {'preamble': preamble, 'figure': source.replace(os.sep, '/')})
+        name = f"figure:{stem}"
+        graph.add(BuildTask(
+            name=name,
+            inputs=[source, str(wrapper), 'figures/spivak_fong_wd_macros.tex'],
+            outputs=[str(out_dir / f"{stem}.pdf")],
+            command=['pdflatex', '-interaction=nonstopmode', '-file-line-error',
+                     f'-output-directory={out_dir}', f'-jobname={stem}', str(wrapper)],
+            latex=True,
+            optional=True,
+        ))
+        names.append(name)
+    return names
+
+
+def repo_graph(md_source: Optional[str], main: str = 'main', converter: str = 'auto_transcribe_md_to_tex',
+               cache: Optional[ArtifactCache] = None) -> BuildGraph:
+    """
+    Build the DAG equivalent of the Makefile's ``all`` recipe.
+
+    Args:
+        md_source: Markdown source (``MC_SOURCE``); conversion is skipped if None
+        main: Basename of the main LaTeX document
+        converter: ``auto_transcribe_md_to_tex`` or ``refactored_md_to_tex_converter``
+        cache: Artifact cache for task outputs (None disables it)
+
+    Returns:
+        BuildGraph ready to run
+    """
+    graph = BuildGraph(cache=cache)
+    stamps = BUILD_DIR / '.stamps'
+    stamps.mkdir(parents=True, exist_ok=True)
+    python = sys.executable or 'python3'
+    latex_inputs = [f'{main}.tex', 'sections/*.tex', 'figures/*.tex', 'styles/*.sty', 'arxiv.sty']
+
+    if md_source:
+        cleaned = os.path.splitext(md_source)[0] + '.cleaned.md'
+        graph.add(BuildTask(
+            name='validate',
+            inputs=[md_source, 'validate_markdown_structure.py'],
+            outputs=[cleaned],
+            command=[python, 'validate_markdown_structure.py', md_source, '--skip-hierarchy-check'],
+        ))
+
+        sections_stamp = str(stamps / 'sections.stamp')
+
+        def convert_sections():
+            # Python tasks run in executor threads, where the per-section time
+            # budget cannot interrupt a runaway regex; a process of its own can
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                pool.submit(_convert_sections, cleaned, converter).result()
+            Path(sections_stamp).touch()
+
+        graph.add(BuildTask(
+            name='sections',
+            inputs=[cleaned, f'{converter}.py'],
+            outputs=[sections_stamp],
+            command=convert_sections,
+        ))
+        latex_inputs.append(sections_stamp)
+
+    images_stamp = str(stamps / 'images.stamp')
+
+    def preprocess_images():
+        import image_pipeline
+        sources = [p for p in sorted(glob.glob('images/*')) if Path(p).suffix.lower() in image_pipeline.RASTER_SUFFIXES]
+        image_pipeline.preprocess_images(sources, Path('images') / image_pipeline.DERIVED_SUBDIR)
+        Path(images_stamp).touch()
+
+    graph.add(BuildTask(
+        name='images',
+        inputs=['images/*.png', 'images/*.jpg', 'image_pipeline.py'],
+        outputs=[images_stamp],
+        command=preprocess_images,
+    ))
+    latex_inputs.append(images_stamp)
+
+    figure_tasks(graph)
+
+    pdflatex = ['pdflatex', '-interaction=nonstopmode', '-file-line-error', f'{main}.tex']
+    graph.add(BuildTask(name='latex:pass1', inputs=latex_inputs, outputs=[f'{main}.aux'],
+                        command=pdflatex, latex=True))
+
+    # BibTeX runs on the pruned bibliography only when the cited entries
+    # changed, and the extra pdflatex pass only when the .bbl changed.
+    bbl_stamp = stamps / 'bbl.changed'
+
+    def update_bibliography():
+        from bibliography import update_bbl
+        bbl_stamp.write_text('changed' if update_bbl(main) else 'unchanged')
+
+    def consume_bbl_change():
+        # A skipped bibtex task leaves an old stamp behind; each change
+        # triggers the extra pass once
+        changed = bbl_stamp.exists() and bbl_stamp.read_text() == 'changed'
+        if changed:
+            bbl_stamp.write_text('unchanged')
+        return changed
+
+    graph.add(BuildTask(name='bibtex', inputs=[f'{main}.aux', 'bibliography.bib'], outputs=[str(bbl_stamp)],
+                        command=update_bibliography, deps=['latex:pass1'], optional=True))
+    graph.add(BuildTask(name='latex:pass2', inputs=latex_inputs + [f'{main}.bbl'], outputs=[f'{main}.pdf'],
+                        command=pdflatex, deps=['latex:pass1', 'bibtex'], latex=True,
+                        condition=consume_bbl_change))
+    graph.add(BuildTask(name='latex:pass3', inputs=latex_inputs + [f'{main}.bbl'], outputs=[f'{main}.pdf', f'{main}.aux'],
+                        command=pdflatex, deps=['latex:pass2'], latex=True))
+    return graph
+
+
+def _convert_sections(md_path: str, converter: str) -> None:
+    """Run one of the Markdown converters over ``md_path``."""
+    if converter == 'refactored_md_to_tex_converter':
+        import refactored_md_to_tex_converter as refactored
+        refactored.MarkdownToLatexConverter(md_path).process_and_write_sections()
+        return
+    import auto_transcribe_md_to_tex as transcribe
+    with open(md_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    transcribe.process_sections(transcribe.extract_sections(content))
+
+
+def main() -> int:
+    """Run the DAG build from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the paper with a concurrent task DAG')
+    parser.add_argument('markdown', nargs='?', default=os.environ.get('MC_SOURCE') or None,
+                        help='Markdown source to convert (default: $MC_SOURCE; omit to skip conversion)')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='Maximum concurrent tasks')
+    parser.add_argument('--main', default='main', help='Main LaTeX document basename')
+    parser.add_argument('--refactored', action='store_true', help='Use the refactored converter')
+    parser.add_argument('--force', action='store_true', help='Rebuild every task')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would run')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the artifact cache')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show task output')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(levelname)s: %(message)s')
+    # In-process stages (BibTeX) record under this job; the section
+    # conversion process joins the same run through the environment
+    recorder = metrics('dag')
+    os.environ.setdefault('BUILD_METRICS_RUN', recorder.run_id)
+    converter = 'refactored_md_to_tex_converter' if args.refactored else 'auto_transcribe_md_to_tex'
+    cache = default_cache()
+    if args.no_cache:
+        cache.enabled = False
+    graph = repo_graph(args.markdown, main=args.main, converter=converter, cache=cache)
+
+    start = time.monotonic()
+    results = asyncio.run(graph.run(jobs=args.jobs, force=args.force, dry_run=args.dry_run))
+    elapsed = time.monotonic() - start
+    graph.print_summary(results, elapsed)
+    if not args.dry_run:
+        for r in results.values():
+            fields = {'cache': {'cached': 'hit', 'built': 'miss'}.get(r.status),
+                      'status': 'failed' if r.status in ('failed', 'blocked') else r.status}
+            recorder.add('dag_task', r.duration, {k: v for k, v in fields.items() if v}, task=r.name)
+        recorder.add('dag_build', elapsed)
+    if cache.enabled:
+        print(cache.summary())
+        cache.flush_stats()
+
+    failed = [r for r in results.values() if r.status in ('failed', 'blocked') and not graph.tasks[r.name].optional]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Build metrics: stage timings, bytes processed, pass counts and cache hits.
+
+Pipeline steps (validation, section extraction and conversion, pdflatex
+passes, BibTeX, DAG tasks such as figure compiles) record *stages* through
+the process-wide :func:`metrics` recorder::
+
+    with metrics().stage('convert_section', section=title) as sample:
+        sample['bytes'] = len(markdown)
+        sample['cache'] = 'hit'
+
+When the process exits the samples are appended to
+``build/metrics/metrics.jsonl``, one JSON object per stage with the run id,
+commit, job (the script), labels, duration and the optional ``bytes``,
+``cache`` and ``status`` fields, so latency can be graphed
+across commits. ``build/metrics/build.prom`` is then rewritten in the
+Prometheus textfile format with the totals of every process in the same run
+(``node_exporter --collector.textfile.directory build/metrics``).
+
+Processes belong to the same run when they share ``$BUILD_METRICS_RUN``
+(the Makefile exports one per ``make``). ``BUILD_METRICS=0`` disables the
+output and ``BUILD_METRICS_DIR`` moves it.
+
+Usage:
+    python3 build_metrics.py time <stage> -- <command ...>   # run a command as a stage
+    python3 build_metrics.py report [--runs 5]               # stage durations of recent runs
+"""
+import atexit
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger('md2latex.metrics')
+
+DEFAULT_METRICS_DIR = Path('build') / 'metrics'
+JSONL_NAME = 'metrics.jsonl'
+PROM_NAME = 'build.prom'
+PREFIX = 'md2latex'
+# Summed per stage: (metric suffix, help text, sample field it needs or None)
+PROM_METRICS = (
+    ('stage_duration_seconds', 'Wall time spent in the stage during the run', None),
+    ('stage_runs', 'Times the stage ran during the run (e.g. pdflatex passes)', None),
+    ('stage_failures', 'Stage runs that failed', None),
+    ('stage_bytes', 'Bytes processed by the stage during the run', 'bytes'),
+    ('stage_cache_hits', 'Stage runs served from a cache', 'cache'),
+    ('stage_cache_misses', 'Stage runs that had to do the work', 'cache'),
+)
+
+
+def _enabled() -> bool:
+    return os.environ.get('BUILD_METRICS', '1').lower() not in ('0', 'false', 'no')
+
+
+def _commit() -> str:
+    if os.environ.get('BUILD_METRICS_COMMIT'):
+        return os.environ['BUILD_METRICS_COMMIT']
+    import subprocess
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, timeout=10)
+        return result.stdout.strip() or 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+class BuildMetrics:
+    """
+    Stage samples of one process, written to the metrics directory on :meth:`flush`.
+
+    Args:
+        job: Name of the process's role (``convert``, ``validate``, ``dag``, ...)
+        out_dir: Metrics directory (default: ``$BUILD_METRICS_DIR`` or ``build/metrics``)
+        run_id: Build run (default: ``$BUILD_METRICS_RUN`` or a new id)
+    """
+
+    def __init__(self, job: str, out_dir: Optional[Path] = None, run_id: Optional[str] = None):
+        self.job = job
+        self.out_dir = Path(out_dir or os.environ.get('BUILD_METRICS_DIR') or DEFAULT_METRICS_DIR)
+        self.run_id = run_id or os.environ.get('BUILD_METRICS_RUN') or f"{int(time.time())}-{os.getpid()}"
+        self.samples: List[dict] = []
+
+    @contextmanager
+    def stage(self, name: str, **labels: str) -> Iterator[dict]:
+        """
+        Time the body as one run of stage ``name``.
+
+        Yields:
+            The sample; set ``bytes``, ``cache`` (``'hit'``/``'miss'``) or
+            ``status`` on it. An exception marks it ``failed``.
+        """
+        sample = {'stage': name, 'labels': {k: str(v) for k, v in labels.items()}}
+        start = time.monotonic()
+        try:
+            yield sample
+        except BaseException:
+            sample['status'] = 'failed'
+            raise
+        finally:
+            sample['duration_s'] = round(time.monotonic() - start, 6)
+            sample['time'] = time.time()
+            self.samples.append(sample)
+
+    def add(self, name: str, duration: float, fields: Optional[dict] = None, **labels: str) -> None:
+        """Record a stage timed elsewhere (e.g. a DAG task's result)."""
+        sample = {'stage': name, 'labels': {k: str(v) for k, v in labels.items()},
+                  'duration_s': round(duration, 6), 'time': time.time()}
+        sample.update(fields or {})
+        self.samples.append(sample)
+
+    def flush(self) -> None:
+        """Append the samples to the JSON lines log and rewrite the run's Prometheus file."""
+        if not self.samples or not _enabled():
+            self.samples = []
+            return
+        base = {'run': self.run_id, 'commit': _commit(), 'job': self.job}
+        records = [dict(base, **sample) for sample in self.samples]
+        cache = _artifact_cache_stats()
+        if cache:
+            records.append(dict(base, stage='artifact_cache', labels={}, time=time.time(), cache_stats=cache))
+        try:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.out_dir / JSONL_NAME, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record, sort_keys=True) + '\n' for record in records))
+            run_records = [r for r in read_records(self.out_dir / JSONL_NAME) if r.get('run') == self.run_id]
+            tmp = self.out_dir / f".{PROM_NAME}.{os.getpid()}.tmp"
+            tmp.write_text(prometheus_text(run_records), encoding='utf-8')
+            os.replace(tmp, self.out_dir / PROM_NAME)
+        except OSError as e:
+            logger.warning(f"Could not write build metrics to {self.out_dir}: {e}")
+        self.samples = []
+
+
+def _artifact_cache_stats() -> Dict[str, int]:
+    # Only report a cache the process actually used; never create one here
+    module = sys.modules.get('artifact_cache')
+    cache = getattr(module, '_default_cache', None) if module else None
+    if cache is None or not cache.enabled:
+        return {}
+    return {name: value for name, value in cache.stats.items() if value}
+
+
+def read_records(path: Path) -> List[dict]:
+    """Records of a metrics JSON lines file (unreadable lines are skipped)."""
+    records = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs: Tuple[Tuple[str, str], ...]) -> str:
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def prometheus_text(records: List[dict]) -> str:
+    """
+    Totals per stage of one run's records, in the Prometheus textfile format.
+
+    Args:
+        records: Records of a single run (from :func:`read_records`)
+
+    Returns:
+        Exposition text with ``md2latex_stage_*`` gauges, artifact cache
+        counters and the run's commit and timestamp
+    """
+    totals: Dict[Tuple[Tuple[str, str], ...], Dict[str, float]] = {}
+    # Fields the stage's samples carried; bytes and cache series exist only for those
+    fields: Dict[Tuple[Tuple[str, str], ...], set] = {}
+    cache_events: Dict[Tuple[Tuple[str, str], ...], float] = {}
+    for record in records:
+        if record.get('stage') == 'artifact_cache':
+            for event, value in record.get('cache_stats', {}).items():
+                key = (('job', record['job']), ('event', event))
+                cache_events[key] = cache_events.get(key, 0) + value
+            continue
+        key = (('job', record.get('job', '')), ('stage', record.get('stage', ''))) + \
+            tuple(sorted(record.get('labels', {}).items()))
+        total = totals.setdefault(key, dict.fromkeys((suffix for suffix, _, _ in PROM_METRICS), 0.0))
+        fields.setdefault(key, set()).update(record)
+        total['stage_duration_seconds'] += record.get('duration_s', 0.0)
+        total['stage_runs'] += 1
+        total['stage_failures'] += record.get('status') == 'failed'
+        total['stage_bytes'] += record.get('bytes', 0)
+        total['stage_cache_hits'] += record.get('cache') == 'hit'
+        total['stage_cache_misses'] += record.get('cache') == 'miss'
+
+    lines = []
+    for suffix, help_text, needs in PROM_METRICS:
+        series = [f"{PREFIX}_{suffix}{_labels(key)} {total[suffix]:g}"
+                  for key, total in sorted(totals.items()) if needs is None or needs in fields[key]]
+        if series:
+            lines += [f"# HELP {PREFIX}_{suffix} {help_text}", f"# TYPE {PREFIX}_{suffix} gauge"] + series
+    if cache_events:
+        lines += [f"# HELP {PREFIX}_artifact_cache_events Artifact cache activity during the run",
+                  f"# TYPE {PREFIX}_artifact_cache_events gauge"]
+        lines += [f"{PREFIX}_artifact_cache_events{_labels(key)} {value:g}" for key, value in sorted(cache_events.items())]
+    if records:
+        last = records[-1]
+        lines += [f"# HELP {PREFIX}_build_info Run id and commit of the build",
+                  f"# TYPE {PREFIX}_build_info gauge",
+                  f"{PREFIX}_build_info{_labels((('run', last.get('run', '')), ('commit', last.get('commit', ''))))} 1",
+                  f"# HELP {PREFIX}_build_timestamp_seconds Time the run's last stage was recorded",
+                  f"# TYPE {PREFIX}_build_timestamp_seconds gauge",
+                  f"{PREFIX}_build_timestamp_seconds {max(r.get('time', 0) for r in records):.0f}"]
+    return '\n'.join(lines) + '\n'
+
+
+_metrics: Optional[BuildMetrics] = None
+
+
+def metrics(job: Optional[str] = None) -> BuildMetrics:
+    """
+    The process-wide recorder, flushed when the process exits.
+
+    Args:
+        job: Job name for the process (the first call decides; default: the script name)
+    """
+    global _metrics
+    if _metrics is None:
+        _metrics = BuildMetrics(job or Path(sys.argv[0] or 'python').stem)
+        atexit.register(_metrics.flush)
+    return _metrics
+
+
+def report(path: Path, runs: int = 5) -> str:
+    """Per-stage durations (seconds) of the last ``runs`` runs, oldest first."""
+    by_run: Dict[str, Dict[str, float]] = {}
+    commits: Dict[str, str] = {}
+    for record in read_records(path):
+        if record.get('stage') == 'artifact_cache':
+            continue
+        stages = by_run.setdefault(record.get('run', '?'), {})
+        stages[record['stage']] = stages.get(record['stage'], 0.0) + record.get('duration_s', 0.0)
+        commits[record.get('run', '?')] = record.get('commit', '?')
+    recent = list(by_run)[-runs:]
+    if not recent:
+        return f"No metrics recorded in {path}"
+    names = sorted({stage for run in recent for stage in by_run[run]})
+    width = max(len(name) for name in names + ['stage'])
+    lines = [f"{'stage':<{width}} " + ' '.join(f"{commits[run][:10]:>10}" for run in recent)]
+    for name in names + ['total']:
+        values = [sum(by_run[run].values()) if name == 'total' else by_run[run].get(name) for run in recent]
+        lines.append(f"{name:<{width}} " + ' '.join(f"{v:>10.2f}" if v is not None else f"{'-':>10}" for v in values))
+    return '\n'.join(lines)
+
+
+def main() -> int:
+    """Time a command as a build stage, or summarise recorded runs."""
+    import argparse
+    import subprocess
+
+    parser = argparse.ArgumentParser(description='Record and report build stage metrics')
+    sub = parser.add_subparsers(dest='action', required=True)
+    timer = sub.add_parser('time', help='Run a command and record it as a stage')
+    timer.add_argument('stage', help='Stage name (e.g. pdflatex)')
+    timer.add_argument('command', nargs=argparse.REMAINDER, help='Command to run, after --')
+    reporter = sub.add_parser('report', help='Stage durations of recent runs')
+    reporter.add_argument('--runs', type=int, default=5, help='Number of runs to show')
+    args = parser.parse_args()
+
+    out_dir = Path(os.environ.get('BUILD_METRICS_DIR') or DEFAULT_METRICS_DIR)
+    if args.action == 'report':
+        print(report(out_dir / JSONL_NAME, args.runs))
+        return 0
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        parser.error('no command given')
+    recorder = metrics('make')
+    with recorder.stage(args.stage) as sample:
+        returncode = subprocess.call(command)
+        if returncode != 0:
+            sample['status'] = 'failed'
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,16 @@ Convert GASing_Arithmetic.md to LaTeX and generate a PDF using the main.tex temp
 """
 import logging
 import shutil
-import subprocess
 import sys
 import tempfile
 from pathlib import Path
 from typing import List, Optional, Tuple, Union
 from md2latex.converter import MarkdownToLatexConverter
+from latex_log import run_passes, run_streaming
+from listing_cache import missing_fragments
+from artifact_cache import default_cache, source_version, tool_version
+from bibliography import update_bbl
+from preview import build_preview
 
 # Add the current directory to the path so we can import our package
 project_root = Path(__file__).parent
@@ -26,6 +30,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger('md2latex')
 
+# File types whose contents determine the compiled PDF
+LATEX_SOURCE_SUFFIXES = {'.tex', '.sty', '.cls', '.bib', '.bbl', '.png', '.jpg', '.jpeg', '.pdf'}
+# Build by-products written next to the sources: bibliography.py's pruned
+# .bib and BibTeX job, and the partial_build.py / preview.py build directories
+GENERATED_STEM_SUFFIXES = ('-pruned', '-bib')
+GENERATED_DIRS = {'build', 'partial', 'preview'}
+
+def _latex_inputs_key(tex_file: Path) -> str:
+    """Artifact cache key for compiling ``tex_file`` with the sources next to it."""
+    tex_dir = tex_file.parent
+    parts = [tex_file.name]
+    for path in sorted(tex_dir.rglob('*')):
+        relative = path.relative_to(tex_dir)
+        if GENERATED_DIRS.intersection(relative.parts[:-1]) or path.stem.endswith(GENERATED_STEM_SUFFIXES):
+            continue
+        if path.is_file() and path.suffix in LATEX_SOURCE_SUFFIXES and path.stem != tex_file.stem:
+            # Relative names keep the key identical across checkouts
+            parts.extend([relative.as_posix(), path.read_bytes()])
+    parts.append(tex_file.read_bytes())
+    return default_cache().key('pdf', parts, tool_version('pdflatex'))
+
 def setup_output_directories(base_dir: Path) -> Tuple[Path, Path, Path]:
     """
     Set up the output directory structure.
@@ -70,23 +95,15 @@ def run_command(cmd: Union[List[str], str], cwd: Optional[Path] = None) -> bool:
     """
     try:
         logger.debug(f"Running command: {' '.join(cmd) if isinstance(cmd, list) else cmd}")
-        result = subprocess.run(
-            cmd,
-            cwd=str(cwd) if cwd else None,
-            shell=isinstance(cmd, str),
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            encoding='utf-8',
-            errors='replace'
-        )
-        logger.debug(f"Command output:\n{result.stdout}")
+        # Stream the output instead of buffering it; only a bounded tail is kept
+        result = run_streaming(cmd, cwd=cwd, on_line=lambda line: logger.debug(f"| {line}"))
+        if result.returncode != 0 or result.aborted:
+            logger.error(f"Command failed with exit code {result.returncode}: {cmd}")
+            if result.fatal_error:
+                logger.error(f"First fatal error: {result.fatal_error.message}")
+            logger.error("Output (last lines):\n" + '\n'.join(result.tail))
+            return False
         return True
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Command failed with exit code {e.returncode}: {e.cmd}")
-        logger.error(f"Output: {e.output}")
-        return False
     except Exception as e:
         logger.error(f"Unexpected error running command: {e}")
         return False
@@ -110,41 +127,53 @@ def generate_pdf(tex_file: Path, output_dir: Path) -> bool:
         tex_dir = tex_file.parent
         tex_filename = tex_file.name
         
+        # Reuse a PDF built from identical inputs (here or by a teammate)
+        cache = default_cache()
+        cache_key = _latex_inputs_key(tex_file)
+        if cache.get_files(cache_key, output_dir) is not None:
+            logger.info(f"Restored {tex_file.stem}.pdf from the artifact cache")
+            return True
+        
         # Run pdflatex
         cmd = [
             'pdflatex',
             '-interaction=nonstopmode',
+            '-file-line-error',
             f'-output-directory={output_dir}',
             tex_filename
         ]
         
         logger.info(f"Running LaTeX command: {' '.join(cmd)} in {tex_dir}")
         
-        # Run multiple times to resolve references
-        for _ in range(3):
-            result = subprocess.run(
-                cmd,
-                cwd=str(tex_dir),
-                capture_output=True,
-                text=True
-            )
-            
-            # Check for errors
-            if result.returncode != 0:
+        # Run until LaTeX no longer asks for a rerun and the .aux/.toc/.out
+        # files stop changing. BibTeX, and the extra pass it needs, only run
+        # after the first pass when the cited bibliography changed.
+        def after_pass(pass_number, result):
+            return pass_number == 1 and update_bbl(tex_file.stem, output_dir, bib_dir=tex_dir)
+
+        # The output is parsed as it streams; a pass is killed at the
+        # first fatal error instead of cascading through the document
+        result, pass_number, settled = run_passes(cmd, tex_dir, tex_file.stem, out_dir=output_dir,
+                                                  max_passes=4, after_pass=after_pass)
+        
+        # Check for errors
+        if result.returncode != 0 or result.aborted:
+            if result.fatal_error:
+                error_msg = f"LaTeX compilation aborted on pass {pass_number}: {result.fatal_error.message}"
+            else:
                 error_msg = f"LaTeX compilation failed with return code {result.returncode}"
-                logger.error(error_msg)
-                
-                # Write error log
-                error_log = output_dir / 'latex_compile_error.log'
-                with open(error_log, 'w', encoding='utf-8') as f:
-                    f.write(f"{error_msg}\n")
-                    f.write("\n=== STDOUT ===\n")
-                    f.write(result.stdout)
-                    f.write("\n\n=== STDERR ===\n")
-                    f.write(result.stderr)
-                
-                logger.error(f"See error log for details: {error_log}")
-                return False
+            logger.error(error_msg)
+            
+            # Write error log
+            error_log = output_dir / 'latex_compile_error.log'
+            result.write_error_log(error_log, header=error_msg)
+            
+            logger.error(f"See error log for details: {error_log}")
+            return False
+        
+        for warning in result.warnings:
+            if warning.kind in ('citation', 'reference'):
+                logger.warning(f"LaTeX: {warning.message}")
         
         # Check if PDF was created
         pdf_file = output_dir / f"{tex_file.stem}.pdf"
@@ -153,6 +182,10 @@ def generate_pdf(tex_file: Path, output_dir: Path) -> bool:
             logger.error(error_msg)
             return False
             
+        # Only a settled PDF may stand in for these inputs in later builds
+        if settled:
+            outputs = {f"{tex_file.stem}{ext}": output_dir / f"{tex_file.stem}{ext}" for ext in ('.pdf', '.aux', '.bbl')}
+            cache.put_files(cache_key, {name: path for name, path in outputs.items() if path.exists()})
         logger.info(f"Successfully generated PDF: {pdf_file}")
         return True
         
@@ -190,6 +223,12 @@ def create_main_tex(output_dir: Path, content: str, template_path: Optional[Path
             shutil.copy(arxiv_style, output_dir / 'arxiv.sty')
             logger.info(f"Copied arxiv.sty to {output_dir}")
         
+        # Copy the bibliography so the citations can be resolved
+        bib_file = Path(__file__).parent / 'bibliography.bib'
+        if bib_file.exists():
+            shutil.copy(bib_file, output_dir / 'bibliography.bib')
+            logger.info(f"Copied bibliography.bib to {output_dir}")
+        
         # Use default template if none provided
         if template_path is None:
             template_path = Path(__file__).parent / 'main.tex'
@@ -197,6 +236,16 @@ def create_main_tex(output_dir: Path, content: str, template_path: Optional[Path
         # Read the template
         with open(template_path, 'r', encoding='utf-8') as f:
             template = f.read()
+        
+        # The generated file only depends on the template, the content and this script
+        cache = default_cache()
+        cache_key = cache.key('main-tex', [template, content], source_version(__file__))
+        cached = cache.get_text(cache_key)
+        if cached is not None:
+            output_file = output_dir / 'main.tex'
+            output_file.write_text(cached, encoding='utf-8')
+            logger.info(f"Restored main.tex from the artifact cache at {output_file}")
+            return output_file
             
         # Fix the macro file path in the template
         template = template.replace(
@@ -222,6 +271,7 @@ def create_main_tex(output_dir: Path, content: str, template_path: Optional[Path
         output_file = output_dir / 'main.tex'
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(template)
+        cache.put_text(cache_key, template)
             
         logger.info(f"Created main.tex file at {output_file}")
         return output_file
@@ -279,6 +329,12 @@ def parse_arguments():
         default=None,
         help='Output directory (default: gasing_arithmetic_output)'
     )
+    parser.add_argument(
+        '--preview',
+        action='store_true',
+        help='Fast draft build: one pass, draft graphics, TikZ placeholders, no BibTeX '
+             '(written to <output>/preview)'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -332,7 +388,9 @@ def main() -> int:
             converter = MarkdownToLatexConverter(
                 str(md_file),
                 sections_dir=str(tex_dir / 'sections'),  # Store sections in a subdirectory
-                images_dir=str(tex_dir / 'images')
+                images_dir=str(tex_dir / 'images'),
+                # pdflatex runs next to main.tex, so image and listing paths are relative to it
+                base_output_dir=str(output_dir)
             )
             
             # Convert markdown to LaTeX content
@@ -368,6 +426,18 @@ def main() -> int:
                 
                 logger.info(f"Successfully generated LaTeX document: {main_tex}")
                 
+                # Every pre-rendered listing must resolve from the compile directory
+                missing = missing_fragments(main_tex.read_text(encoding='utf-8'), main_tex.parent)
+                if missing:
+                    logger.error(f"Listing fragments not found relative to {main_tex.parent}: {', '.join(missing)}")
+                    return 1
+                
+                # The draft preview builds in its own directory, outside the
+                # document directory the release PDF's cache key is computed over
+                if args.preview:
+                    logger.info("Generating draft preview PDF...")
+                    return 0 if build_preview(main_tex, output_base / 'preview') else 1
+                
                 # Generate PDF
                 logger.info("Generating PDF...")
                 if generate_pdf(main_tex, output_dir):
@@ -390,6 +460,9 @@ def main() -> int:
         logger.exception("Unexpected error in main:")
         return 1
     finally:
+        cache = default_cache()
+        logger.info(cache.summary())
+        cache.flush_stats()
         # Ensure all handlers are flushed
         for handler in logger.handlers:
             handler.flush()
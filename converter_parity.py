@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Differential parity and throughput harness for the Markdown converters.
+
+``make all`` converts sections with ``auto_transcribe_md_to_tex.md_to_latex``
+and ``make all_refactored`` with
+``md2latex.converter.MarkdownToLatexConverter``; they are meant
+to produce the same LaTeX. This harness runs every engine over a corpus,
+section by section, and reports:
+
+* parity - each section's LaTeX compared with the baseline engine (the
+  first one), with unified diffs for the sections that differ
+* throughput - best-of-``--repeats`` conversion time per document, in
+  Markdown characters per second
+* peak memory - the largest Python allocation peak (``tracemalloc``) of any
+  single section conversion
+* prefilter skips - how often each regex pass was skipped because its
+  trigger literals were absent (see ``prefilter.py``); ``-v`` lists every pass
+
+The corpus is the repository's Markdown files plus generated stress
+documents (every construct the converters handle - headers, escaped
+headers, dash and star bullets, emphasis, inline code with carets and
+underscores, fences, Unicode math - repeated over many sections). Sections
+are split at ``##`` headings as the build does; a document without any is
+converted whole. Conversion bypasses the artifact cache and, unless
+``--images`` / ``--listings`` are given, image preprocessing and listing
+pre-rendering.
+
+Further engines are any callable taking a section's Markdown and returning
+LaTeX: ``--engine name=module:function``. ``original-unfiltered`` and
+``refactored-unfiltered`` run every regex pass regardless of the prefilter;
+as the baseline they check that skipping passes never changes the output.
+
+Usage:
+    python3 converter_parity.py [files ...] [--engine original refactored] [--stress 8 64] [--diffs build/parity]
+    python3 converter_parity.py --engine refactored-unfiltered refactored     # prefilter regression check
+
+Exits with status 1 if any section differs from the baseline or fails to convert.
+"""
+import contextlib
+import difflib
+import glob
+import importlib
+import io
+import json
+import logging
+import random
+import re
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import prefilter
+
+logger = logging.getLogger('md2latex.parity')
+
+DEFAULT_ENGINES = ('original', 'refactored')
+DEFAULT_STRESS = (8, 64)
+DEFAULT_REPEATS = 3
+DIFF_CONTEXT = 2
+
+Converter = Callable[[str], str]
+
+
+# ---------------------------------------------------------------------------
+# Engines
+# ---------------------------------------------------------------------------
+
+def _original_engine(images: bool, listings: bool) -> Converter:
+    import auto_transcribe_md_to_tex as original
+    original.PREPROCESS_IMAGES = images
+    original.PRERENDER_LISTINGS = listings
+    return original.md_to_latex
+
+
+def _refactored_engine(images: bool, listings: bool) -> Converter:
+    from md2latex.converter import MarkdownToLatexConverter
+    return MarkdownToLatexConverter('', preprocess_images=images,
+                                    prerender_listings=listings).convert_section_content_to_latex
+
+
+def _unfiltered(engine: Callable[[bool, bool], Converter]) -> Callable[[bool, bool], Converter]:
+    def build(images: bool, listings: bool) -> Converter:
+        convert = engine(images, listings)
+
+        def convert_unfiltered(md: str) -> str:
+            with prefilter.disabled():
+                return convert(md)
+        return convert_unfiltered
+    return build
+
+
+ENGINES: Dict[str, Callable[[bool, bool], Converter]] = {
+    'original': _original_engine,
+    'refactored': _refactored_engine,
+    'original-unfiltered': _unfiltered(_original_engine),
+    'refactored-unfiltered': _unfiltered(_refactored_engine),
+}
+
+
+def load_engine(spec: str, images: bool = False, listings: bool = False) -> Tuple[str, Converter]:
+    """
+    Resolve an engine name or ``[name=]module:function`` spec.
+
+    Raises:
+        ValueError: If the spec names no known engine or callable
+        ImportError: If the module cannot be imported
+    """
+    if spec in ENGINES:
+        return spec, ENGINES[spec](images, listings)
+    name, _, target = spec.rpartition('=')
+    module_name, _, attr = target.partition(':')
+    if not attr:
+        raise ValueError(f"unknown engine {spec!r} (expected one of {', '.join(ENGINES)} or module:function)")
+    func = getattr(importlib.import_module(module_name), attr, None)
+    if not callable(func):
+        raise ValueError(f"{target} is not a callable")
+    return name or target, func
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    ``(title, content)`` per ``##`` section, as the build extracts them.
+
+    A document without ``##`` headings is a single section titled by its
+    first line.
+    """
+    text = text.replace('\r\n', '\n')
+    headings = list(re.finditer(r'^##\s+(.+?)$', text, flags=re.MULTILINE))
+    if not headings:
+        return [(text.strip().split('\n', 1)[0][:60], text.strip())]
+    sections = []
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        sections.append((match.group(1).strip(), text[match.end() + 1:end].strip()))
+    return sections
+
+
+_WORDS = ('digit', 'carry', 'tensor', 'place', 'token', 'addition', 'lookup', 'table', 'batch',
+          'operand', 'complement', 'section', 'marking', 'transition', 'value', 'pattern')
+
+
+def stress_document(sections: int, seed: int = 0) -> str:
+    """
+    Markdown exercising every construct the converters handle.
+
+    Args:
+        sections: Number of ``##`` sections, each a shuffled mix of blocks
+        seed: Random seed (documents are reproducible)
+    """
+    rng = random.Random(seed)
+
+    def words(n: int) -> str:
+        return ' '.join(rng.choice(_WORDS) for _ in range(n))
+
+    blocks = [
+        lambda: f"### {rng.randint(1, 9)}.{rng.randint(1, 9)} {words(3).title()}",
+        lambda: f"#### {words(2).title()}",
+        lambda: f"\\### {words(2).title()}",
+        lambda: f"\\## ## {words(2).title()}",
+        lambda: (f"The **{words(2)}** of a *{words(1)}* uses [[{words(2)}]] with `n^k - b` and "
+                 f"`(n^k - b)`, so `a_i + b_i` carries into snake_case_{rng.choice(_WORDS)} --- "
+                 f"issue #{rng.randint(1, 99)} at 50% & more."),
+        lambda: f"For $x ∈ ℕ$ and $y ≤ ∞$ we have $x ⊕ y → x + y$; {words(8)}.",
+        lambda: f"- {words(2).title()}: {words(6)}",
+        lambda: f"- {words(7)}",
+        lambda: f"* {words(2).title()}: {words(5)}\n\n{words(12)}\n{words(9)}",
+        lambda: f"* {words(6)}",
+        lambda: f"* {words(4)}\n* {words(3)}: {words(4)}",
+        lambda: (f"```python\ndef {rng.choice(_WORDS)}_step(a, b):\n    # {words(4)}\n"
+                 f"    return (a + b) % 10, (a + b) // 10\n```"),
+        lambda: f"```pseudocode\n# {words(3)}\nFOR i <- n DOWNTO 1: s_i <- a_i + b_i\n```",
+        lambda: f"```\n{words(5)} = {{'k': [1, 2]}}\n```",
+        lambda: f'See <mcfile name="{rng.choice(_WORDS)}.py" path="/src/{rng.choice(_WORDS)}.py"></mcfile>.',
+        lambda: f"Escaped \\_ and \\% and `already\\_escaped`, {words(5)} `x^2` `~{rng.choice(_WORDS)}`.",
+        # Inline code whose escapes become placeholders only later passes see
+        lambda: f"See `{rng.choice(_WORDS)} # {rng.choice(_WORDS)}` and `50\\% off` here.",
+    ]
+    parts = [f"# {words(3).title()}\n\n{words(20)}"]
+    for s in range(sections):
+        parts.append(f"## {s + 1}. {words(3).title()}")
+        for _ in range(rng.randint(6, 14)):
+            parts.append(rng.choice(blocks)())
+    return '\n\n'.join(parts) + '\n'
+
+
+def default_corpus() -> Dict[str, str]:
+    """The repository's Markdown files (top level and ``md/``), keyed by path."""
+    paths = sorted(set(glob.glob('*.md')) | set(glob.glob('md/*.md')))
+    return {path: Path(path).read_text(encoding='utf-8') for path in paths}
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+@dataclass
+class EngineRun:
+    """One engine's results on one document."""
+
+    outputs: List[str]
+    errors: Dict[int, str] = field(default_factory=dict)
+    seconds: float = float('inf')
+    peak_bytes: int = 0
+    # Prefiltered pass -> (runs, skips) over one conversion of every section
+    passes: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+
+@dataclass
+class DocumentReport:
+    """Parity and timings of every engine on one document."""
+
+    name: str
+    chars: int
+    titles: List[str]
+    runs: Dict[str, EngineRun]
+    differing: Dict[str, List[int]]
+
+    @property
+    def ok(self) -> bool:
+        return not any(self.differing.values()) and not any(r.errors for r in self.runs.values())
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the converters' prints and warnings (missing images and the like)."""
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.ERROR)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        root.setLevel(level)
+
+
+def _convert_all(convert: Converter, sections: Sequence[str]) -> Tuple[List[str], Dict[int, str]]:
+    outputs, errors = [], {}
+    for i, content in enumerate(sections):
+        try:
+            outputs.append(convert(content))
+        except Exception as e:
+            errors[i] = f"{type(e).__name__}: {e}"
+            outputs.append('')
+    return outputs, errors
+
+
+def _pass_counts() -> Dict[str, Tuple[int, int]]:
+    """Runs and skips of every prefiltered pass since the last reset, over all filters."""
+    totals: Dict[str, Tuple[int, int]] = {}
+    for passes in prefilter.counts().values():
+        for key, (runs, skips) in passes.items():
+            old_runs, old_skips = totals.get(key, (0, 0))
+            totals[key] = (old_runs + runs, old_skips + skips)
+    return totals
+
+
+def measure(convert: Converter, sections: Sequence[str], repeats: int = DEFAULT_REPEATS) -> EngineRun:
+    """
+    Convert every section: once for outputs, ``repeats`` times for timing, once traced for memory.
+
+    Returns:
+        EngineRun with the outputs, per-section errors, the prefilter counts
+        of the first conversion, the best total time and the largest
+        per-section allocation peak
+    """
+    with _quiet():
+        prefilter.reset_counts()
+        outputs, errors = _convert_all(convert, sections)
+        run = EngineRun(outputs, errors, passes=_pass_counts())
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _convert_all(convert, sections)
+            run.seconds = min(run.seconds, time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            for content in sections:
+                tracemalloc.reset_peak()
+                with contextlib.suppress(Exception):
+                    convert(content)
+                run.peak_bytes = max(run.peak_bytes, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return run
+
+
+def compare(name: str, text: str, engines: Dict[str, Converter], repeats: int = DEFAULT_REPEATS) -> DocumentReport:
+    """Run every engine on one document and diff each against the first."""
+    sections = split_sections(text)
+    contents = [content for _, content in sections]
+    runs = {engine: measure(convert, contents, repeats) for engine, convert in engines.items()}
+    baseline, *others = runs
+    differing = {engine: [i for i, (x, y) in enumerate(zip(runs[baseline].outputs, runs[engine].outputs))
+                          if x != y]
+                 for engine in others}
+    return DocumentReport(name, len(text), [title for title, _ in sections], runs, differing)
+
+
+def section_diff(report: DocumentReport, engine: str, index: int) -> str:
+    """Unified diff of one section between the baseline engine and ``engine``."""
+    baseline = next(iter(report.runs))
+    a = report.runs[baseline].outputs[index].splitlines(keepends=True)
+    b = report.runs[engine].outputs[index].splitlines(keepends=True)
+    title = report.titles[index]
+    return ''.join(difflib.unified_diff(a, b, f"{baseline}: {title}", f"{engine}: {title}", n=DIFF_CONTEXT))
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')[:40] or 'section'
+
+
+def write_diffs(reports: Sequence[DocumentReport], directory: Path) -> List[Path]:
+    """Write ``<document>/<nn>-<title>.<engine>.diff`` for every differing section."""
+    written = []
+    for report in reports:
+        for engine, indices in report.differing.items():
+            for i in indices:
+                path = directory / _slug(report.name) / f"{i:02d}-{_slug(report.titles[i])}.{engine}.diff"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(section_diff(report, engine, i), encoding='utf-8')
+                written.append(path)
+    return written
+
+
+def print_report(reports: Sequence[DocumentReport], engines: Sequence[str], verbose: bool = False) -> None:
+    """Side-by-side parity, throughput and peak-memory table, then per-engine verdicts."""
+    baseline = engines[0]
+    header = f"{'document':<32} {'sections':>8} {'KiB':>7} " + ' '.join(
+        f"{e[:10] + ' KiB/s':>16} {'peak KiB':>9}" for e in engines) + '  parity'
+    print(header)
+    for report in reports:
+        cells = []
+        for engine in engines:
+            run = report.runs[engine]
+            rate = report.chars / run.seconds / 1024 if run.seconds > 0 else float('inf')
+            cells.append(f"{rate:>16.1f} {run.peak_bytes / 1024:>9.1f}")
+        same = len(report.titles) - len(set().union(*report.differing.values()))
+        errors = sum(len(r.errors) for r in report.runs.values())
+        parity = f"{same}/{len(report.titles)} identical" + (f", {errors} error(s)" if errors else '')
+        print(f"{report.name[:32]:<32} {len(report.titles):>8} {report.chars / 1024:>7.1f} "
+              + ' '.join(cells) + f"  {parity}")
+        for engine, run in report.runs.items():
+            for i, message in run.errors.items():
+                print(f"  {engine} failed on '{report.titles[i]}': {message}")
+        if verbose:
+            for engine, indices in report.differing.items():
+                for i in indices:
+                    print(section_diff(report, engine, i))
+
+    total_chars = sum(r.chars for r in reports)
+    base_time = sum(r.runs[baseline].seconds for r in reports)
+    print()
+    for engine in engines:
+        seconds = sum(r.runs[engine].seconds for r in reports)
+        peak = max(r.runs[engine].peak_bytes for r in reports)
+        line = f"{engine}: {total_chars / seconds / 1024:.1f} KiB/s, peak {peak / 1024:.1f} KiB"
+        if engine != baseline:
+            differing = sum(len(r.differing[engine]) for r in reports)
+            total = sum(len(r.titles) for r in reports)
+            verdict = 'identical' if differing == 0 else f"DIFFERS in {differing}/{total} sections"
+            line += f", {base_time / seconds:.2f}x {baseline}, output {verdict}"
+        passes: Dict[str, List[int]] = {}
+        for report in reports:
+            for key, counts in report.runs[engine].passes.items():
+                totals = passes.setdefault(key, [0, 0])
+                totals[0] += counts[0]
+                totals[1] += counts[1]
+        if passes:
+            skipped = sum(skips for _, skips in passes.values())
+            total = sum(runs + skips for runs, skips in passes.values())
+            line += f", prefilter skipped {skipped}/{total} passes ({skipped / total:.0%})"
+        print(line)
+        if verbose:
+            for key, (runs, skips) in sorted(passes.items(), key=lambda item: -item[1][1] / sum(item[1])):
+                print(f"  {key[:48]:<48} skipped {skips:>7}/{runs + skips:<7} ({skips / (runs + skips):.0%})")
+
+
+def main() -> int:
+    """Compare the converters over the corpus and print the report."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Diff and benchmark the Markdown converters section by section')
+    parser.add_argument('files', nargs='*', help='Markdown files (default: the repository\'s *.md and md/*.md)')
+    parser.add_argument('--engine', dest='engines', nargs='+', default=list(DEFAULT_ENGINES),
+                        help=f"Engines to compare, baseline first ({', '.join(ENGINES)} or name=module:function)")
+    parser.add_argument('--stress', type=int, nargs='*', default=list(DEFAULT_STRESS),
+                        help='Section counts of the generated stress documents (none to skip)')
+    parser.add_argument('--seed', type=int, default=0, help='Stress document seed')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='Timed repetitions')
+    parser.add_argument('--images', action='store_true', help='Preprocess referenced images as the build does')
+    parser.add_argument('--listings', action='store_true', help='Pre-render code blocks as the build does')
+    parser.add_argument('--diffs', help='Write per-section diffs into this directory')
+    parser.add_argument('--json', help='Write the report as JSON to this file')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every differing section\'s diff')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    try:
+        engines = dict(load_engine(spec, args.images, args.listings) for spec in args.engines)
+    except (ImportError, ValueError) as e:
+        logger.error(f"Cannot load engine: {e}")
+        return 2
+
+    try:
+        corpus = {path: Path(path).read_text(encoding='utf-8') for path in args.files} if args.files \
+            else default_corpus()
+    except OSError as e:
+        logger.error(f"Cannot read corpus: {e}")
+        return 2
+    for count in args.stress:
+        corpus[f"stress-{count}"] = stress_document(count, args.seed + count)
+
+    reports = [compare(name, text, engines, args.repeats) for name, text in corpus.items()]
+    print_report(reports, list(engines), args.verbose)
+    if args.diffs:
+        written = write_diffs(reports, Path(args.diffs))
+        print(f"Wrote {len(written)} diff(s) to {args.diffs}")
+    if args.json:
+        data = [{'document': r.name, 'chars': r.chars, 'sections': r.titles, 'differing': r.differing,
+                 'engines': {e: {k: v for k, v in asdict(run).items() if k != 'outputs'}
+                             for e, run in r.runs.items()}}
+                for r in reports]
+        Path(args.json).write_text(json.dumps(data, indent=2) + '\n', encoding='utf-8')
+    return 0 if all(r.ok for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
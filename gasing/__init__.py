@@ -0,0 +1,57 @@
+"""
+Executable GASing arithmetic.
+
+The algorithms of the paper's appendix listings, implemented on compact
+``uint8`` digit arrays with batched entry points that process many operand
+pairs per call. Requires NumPy. Lookup tables for the core operator live
+in :mod:`gasing.tables`.
+
+Example:
+    >>> from gasing import to_digits, from_digits, add
+    >>> from_digits(add(to_digits(478), to_digits(256)))
+    734
+"""
+from .digits import (
+    DEFAULT_BASE,
+    DIGIT_DTYPE,
+    from_digit_matrix,
+    from_digits,
+    from_string,
+    normalize,
+    pad,
+    to_digit_matrix,
+    to_digits,
+    to_string,
+)
+from .divide import batch_divmod, divide
+from .engine import (
+    add,
+    batch_add,
+    batch_multiply,
+    batch_subtract,
+    multiply,
+    resolve_carries,
+    subtract,
+)
+
+__all__ = [
+    'DEFAULT_BASE',
+    'DIGIT_DTYPE',
+    'add',
+    'batch_add',
+    'batch_divmod',
+    'batch_multiply',
+    'batch_subtract',
+    'divide',
+    'from_digit_matrix',
+    'from_digits',
+    'from_string',
+    'multiply',
+    'normalize',
+    'pad',
+    'resolve_carries',
+    'subtract',
+    'to_digit_matrix',
+    'to_digits',
+    'to_string',
+]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark sequential against carry-lookahead addition.
+
+For each batch size, operands of increasing length are added with the
+digit-by-digit column loop and with both prefix scans, and the crossover
+length (the shortest operand at which lookahead is faster) is reported.
+The ``LOOKAHEAD_MIN_WIDTH``/``LOOKAHEAD_MAX_ROWS`` thresholds used by
+``carry='auto'`` come from this benchmark.
+
+Usage:
+    python3 -m gasing.bench_carry [--rows 1 64 1024] [--max-digits 100000]
+"""
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .carry import SCANS, carry_lookahead_add
+from .engine import batch_add
+
+
+def best_time(func: Callable[[], object], repeat: int = 5, budget: float = 2.0) -> float:
+    """Return the best of ``repeat`` timings, stopping early once ``budget`` seconds are spent."""
+    best = float('inf')
+    spent = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent > budget:
+            break
+    return best
+
+
+def lengths_up_to(max_digits: int) -> List[int]:
+    """Operand lengths 1, 2, 4, ... up to ``max_digits`` (always included)."""
+    lengths = []
+    length = 1
+    while length < max_digits:
+        lengths.append(length)
+        length *= 2
+    lengths.append(max_digits)
+    return lengths
+
+
+def run(rows: int, max_digits: int, base: int = 10, seed: int = 0,
+        max_cells: int = 50_000_000) -> List[Dict[str, float]]:
+    """
+    Time every carry mode for one batch size.
+
+    Args:
+        rows: Operand pairs per batch
+        max_digits: Longest operand length
+        base: Digit base
+        seed: Random seed
+        max_cells: Skip lengths whose batch would exceed this many digits
+
+    Returns:
+        One dict per length with ``digits``, ``sequential`` and one key per scan (seconds)
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for digits in lengths_up_to(max_digits):
+        if rows * digits > max_cells:
+            break
+        a = rng.integers(0, base, (rows, digits), dtype=np.uint8)
+        b = rng.integers(0, base, (rows, digits), dtype=np.uint8)
+        row = {'digits': digits,
+               'sequential': best_time(lambda: batch_add(a, b, base, carry='sequential'))}
+        for scan in SCANS:
+            row[scan] = best_time(lambda: carry_lookahead_add(a, b, base, scan=scan))
+        results.append(row)
+    return results
+
+
+def crossover(results: List[Dict[str, float]], scan: str = 'accumulate') -> Optional[int]:
+    """Shortest length from which lookahead stays faster than the sequential loop."""
+    found = None
+    for row in results:
+        if row[scan] < row['sequential']:
+            if found is None:
+                found = int(row['digits'])
+        else:
+            found = None
+    return found
+
+
+def main() -> int:
+    """Print timing tables and crossover lengths."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark sequential vs carry-lookahead GASing addition')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 64, 1024], help='Batch sizes')
+    parser.add_argument('--max-digits', type=int, default=100_000, help='Longest operand length')
+    parser.add_argument('--base', type=int, default=10, help='Digit base')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        results = run(rows, args.max_digits, args.base)
+        print(f"\nbatch of {rows} pair(s)")
+        print(f"{'digits':>8} {'sequential':>12} " + ' '.join(f"{scan:>12}" for scan in SCANS) + f" {'speedup':>8}")
+        for row in results:
+            speedup = row['sequential'] / row['accumulate']
+            print(f"{row['digits']:>8} {row['sequential'] * 1e3:>10.3f}ms "
+                  + ' '.join(f"{row[scan] * 1e3:>10.3f}ms" for scan in SCANS)
+                  + f" {speedup:>7.2f}x")
+        length = crossover(results)
+        if length is None:
+            print("lookahead is not faster at any measured length")
+        else:
+            print(f"crossover: lookahead is faster from {length} digits")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the GASing multiplication methods against each other.
+
+For each batch size, operands of increasing length are multiplied with
+every method of ``batch_multiply`` (schoolbook, grid, Karatsuba, NTT) and
+the fastest is marked. Quadratic methods are skipped once their estimated
+work exceeds ``--max-work``. The thresholds used by ``method='auto'``
+(``GRID_*`` and ``SCHOOLBOOK_MAX_WIDTH``) come from this benchmark.
+
+Usage:
+    python3 -m gasing.bench_multiply [--rows 1 16 1024] [--max-digits 65536]
+"""
+import sys
+from typing import Dict, Iterator
+
+import numpy as np
+
+from .bench_carry import best_time, lengths_up_to
+from .engine import MULTIPLY_METHODS, _ntt_fits, batch_multiply
+
+METHODS = tuple(m for m in MULTIPLY_METHODS if m != 'auto')
+QUADRATIC = {'schoolbook', 'grid'}
+
+
+def run(rows: int, max_digits: int, base: int = 10, seed: int = 0,
+        max_work: float = 2e9, max_cells: int = 1 << 22) -> Iterator[Dict[str, float]]:
+    """
+    Time every multiplication method for one batch size.
+
+    Args:
+        rows: Operand pairs per batch
+        max_digits: Longest operand length
+        base: Digit base
+        seed: Random seed
+        max_work: Skip a method once ``rows * digits^2`` (quadratic) or
+            ``rows * digits^1.6`` (Karatsuba) exceeds this
+        max_cells: Stop once a batch would exceed this many digits, which
+            bounds the NTT's working memory
+
+    Yields:
+        One dict per length with ``digits`` and one key per timed method (seconds)
+    """
+    rng = np.random.default_rng(seed)
+    for digits in lengths_up_to(max_digits):
+        if digits < 4:
+            continue
+        if rows * digits > max_cells:
+            break
+        a = rng.integers(0, base, (rows, digits), dtype=np.uint8)
+        b = rng.integers(0, base, (rows, digits), dtype=np.uint8)
+        row: Dict[str, float] = {'digits': digits}
+        for method in METHODS:
+            if method in QUADRATIC and rows * digits ** 2 > max_work:
+                continue
+            if method == 'karatsuba' and rows * digits ** 1.6 > max_work:
+                continue
+            if method == 'ntt' and not _ntt_fits(digits, digits, base):
+                continue
+            row[method] = best_time(lambda: batch_multiply(a, b, base, method=method))
+        if len(row) == 1:
+            break
+        yield row
+
+
+def main() -> int:
+    """Print timing tables with the winning method per length."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark GASing multiplication methods')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 16, 1024], help='Batch sizes')
+    parser.add_argument('--max-digits', type=int, default=65536, help='Longest operand length')
+    parser.add_argument('--base', type=int, default=10, help='Digit base')
+    parser.add_argument('--max-work', type=float, default=2e9, help='Work budget per measurement')
+    parser.add_argument('--max-cells', type=int, default=1 << 22, help='Largest batch size in digits')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"\nbatch of {rows} pair(s)")
+        print(f"{'digits':>8} " + ' '.join(f"{m:>12}" for m in METHODS) + f" {'fastest':>11}")
+        for row in run(rows, args.max_digits, args.base, max_work=args.max_work, max_cells=args.max_cells):
+            timed = {m: row[m] for m in METHODS if m in row}
+            cells = [f"{row[m] * 1e3:>10.3f}ms" if m in row else f"{'-':>12}" for m in METHODS]
+            print(f"{row['digits']:>8} " + ' '.join(cells) + f" {min(timed, key=timed.get):>11}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Compact digit-array representation used by the GASing engine.
+
+A number is a one-dimensional ``uint8`` NumPy array of digits, most
+significant digit first - the order in which the paper's GASing algorithms
+read their operands. A batch of numbers is a two-dimensional array with one
+number per row, right-aligned and padded with leading zeros to a common
+width. Any base from 2 to 256 fits in ``uint8`` digits.
+"""
+import sys
+from contextlib import contextmanager
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+DIGIT_DTYPE = np.uint8
+DEFAULT_BASE = 10
+
+# int64 holds any 18-digit decimal exactly
+_MAX_INT64_DIGITS = 18
+
+
+@contextmanager
+def _unlimited_int_digits():
+    """Lift Python's int/str conversion limit (3.11+) for very long operands."""
+    get_limit = getattr(sys, 'get_int_max_str_digits', None)
+    if get_limit is None:
+        yield
+        return
+    previous = get_limit()
+    sys.set_int_max_str_digits(0)
+    try:
+        yield
+    finally:
+        sys.set_int_max_str_digits(previous)
+
+
+def _check_base(base: int) -> None:
+    if not 2 <= base <= 256:
+        raise ValueError(f"base must be between 2 and 256, got {base}")
+
+
+def to_digits(value: int, base: int = DEFAULT_BASE) -> np.ndarray:
+    """
+    Convert a non-negative ``int`` to a digit array.
+
+    Args:
+        value: Number to convert
+        base: Digit base
+
+    Returns:
+        ``uint8`` array, most significant digit first (``[0]`` for zero)
+    """
+    _check_base(base)
+    if value < 0:
+        raise ValueError("GASing digit arrays hold non-negative numbers")
+    if base == 10:
+        with _unlimited_int_digits():
+            text = str(value)
+        return np.frombuffer(text.encode('ascii'), dtype=DIGIT_DTYPE) - ord('0')
+    if base == 256:
+        raw = value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big')
+        return np.frombuffer(raw, dtype=DIGIT_DTYPE).copy()
+    digits = []
+    while True:
+        value, digit = divmod(value, base)
+        digits.append(digit)
+        if not value:
+            break
+    return np.array(digits[::-1], dtype=DIGIT_DTYPE)
+
+
+def from_digits(digits: Sequence[int], base: int = DEFAULT_BASE) -> int:
+    """
+    Convert a digit array (most significant first) back to an ``int``.
+    """
+    _check_base(base)
+    digits = np.asarray(digits, dtype=DIGIT_DTYPE)
+    if digits.size == 0:
+        return 0
+    if base == 10:
+        with _unlimited_int_digits():
+            return int((digits + ord('0')).tobytes())
+    if base == 256:
+        return int.from_bytes(digits.tobytes(), 'big')
+    value = 0
+    for digit in digits.tolist():
+        value = value * base + digit
+    return value
+
+
+def from_string(text: str) -> np.ndarray:
+    """Convert a decimal digit string (as used in the paper's listings) to a digit array."""
+    text = text.strip()
+    if not text.isdigit():
+        raise ValueError(f"not a decimal digit string: {text!r}")
+    return np.frombuffer(text.encode('ascii'), dtype=DIGIT_DTYPE) - ord('0')
+
+
+def to_string(digits: Sequence[int]) -> str:
+    """Convert a decimal digit array to its string form."""
+    return (np.asarray(digits, dtype=DIGIT_DTYPE) + ord('0')).tobytes().decode('ascii')
+
+
+def normalize(digits: np.ndarray) -> np.ndarray:
+    """Strip leading zeros, keeping a single ``0`` for zero."""
+    nonzero = np.flatnonzero(digits)
+    if nonzero.size == 0:
+        return digits[-1:] if digits.size else np.zeros(1, dtype=DIGIT_DTYPE)
+    return digits[nonzero[0]:]
+
+
+def pad(digits: np.ndarray, width: int) -> np.ndarray:
+    """Left-pad a digit array with zeros to ``width`` digits."""
+    if digits.size >= width:
+        return digits
+    return np.concatenate([np.zeros(width - digits.size, dtype=DIGIT_DTYPE), digits])
+
+
+def pad_matrix(matrix: np.ndarray, width: int) -> np.ndarray:
+    """Left-pad every row of a digit matrix with zeros to ``width`` columns."""
+    n, current = matrix.shape
+    if current >= width:
+        return matrix
+    out = np.zeros((n, width), dtype=matrix.dtype)
+    out[:, width - current:] = matrix
+    return out
+
+
+def to_digit_matrix(values: Iterable[int], width: int = 0, base: int = DEFAULT_BASE) -> np.ndarray:
+    """
+    Pack many non-negative ints into a batch digit matrix.
+
+    Args:
+        values: Numbers to pack
+        width: Minimum number of digit columns (grown to fit the widest value)
+        base: Digit base
+
+    Returns:
+        ``uint8`` array of shape ``(len(values), width)``
+    """
+    _check_base(base)
+    values = list(values)
+    if base == 10:
+        if any(v < 0 for v in values):
+            raise ValueError("GASing digit arrays hold non-negative numbers")
+        with _unlimited_int_digits():
+            texts = [str(v) for v in values]
+        width = max([width] + [len(t) for t in texts])
+        if not values:
+            return np.zeros((0, width), dtype=DIGIT_DTYPE)
+        raw = np.array([t.zfill(width) for t in texts], dtype=f'S{width}')
+        return raw.view(DIGIT_DTYPE).reshape(len(values), width) - ord('0')
+    rows = [to_digits(v, base) for v in values]
+    width = max([width] + [r.size for r in rows])
+    out = np.zeros((len(rows), width), dtype=DIGIT_DTYPE)
+    for i, row in enumerate(rows):
+        out[i, width - row.size:] = row
+    return out
+
+
+def from_digit_matrix(matrix: np.ndarray, base: int = DEFAULT_BASE) -> List[int]:
+    """
+    Unpack a batch digit matrix into a list of ints.
+
+    Decimal batches up to 18 digits wide are converted with one int64
+    matrix-vector product; wider ones are combined from 18-digit chunks.
+    """
+    _check_base(base)
+    matrix = np.asarray(matrix)
+    n, width = matrix.shape
+    if base == 10 and width <= _MAX_INT64_DIGITS:
+        powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+        return (matrix.astype(np.int64) @ powers).tolist()
+    if base == 10:
+        chunks = []
+        for start in range(0, width, _MAX_INT64_DIGITS):
+            block = matrix[:, max(0, width - start - _MAX_INT64_DIGITS):width - start]
+            chunks.append(from_digit_matrix(block, base))
+        values = [0] * n
+        for k, chunk in enumerate(chunks):
+            scale = 10 ** (_MAX_INT64_DIGITS * k)
+            values = [v + c * scale for v, c in zip(values, chunk)]
+        return values
+    return [from_digits(row, base) for row in matrix]
+
+
+def block_dtype(block_base: int) -> np.dtype:
+    """Smallest unsigned dtype holding the digits of ``block_base``."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if block_base - 1 <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def to_chunks(matrix: np.ndarray, chunk: int, base: int = DEFAULT_BASE) -> np.ndarray:
+    """
+    Group a digit matrix into blocks of ``chunk`` digits.
+
+    Each block becomes one digit of base ``base ** chunk``; rows are
+    left-padded with zeros to a whole number of blocks.
+
+    Returns:
+        ``(n, ceil(width / chunk))`` matrix of block values
+    """
+    n, width = matrix.shape
+    blocks = -(-width // chunk)
+    padded = pad_matrix(matrix, blocks * chunk).reshape(n, blocks, chunk)
+    powers = base ** np.arange(chunk - 1, -1, -1, dtype=np.uint64)
+    return (padded @ powers).astype(block_dtype(base ** chunk))
+
+
+def from_chunks(blocks: np.ndarray, chunk: int, base: int = DEFAULT_BASE) -> np.ndarray:
+    """Split a matrix of ``base ** chunk`` block values back into digits (inverse of :func:`to_chunks`)."""
+    n, count = blocks.shape
+    powers = base ** np.arange(chunk - 1, -1, -1, dtype=np.uint64)
+    digits = (blocks.astype(np.uint64)[:, :, None] // powers) % np.uint64(base)
+    return digits.astype(DIGIT_DTYPE).reshape(n, count * chunk)
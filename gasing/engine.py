@@ -0,0 +1,324 @@
+"""
+Executable GASing arithmetic on digit arrays.
+
+These are the algorithms of the paper's appendix listings
+(``GASing_Addition``, ``GASing_Subtraction``, ``GASing_Multiplication``)
+implemented on ``uint8`` digit arrays instead of strings, so results are
+written in place rather than built by quadratic ``result += str(digit)``
+concatenation.
+
+The batched functions take digit matrices (one operand per row, see
+:mod:`gasing.digits`) and process a whole column of digit positions with
+one vector operation, so the Python-level loop runs once per digit position
+regardless of how many operand pairs are in the batch. Addition and
+subtraction can instead resolve carries with a carry-lookahead prefix scan
+(see :mod:`gasing.carry`), which wins for long operands in small batches.
+
+Passing ``tables`` (see :mod:`gasing.tables`) replaces digit arithmetic with
+gathers from precomputed sum/carry and product tables; with multi-digit
+chunks each loop step then covers several digits.
+"""
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+
+from .carry import carry_lookahead_add, lookahead_resolve
+from .digits import DEFAULT_BASE, DIGIT_DTYPE, _check_base, from_chunks, normalize, pad_matrix, to_chunks
+from .multiply import NTT_MAX_LENGTH, NTT_PRIME, grid_columns, karatsuba_columns, ntt_columns
+
+if TYPE_CHECKING:
+    from .tables import DigitTables
+
+CARRY_MODES = ('auto', 'sequential', 'lookahead')
+
+# Crossover measured with `python3 -m gasing.bench_carry`: the sequential
+# column loop costs one vector step per digit, so lookahead wins once
+# operands are a few digits long, unless the batch is wide enough that each
+# column step is already amortised over many rows.
+LOOKAHEAD_MIN_WIDTH = 8
+LOOKAHEAD_MAX_ROWS = 128
+
+MULTIPLY_METHODS = ('auto', 'schoolbook', 'grid', 'karatsuba', 'ntt')
+
+# Crossovers measured with `python3 -m gasing.bench_multiply`: a single pair
+# convolves its grid in C up to about 1k digits, small batches build the
+# whole grid up to about 128 digits, larger batches are fastest with the
+# row-accumulating schoolbook loop up to about 256 digits, and the NTT wins
+# above all of them.
+GRID_MAX_WIDTH = 1024
+GRID_BATCH_MAX_ROWS = 32
+GRID_BATCH_MAX_WIDTH = 128
+SCHOOLBOOK_MAX_WIDTH = 256
+
+
+def _as_batch(a: np.ndarray) -> np.ndarray:
+    a = np.asarray(a, dtype=DIGIT_DTYPE)
+    return a[None, :] if a.ndim == 1 else a
+
+
+def _align(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    if a.shape[0] != b.shape[0]:
+        raise ValueError(f"batch sizes differ: {a.shape[0]} and {b.shape[0]}")
+    width = max(a.shape[1], b.shape[1])
+    return pad_matrix(a, width), pad_matrix(b, width)
+
+
+def _add_columns(a_cols: np.ndarray, b_cols: np.ndarray, carry: np.ndarray, base: int) -> np.ndarray:
+    """
+    Add two column-major digit matrices with a per-row carry in.
+
+    Args:
+        a_cols, b_cols: ``(width, n)`` digit arrays (column j holds digit j of every row)
+        carry: ``(n,)`` carry-in (0 or 1)
+        base: Digit base
+
+    Returns:
+        ``(width + 1, n)`` column-major sum, the first row being the final carry
+    """
+    width, n = a_cols.shape
+    out = np.empty((width + 1, n), dtype=DIGIT_DTYPE)
+    carry = carry.astype(np.uint16)
+    column = np.empty(n, dtype=np.uint16)
+    for j in range(width - 1, -1, -1):
+        np.add(a_cols[j], b_cols[j], out=column, dtype=np.uint16)
+        column += carry
+        np.greater_equal(column, base, out=carry, casting='unsafe')
+        out[j + 1] = column - base * carry
+    out[0] = carry
+    return out
+
+
+def _check_tables(tables: Optional['DigitTables'], base: int) -> None:
+    if tables is not None and tables.base != base:
+        raise ValueError(f"lookup tables are for base {tables.base}, not {base}")
+
+
+def _add_table(a: np.ndarray, b: np.ndarray, carry_in: np.ndarray, tables: 'DigitTables') -> np.ndarray:
+    """Add aligned digit matrices chunk by chunk with table gathers, returning ``(n, width + 1)``."""
+    n, width = a.shape
+    k, base = tables.chunk, tables.base
+    a_blocks = np.ascontiguousarray(to_chunks(a, k, base).T)
+    b_blocks = np.ascontiguousarray(to_chunks(b, k, base).T)
+    count = a_blocks.shape[0]
+    out = np.empty((count, n), dtype=tables.sum_digit.dtype)
+    carry = carry_in
+    for j in range(count - 1, -1, -1):
+        out[j], carry = tables.add(a_blocks[j], b_blocks[j], carry)
+    digits = from_chunks(np.ascontiguousarray(out.T), k, base)
+    # Chunk padding only adds leading zeros, so the sum fits the last width + 1 columns
+    result = np.empty((n, digits.shape[1] + 1), dtype=DIGIT_DTYPE)
+    result[:, 0] = carry
+    result[:, 1:] = digits
+    return np.ascontiguousarray(result[:, -(width + 1):])
+
+
+def _use_lookahead(carry: str, n: int, width: int) -> bool:
+    if carry not in CARRY_MODES:
+        raise ValueError(f"Unknown carry mode {carry!r}; expected one of {CARRY_MODES}")
+    if carry == 'auto':
+        return width >= LOOKAHEAD_MIN_WIDTH and n <= LOOKAHEAD_MAX_ROWS
+    return carry == 'lookahead'
+
+
+def _add_rows(a: np.ndarray, b: np.ndarray, carry_in: np.ndarray, base: int, carry: str,
+              tables: Optional['DigitTables'] = None) -> np.ndarray:
+    """Add aligned row-major digit matrices with a carry-in, returning ``(n, width + 1)``."""
+    n, width = a.shape
+    if tables is not None:
+        return _add_table(a, b, carry_in, tables)
+    if _use_lookahead(carry, n, width):
+        return carry_lookahead_add(a, b, base, carry_in)
+    cols = _add_columns(np.ascontiguousarray(a.T), np.ascontiguousarray(b.T), carry_in, base)
+    return np.ascontiguousarray(cols.T)
+
+
+def batch_add(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE, carry: str = 'auto',
+              tables: Optional['DigitTables'] = None) -> np.ndarray:
+    """
+    Add many operand pairs at once.
+
+    Args:
+        a, b: Digit matrices with the same number of rows
+        base: Digit base
+        carry: ``'sequential'`` (digit-by-digit, as in the listing),
+            ``'lookahead'`` (prefix scan) or ``'auto'``; ignored when ``tables`` is given
+        tables: Lookup tables to add chunk by chunk with gathers
+
+    Returns:
+        Digit matrix of width ``max(width) + 1`` holding ``a + b`` per row
+    """
+    _check_base(base)
+    _check_tables(tables, base)
+    a, b = _align(_as_batch(a), _as_batch(b))
+    return _add_rows(a, b, np.zeros(a.shape[0], dtype=np.uint16), base, carry, tables)
+
+
+def batch_subtract(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE,
+                   carry: str = 'auto', tables: Optional['DigitTables'] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Subtract many operand pairs at once by complemented addition.
+
+    As in ``GASing_Subtraction``, ``a - b`` is computed as ``a`` plus the
+    base's complement of ``b``. An overflow carry means the result is
+    non-negative; otherwise the magnitude is the complement of the sum.
+
+    Args:
+        a, b: Digit matrices with the same number of rows
+        base: Digit base
+        carry: Carry resolution mode, as for :func:`batch_add`
+        tables: Lookup tables, as for :func:`batch_add`
+
+    Returns:
+        Tuple of (magnitude digit matrix, boolean array marking negative rows)
+    """
+    _check_base(base)
+    _check_tables(tables, base)
+    a, b = _align(_as_batch(a), _as_batch(b))
+    n = a.shape[0]
+    # (base - 1)'s complement of b; the +1 enters as the carry-in
+    total = _add_rows(a, (base - 1) - b, np.ones(n, dtype=np.uint16), base, carry, tables)
+    negative = total[:, 0] == 0
+    magnitude = total[:, 1:]
+    if negative.any():
+        # Magnitude of a negative result is the base's complement of the sum
+        complement = (base - 1) - magnitude[negative]
+        fixed = _add_rows(complement, np.zeros_like(complement),
+                          np.ones(int(negative.sum()), dtype=np.uint16), base, carry, tables)
+        magnitude[negative] = fixed[:, 1:]
+    return np.ascontiguousarray(magnitude), negative
+
+
+def _ntt_fits(wa: int, wb: int, base: int) -> bool:
+    return (min(wa, wb) * (base - 1) ** 2 < NTT_PRIME
+            and 1 << max(0, (wa + wb - 2).bit_length()) <= NTT_MAX_LENGTH)
+
+
+def _multiply_method(method: str, n: int, wa: int, wb: int, base: int) -> str:
+    if method not in MULTIPLY_METHODS:
+        raise ValueError(f"Unknown multiplication method {method!r}; expected one of {MULTIPLY_METHODS}")
+    if method != 'auto':
+        return method
+    width = min(wa, wb)
+    if n == 1 and width <= GRID_MAX_WIDTH:
+        return 'grid'
+    if 1 < n <= GRID_BATCH_MAX_ROWS and width <= GRID_BATCH_MAX_WIDTH:
+        return 'grid'
+    if n > 1 and width <= SCHOOLBOOK_MAX_WIDTH:
+        return 'schoolbook'
+    return 'ntt' if _ntt_fits(wa, wb, base) else 'karatsuba'
+
+
+def batch_multiply(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE,
+                   tables: Optional['DigitTables'] = None, method: str = 'auto') -> np.ndarray:
+    """
+    Multiply many operand pairs at once.
+
+    ``'schoolbook'`` accumulates the partial-product grid ``a[i] * b[j]`` into
+    place-value columns one grid row at a time. ``'grid'`` builds the whole
+    grid as one outer product and sums its anti-diagonals, ``'karatsuba'``
+    and ``'ntt'`` compute the same column sums in sub-quadratic time (see
+    :mod:`gasing.multiply`). Every method resolves carries once at the end,
+    in the sense of the paper's structured addition.
+
+    Args:
+        a, b: Digit matrices with the same number of rows
+        base: Digit base
+        tables: Lookup tables to multiply chunk by chunk with gathers
+            (schoolbook only; implies ``method='schoolbook'``)
+        method: One of :data:`MULTIPLY_METHODS`; ``'auto'`` picks by size
+
+    Returns:
+        Digit matrix of width ``width(a) + width(b)`` holding ``a * b`` per row
+    """
+    _check_base(base)
+    _check_tables(tables, base)
+    a, b = _as_batch(a), _as_batch(b)
+    if a.shape[0] != b.shape[0]:
+        raise ValueError(f"batch sizes differ: {a.shape[0]} and {b.shape[0]}")
+    if tables is not None:
+        return _multiply_table(a, b, tables)
+    n, wa = a.shape
+    wb = b.shape[1]
+    method = _multiply_method(method, n, wa, wb, base)
+    if method != 'schoolbook':
+        column_sums = {'grid': grid_columns, 'karatsuba': karatsuba_columns, 'ntt': ntt_columns}[method]
+        columns = np.zeros((n, wa + wb), dtype=np.uint64)
+        columns[:, 1:] = column_sums(a, b, base)
+        if _use_lookahead('auto', n, wa + wb):
+            return lookahead_resolve(columns, base)
+        return np.ascontiguousarray(resolve_carries(np.ascontiguousarray(columns.T), base).T)
+    # Column sums are bounded by min(wa, wb) * (base - 1)^2
+    acc = np.zeros((wa + wb, n), dtype=np.uint64)
+    b_cols = np.ascontiguousarray(b.T).astype(np.uint64)
+    for i in range(wa):
+        acc[i + 1:i + 1 + wb] += a[:, i].astype(np.uint64) * b_cols
+    return np.ascontiguousarray(resolve_carries(acc, base).T)
+
+
+def _multiply_table(a: np.ndarray, b: np.ndarray, tables: 'DigitTables') -> np.ndarray:
+    """Multiply digit matrices with block products gathered from the product table."""
+    k, base, B = tables.chunk, tables.base, tables.block_base
+    n, wa = a.shape
+    wb = b.shape[1]
+    a_blocks = to_chunks(a, k, base)
+    b_blocks = np.ascontiguousarray(to_chunks(b, k, base).T)
+    na, nb = a_blocks.shape[1], b_blocks.shape[0]
+    # Each block product contributes its low block to column i + j + 1 and
+    # its high block to column i + j
+    acc = np.zeros((na + nb, n), dtype=np.uint64)
+    for i in range(na):
+        low, high = tables.multiply(a_blocks[:, i], b_blocks)
+        acc[i + 1:i + 1 + nb] += low
+        acc[i:i + nb] += high
+    blocks = resolve_carries(acc, B, dtype=tables.prod_low.dtype)
+    digits = from_chunks(np.ascontiguousarray(blocks.T), k, base)
+    return np.ascontiguousarray(digits[:, -(wa + wb):])
+
+
+def resolve_carries(columns: np.ndarray, base: int = DEFAULT_BASE, dtype=DIGIT_DTYPE) -> np.ndarray:
+    """
+    Turn column sums into digits by propagating carries.
+
+    Args:
+        columns: ``(width, n)`` non-negative column sums, most significant first;
+            the first column must be large enough to absorb the final carry
+        base: Digit base
+        dtype: Output dtype (wider than ``uint8`` for block bases above 256)
+
+    Returns:
+        ``(width, n)`` digit array
+    """
+    width, n = columns.shape
+    out = np.empty((width, n), dtype=dtype)
+    carry = np.zeros(n, dtype=np.uint64)
+    for j in range(width - 1, -1, -1):
+        total = columns[j] + carry
+        carry, digit = np.divmod(total, np.uint64(base))
+        out[j] = digit
+    if carry.any():
+        raise OverflowError("result does not fit the output width")
+    return out
+
+
+def add(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE, carry: str = 'auto',
+        tables: Optional['DigitTables'] = None) -> np.ndarray:
+    """Add two digit arrays (``GASing_Addition``)."""
+    return normalize(batch_add(a, b, base, carry, tables)[0])
+
+
+def subtract(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE,
+             carry: str = 'auto', tables: Optional['DigitTables'] = None) -> Tuple[np.ndarray, bool]:
+    """
+    Subtract two digit arrays (``GASing_Subtraction``).
+
+    Returns:
+        Tuple of (magnitude, is_negative), as in the paper's listing
+    """
+    magnitude, negative = batch_subtract(a, b, base, carry, tables)
+    return normalize(magnitude[0]), bool(negative[0])
+
+
+def multiply(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE,
+             tables: Optional['DigitTables'] = None, method: str = 'auto') -> np.ndarray:
+    """Multiply two digit arrays (``GASing_Multiplication``)."""
+    return normalize(batch_multiply(a, b, base, tables, method)[0])
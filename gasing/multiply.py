@@ -0,0 +1,192 @@
+"""
+Grid, Karatsuba and NTT column sums for GASing multiplication.
+
+``GASing_Multiplication`` builds the partial-product grid of
+``images/GridBasedMultiplication.png`` (cell ``(i, j)`` holds ``a[i] * b[j]``),
+sums it along anti-diagonals (every cell with the same ``i + j`` has the
+same place value) and resolves the carries once. Summing anti-diagonals of
+an outer product is exactly the convolution of the two digit sequences, so
+the functions here all return the same thing, the uncarried column sums,
+computed three ways:
+
+* :func:`grid_columns` - the outer product as one vectorised array, with
+  the anti-diagonals summed by skewing the rows (row ``i`` shifted ``i``
+  places) and adding down the columns. Quadratic, but with no Python loop.
+* :func:`karatsuba_columns` - splits the operands in halves and trades one
+  of the four half-size grids for additions, recursing down to the grid.
+* :func:`ntt_columns` - number-theoretic transform modulo a prime, exact
+  while every column sum stays below the modulus.
+
+The engine's ``batch_multiply`` picks one per call and feeds the result to
+the carry resolution.
+"""
+from typing import Tuple
+
+import numpy as np
+
+# Batch slices are sized so a skewed grid holds at most this many cells
+GRID_MAX_CELLS = 1 << 24
+KARATSUBA_CUTOFF = 64
+
+# NTT prime 119 * 2^23 + 1 with primitive root 3: transforms up to 2^23 points
+NTT_PRIME = 998244353
+NTT_ROOT = 3
+NTT_MAX_LENGTH = 1 << 23
+
+
+def _sum_dtype(width: int, base: int) -> np.dtype:
+    """Narrowest dtype that holds ``width`` digit products without overflow."""
+    return np.dtype(np.uint32 if width * (base - 1) ** 2 < 2 ** 32 else np.uint64)
+
+
+def _skew_sum(grid: np.ndarray) -> np.ndarray:
+    """Sum the anti-diagonals of a batch of ``(wa, wb)`` grids."""
+    n, wa, wb = grid.shape
+    length = wa + wb - 1
+    padded = np.zeros((n, wa, wb + wa), dtype=grid.dtype)
+    padded[:, :, :wb] = grid
+    # With rows of length wa + wb - 1, cell (i, j) of the padded grid lands in
+    # row i, column i + j, so the column sums are the anti-diagonal sums.
+    skewed = padded.reshape(n, wa * (wb + wa))[:, :wa * length].reshape(n, wa, length)
+    return skewed.sum(axis=1)
+
+
+def grid_columns(a: np.ndarray, b: np.ndarray, base: int = 10) -> np.ndarray:
+    """
+    Column sums of ``a * b`` from the partial-product grid.
+
+    Args:
+        a, b: ``(n, wa)`` and ``(n, wb)`` digit (or small integer) matrices
+        base: Digit base, used to size the accumulator
+
+    Returns:
+        ``(n, wa + wb - 1)`` column sums, most significant first
+    """
+    n, wa = a.shape
+    wb = b.shape[1]
+    dtype = _sum_dtype(min(wa, wb), base) if a.dtype.kind == 'u' else np.dtype(np.int64)
+    if n == 1:
+        return np.convolve(a[0].astype(dtype), b[0].astype(dtype))[None, :]
+    rows = max(1, GRID_MAX_CELLS // (wa * (wa + wb)))
+    out = np.empty((n, wa + wb - 1), dtype=dtype)
+    for start in range(0, n, rows):
+        stop = min(n, start + rows)
+        grid = a[start:stop, :, None].astype(dtype) * b[start:stop, None, :].astype(dtype)
+        out[start:stop] = _skew_sum(grid)
+    return out
+
+
+def _karatsuba(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Karatsuba convolution of equal-width ``int64`` matrices, least significant first."""
+    n, m = x.shape
+    if m <= KARATSUBA_CUTOFF:
+        return grid_columns(x, y)
+    h = m // 2
+    z0 = _karatsuba(x[:, :h], y[:, :h])
+    z2 = _karatsuba(x[:, h:], y[:, h:])
+    x_sum = x[:, h:].copy()
+    x_sum[:, :h] += x[:, :h]
+    y_sum = y[:, h:].copy()
+    y_sum[:, :h] += y[:, :h]
+    z1 = _karatsuba(x_sum, y_sum)
+    z1 -= z2
+    z1[:, :2 * h - 1] -= z0
+
+    out = np.zeros((n, 2 * m - 1), dtype=np.int64)
+    out[:, :2 * h - 1] += z0
+    out[:, h:h + z1.shape[1]] += z1
+    out[:, 2 * h:] += z2
+    return out
+
+
+def _equal_width_lsd(a: np.ndarray, b: np.ndarray, dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """Reverse both matrices to least-significant-first order, zero-padded to one width."""
+    width = max(a.shape[1], b.shape[1])
+    x = np.zeros((a.shape[0], width), dtype=dtype)
+    y = np.zeros((b.shape[0], width), dtype=dtype)
+    x[:, :a.shape[1]] = a[:, ::-1]
+    y[:, :b.shape[1]] = b[:, ::-1]
+    return x, y
+
+
+def karatsuba_columns(a: np.ndarray, b: np.ndarray, base: int = 10) -> np.ndarray:
+    """
+    Column sums of ``a * b`` by Karatsuba recursion over the whole batch.
+
+    Returns:
+        ``(n, wa + wb - 1)`` column sums, most significant first
+    """
+    wa, wb = a.shape[1], b.shape[1]
+    x, y = _equal_width_lsd(a, b, np.int64)
+    columns = _karatsuba(x, y)[:, :wa + wb - 1]
+    return columns[:, ::-1].astype(np.uint64)
+
+
+def _bit_reverse(length: int) -> np.ndarray:
+    bits = length.bit_length() - 1
+    index = np.arange(length)
+    reverse = np.zeros(length, dtype=np.intp)
+    for bit in range(bits):
+        reverse |= ((index >> bit) & 1) << (bits - 1 - bit)
+    return reverse
+
+
+def _root_powers(root: int, count: int) -> np.ndarray:
+    """``root ** k mod p`` for ``k < count``, built by doubling."""
+    powers = np.ones(count, dtype=np.uint64)
+    filled = 1
+    while filled < count:
+        step = np.uint64(pow(root, filled, NTT_PRIME))
+        take = min(filled, count - filled)
+        powers[filled:filled + take] = powers[:take] * step % np.uint64(NTT_PRIME)
+        filled += take
+    return powers
+
+
+def _ntt(values: np.ndarray, invert: bool = False) -> np.ndarray:
+    """Iterative radix-2 NTT of each row of a ``(n, length)`` ``uint64`` matrix."""
+    n, length = values.shape
+    p = np.uint64(NTT_PRIME)
+    values = values[:, _bit_reverse(length)]
+    size = 2
+    while size <= length:
+        root = pow(NTT_ROOT, (NTT_PRIME - 1) // size, NTT_PRIME)
+        if invert:
+            root = pow(root, NTT_PRIME - 2, NTT_PRIME)
+        half = size // 2
+        twiddle = _root_powers(root, half)
+        blocks = values.reshape(n, length // size, size)
+        # Operands are below p < 2^30, so products fit in uint64
+        upper = blocks[:, :, :half]
+        lower = blocks[:, :, half:] * twiddle % p
+        values = np.concatenate([(upper + lower) % p, (upper + p - lower) % p], axis=2).reshape(n, length)
+        size *= 2
+    if invert:
+        values = values * np.uint64(pow(length, NTT_PRIME - 2, NTT_PRIME)) % p
+    return values
+
+
+def ntt_columns(a: np.ndarray, b: np.ndarray, base: int = 10) -> np.ndarray:
+    """
+    Column sums of ``a * b`` by number-theoretic transform.
+
+    Raises:
+        ValueError: If a column sum could reach the NTT prime or the transform
+            would exceed :data:`NTT_MAX_LENGTH` points
+
+    Returns:
+        ``(n, wa + wb - 1)`` column sums, most significant first
+    """
+    wa, wb = a.shape[1], b.shape[1]
+    out_width = wa + wb - 1
+    if min(wa, wb) * (base - 1) ** 2 >= NTT_PRIME:
+        raise ValueError(f"operands of {min(wa, wb)} base-{base} digits overflow the NTT modulus")
+    length = 1 << max(0, (out_width - 1).bit_length())
+    if length > NTT_MAX_LENGTH:
+        raise ValueError(f"NTT length {length} exceeds {NTT_MAX_LENGTH}")
+    x = np.zeros((a.shape[0], length), dtype=np.uint64)
+    y = np.zeros((b.shape[0], length), dtype=np.uint64)
+    x[:, :wa] = a[:, ::-1]
+    y[:, :wb] = b[:, ::-1]
+    product = _ntt(_ntt(x) * _ntt(y) % np.uint64(NTT_PRIME), invert=True)
+    return product[:, out_width - 1::-1]
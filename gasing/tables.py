@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Precomputed lookup tables for the GASing core operator.
+
+The paper makes the single-digit addition table (0+0 through 9+9, with its
+carry) the core operator of GASing. This module precomputes that table and
+the digit product table for any base and for multi-digit chunks: with
+``chunk=2`` in base 10 the "digits" are the blocks 00-99, so one lookup
+adds or multiplies two digits' worth of each operand and the engine's
+column loop runs half as many steps.
+
+Tables are stored as ``.npy`` files (``$GASING_TABLE_DIR``, default
+``.gasing_tables/``) and memory-mapped when loaded, so building them is a
+one-off cost and processes share the pages. The engine indexes them with
+vectorised gathers (``np.take``) over a whole column of operands.
+
+Usage:
+    python3 -m gasing.tables build [--base 10] [--chunk 1 2 3]
+    python3 -m gasing.tables info
+"""
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .digits import DEFAULT_BASE, _check_base, block_dtype
+
+logger = logging.getLogger('md2latex.gasing')
+
+TABLE_DIR_ENV = 'GASING_TABLE_DIR'
+DEFAULT_TABLE_DIR = '.gasing_tables'
+
+# Largest (block_base ** 2) table built by default; base 10 allows chunks
+# of up to 3 digits (10^6 entries). Pass max_entries to go further.
+MAX_TABLE_ENTRIES = 1 << 24
+
+TABLE_PARTS = ('sum_digit', 'sum_carry', 'prod_low', 'prod_high')
+
+
+@dataclass(frozen=True)
+class DigitTables:
+    """
+    Sum/carry and product tables for one (base, chunk) pair.
+
+    Attributes:
+        base: Digit base of the operands
+        chunk: Digits per table block
+        sum_digit: ``(2, B, B)`` low block of ``x + y + carry_in``
+        sum_carry: ``(2, B, B)`` carry out of ``x + y + carry_in`` (0 or 1)
+        prod_low: ``(B, B)`` low block of ``x * y``
+        prod_high: ``(B, B)`` high block of ``x * y``
+
+    where ``B = base ** chunk`` is the block base.
+    """
+    base: int
+    chunk: int
+    sum_digit: np.ndarray
+    sum_carry: np.ndarray
+    prod_low: np.ndarray
+    prod_high: np.ndarray
+
+    @property
+    def block_base(self) -> int:
+        return self.base ** self.chunk
+
+    def add(self, x: np.ndarray, y: np.ndarray, carry_in: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up the block sums of ``x + y + carry_in``.
+
+        Returns:
+            Tuple of (low blocks, carries out)
+        """
+        B = self.block_base
+        index = (carry_in.astype(np.intp) * B + x) * B + y
+        return (np.take(self.sum_digit.reshape(-1), index),
+                np.take(self.sum_carry.reshape(-1), index))
+
+    def multiply(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up the block products ``x * y``.
+
+        Returns:
+            Tuple of (low blocks, high blocks)
+        """
+        index = x.astype(np.intp) * self.block_base + y
+        return np.take(self.prod_low.reshape(-1), index), np.take(self.prod_high.reshape(-1), index)
+
+
+def table_dir() -> Path:
+    """Directory holding the ``.npy`` tables."""
+    return Path(os.environ.get(TABLE_DIR_ENV, DEFAULT_TABLE_DIR))
+
+
+def build_tables(base: int = DEFAULT_BASE, chunk: int = 1,
+                 max_entries: int = MAX_TABLE_ENTRIES) -> Dict[str, np.ndarray]:
+    """
+    Compute the four tables for a base and chunk size.
+
+    Raises:
+        ValueError: If ``(base ** chunk) ** 2`` exceeds ``max_entries``
+    """
+    _check_base(base)
+    if chunk < 1:
+        raise ValueError(f"chunk must be at least 1, got {chunk}")
+    B = base ** chunk
+    if B * B > max_entries:
+        raise ValueError(f"base {base} chunk {chunk} needs {B * B:,} entries per table "
+                         f"(limit {max_entries:,}); use a smaller chunk")
+    dtype = block_dtype(B)
+    x = np.arange(B, dtype=np.uint64)[:, None]
+    y = np.arange(B, dtype=np.uint64)[None, :]
+
+    sums = np.stack([x + y, x + y + np.uint64(1)])
+    product = x * y
+    return {
+        'sum_digit': (sums % np.uint64(B)).astype(dtype),
+        'sum_carry': (sums >= np.uint64(B)).astype(np.uint8),
+        'prod_low': (product % np.uint64(B)).astype(dtype),
+        'prod_high': (product // np.uint64(B)).astype(dtype),
+    }
+
+
+def _table_path(directory: Path, part: str, base: int, chunk: int) -> Path:
+    return directory / f"{part}-base{base}-chunk{chunk}.npy"
+
+
+def _save_atomic(path: Path, array: np.ndarray) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    # Atomic rename so a concurrent reader never maps a half-written table
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=None)
+def _load(base: int, chunk: int, directory: str, max_entries: int) -> DigitTables:
+    directory = Path(directory)
+    arrays = {}
+    try:
+        for part in TABLE_PARTS:
+            arrays[part] = np.load(_table_path(directory, part, base, chunk), mmap_mode='r')
+    except (OSError, ValueError):
+        arrays = build_tables(base, chunk, max_entries)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            for part, array in arrays.items():
+                _save_atomic(_table_path(directory, part, base, chunk), array)
+            arrays = {part: np.load(_table_path(directory, part, base, chunk), mmap_mode='r')
+                      for part in TABLE_PARTS}
+            logger.info(f"Built lookup tables for base {base}, chunk {chunk} in {directory}")
+        except OSError as e:
+            logger.warning(f"Could not cache lookup tables in {directory}: {e}; keeping them in memory")
+    return DigitTables(base, chunk, **arrays)
+
+
+def load_tables(base: int = DEFAULT_BASE, chunk: int = 1, directory: Optional[Path] = None,
+                max_entries: int = MAX_TABLE_ENTRIES) -> DigitTables:
+    """
+    Return the memory-mapped tables for a base and chunk size.
+
+    Missing or unreadable table files are rebuilt and written to
+    ``directory`` (default :func:`table_dir`). Tables are loaded once per
+    process.
+
+    Args:
+        base: Digit base
+        chunk: Digits per block
+        directory: Table directory
+        max_entries: Size limit passed to :func:`build_tables`
+
+    Returns:
+        DigitTables instance
+    """
+    directory = Path(directory) if directory is not None else table_dir()
+    return _load(base, chunk, str(directory.resolve()), max_entries)
+
+
+def main() -> int:
+    """Build or list lookup tables from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the GASing lookup tables')
+    parser.add_argument('command', choices=('build', 'info'), help='Action')
+    parser.add_argument('--base', type=int, default=DEFAULT_BASE, help='Digit base')
+    parser.add_argument('--chunk', type=int, nargs='+', default=[1, 2, 3], help='Chunk sizes to build')
+    parser.add_argument('--dir', default=None, help=f'Table directory (default: ${TABLE_DIR_ENV} or {DEFAULT_TABLE_DIR})')
+    parser.add_argument('--max-entries', type=int, default=MAX_TABLE_ENTRIES, help='Entry limit per table')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    directory = Path(args.dir) if args.dir else table_dir()
+    if args.command == 'build':
+        for chunk in args.chunk:
+            try:
+                tables = load_tables(args.base, chunk, directory, args.max_entries)
+            except ValueError as e:
+                logger.error(str(e))
+                return 1
+            print(f"base {args.base} chunk {chunk}: block base {tables.block_base}")
+        return 0
+
+    files = sorted(directory.glob('*.npy')) if directory.exists() else []
+    for path in files:
+        print(f"{path.name:40s} {path.stat().st_size / 1024:10.1f} KiB")
+    if not files:
+        print(f"No tables in {directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
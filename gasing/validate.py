@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Check the GASing engine against Python ``int`` arithmetic.
+
+Random operand batches of several widths (plus edge cases such as zero,
+all-nines and equal operands) are pushed through the batched operations and
+every result is compared with the exact ``int`` result. The exit status is
+non-zero on any mismatch, so this can gate a build.
+
+Usage:
+    python3 -m gasing.validate [--pairs 10000] [--max-digits 60] [--base 10] [--chunk 2]
+"""
+import logging
+import random
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+from .digits import DEFAULT_BASE, from_digit_matrix, to_digit_matrix
+from .divide import batch_divmod
+from .engine import CARRY_MODES, MULTIPLY_METHODS, batch_add, batch_multiply, batch_subtract
+from .tables import DigitTables, load_tables
+
+logger = logging.getLogger('md2latex.gasing')
+
+
+def random_operands(count: int, digits: int, base: int, rng: random.Random) -> List[int]:
+    """Return ``count`` random numbers of up to ``digits`` base-``base`` digits."""
+    limit = base ** digits
+    values = [rng.randrange(limit) for _ in range(count)]
+    # Edge cases that exercise full carry chains and complements
+    edge = [0, limit - 1, 1, base ** (digits - 1)]
+    values[:len(edge)] = edge[:count]
+    return values
+
+
+def check_operation(name: str, a: List[int], b: List[int], base: int, carry: str = 'auto',
+                    tables: Optional[DigitTables] = None, method: str = 'auto') -> Tuple[int, float]:
+    """
+    Run one batched operation and compare it with ``int`` arithmetic.
+
+    Returns:
+        Tuple of (number of mismatches, seconds spent in the engine)
+    """
+    a_mat = to_digit_matrix(a, base=base)
+    b_mat = to_digit_matrix(b, base=base)
+    if name == 'add':
+        start = time.perf_counter()
+        result = batch_add(a_mat, b_mat, base, carry, tables)
+        elapsed = time.perf_counter() - start
+        got = from_digit_matrix(result, base)
+        expected = [x + y for x, y in zip(a, b)]
+    elif name == 'subtract':
+        start = time.perf_counter()
+        magnitude, negative = batch_subtract(a_mat, b_mat, base, carry, tables)
+        elapsed = time.perf_counter() - start
+        got = [-m if neg else m for m, neg in zip(from_digit_matrix(magnitude, base), negative.tolist())]
+        expected = [x - y for x, y in zip(a, b)]
+    elif name == 'divide':
+        b = [y or 1 for y in b]
+        b_mat = to_digit_matrix(b, base=base)
+        start = time.perf_counter()
+        quotient, remainder = batch_divmod(a_mat, b_mat, base)
+        elapsed = time.perf_counter() - start
+        got = list(zip(from_digit_matrix(quotient, base), from_digit_matrix(remainder, base)))
+        expected = [divmod(x, y) for x, y in zip(a, b)]
+    elif name == 'multiply':
+        start = time.perf_counter()
+        result = batch_multiply(a_mat, b_mat, base, tables, method)
+        elapsed = time.perf_counter() - start
+        got = from_digit_matrix(result, base)
+        expected = [x * y for x, y in zip(a, b)]
+    else:
+        raise ValueError(f"Unknown operation: {name}")
+
+    mismatches = [i for i, (g, e) in enumerate(zip(got, expected)) if g != e]
+    for i in mismatches[:5]:
+        logger.error(f"{name}({a[i]}, {b[i]}) = {got[i]}, expected {expected[i]}")
+    return len(mismatches), elapsed
+
+
+def validate(pairs: int = 10000, max_digits: int = 60, base: int = DEFAULT_BASE, seed: int = 0,
+             operations: Tuple[str, ...] = ('add', 'subtract', 'multiply', 'divide'), carry: str = 'auto',
+             tables: Optional[DigitTables] = None, method: str = 'auto', report: Callable[[str], None] = print) -> int:
+    """
+    Validate every operation over a range of operand widths.
+
+    Args:
+        pairs: Operand pairs per (operation, width) combination
+        max_digits: Largest operand width tried
+        base: Digit base
+        seed: Random seed (runs are reproducible)
+        operations: Operations to check
+        carry: Carry resolution mode for addition and subtraction
+        tables: Lookup tables to route every operation through
+        method: Multiplication method
+        report: Callback receiving one summary line per combination
+
+    Returns:
+        Total number of mismatches
+    """
+    rng = random.Random(seed)
+    widths = sorted({1, 2, 9, 18, 19, max_digits} & set(range(1, max_digits + 1)))
+    failures = 0
+    for width in widths:
+        a = random_operands(pairs, width, base, rng)
+        b = random_operands(pairs, rng.randint(1, width), base, rng)
+        # Mix in equal operands for subtraction's zero result
+        b[-1] = a[-1]
+        for name in operations:
+            bad, elapsed = check_operation(name, a, b, base, carry, tables, method)
+            failures += bad
+            rate = pairs / elapsed if elapsed else float('inf')
+            report(f"{name:9s} width={width:4d} pairs={pairs} "
+                   f"{'OK' if not bad else f'{bad} MISMATCHES'} ({rate:,.0f} pairs/s)")
+    return failures
+
+
+def main() -> int:
+    """Validate the engine from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate the GASing engine against Python int arithmetic')
+    parser.add_argument('--pairs', type=int, default=10000, help='Operand pairs per width and operation')
+    parser.add_argument('--max-digits', type=int, default=60, help='Largest operand width')
+    parser.add_argument('--base', type=int, default=DEFAULT_BASE, help='Digit base (2-256)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--carry', choices=CARRY_MODES, default='auto',
+                        help='Carry resolution for addition and subtraction')
+    parser.add_argument('--chunk', type=int, default=0,
+                        help='Use lookup tables with this many digits per block (0: no tables)')
+    parser.add_argument('--method', choices=MULTIPLY_METHODS, default='auto', help='Multiplication method')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    tables = load_tables(args.base, args.chunk) if args.chunk else None
+    failures = validate(args.pairs, args.max_digits, args.base, args.seed, carry=args.carry, tables=tables,
+                        method=args.method)
+    if failures:
+        logger.error(f"{failures} results differ from Python int arithmetic")
+        return 1
+    print("All results match Python int arithmetic")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Image preprocessing stage for the Markdown-to-LaTeX converters.
+
+pdflatex embeds bitmaps at whatever resolution they arrive in, so a large
+screenshot referenced with ``\\includegraphics[width=\\linewidth]`` is decoded
+and written into the PDF at full size on every pass. This module produces
+column-width, target-DPI derivatives of the source images (recompressed PNG
+or single-page PDF) and caches them by content hash and target size, so the
+converters can point figure blocks at the small derivative instead.
+
+Pillow is an optional dependency: when it is not installed the originals are
+used unchanged and a single warning is logged.
+
+Usage:
+    python3 image_pipeline.py [image ...] [--width-in 3.0] [--dpi 300]
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import artifact_cache
+
+logger = logging.getLogger('md2latex.images')
+
+# main.tex is a two-column article on arxiv.sty's 6.5in text block with a
+# 0.5in column separation, so a column is 3in wide.
+DEFAULT_COLUMN_WIDTH_IN = 3.0
+DEFAULT_DPI = 300
+DEFAULT_FORMAT = 'png'
+DERIVED_SUBDIR = 'derived'
+
+# Markdown image links: ![Label](image.png), with optional spaces
+IMAGE_LINK_PATTERN = r'!\s*\[([^\]]*)\]\s*\(\s*([^)\s]+)\s*\)'
+
+SUPPORTED_FORMATS = ('png', 'pdf')
+RASTER_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff'}
+
+_pillow_warned = False
+
+
+def _load_pillow():
+    """Import Pillow lazily, returning ``None`` (and warning once) if missing."""
+    global _pillow_warned
+    try:
+        from PIL import Image
+    except ImportError:
+        if not _pillow_warned:
+            logger.warning("Pillow is not installed; using original images without downscaling")
+            _pillow_warned = True
+        return None
+    return Image
+
+
+def _pillow_version() -> str:
+    try:
+        import PIL
+    except ImportError:
+        return 'no-pillow'
+    return f"Pillow {PIL.__version__}"
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 16) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        path: File to hash
+        chunk_size: Read size in bytes
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def referenced_images(text: str, find_image: Callable[[str], Optional[str]]) -> List[str]:
+    """
+    Return the image files referenced by Markdown image links in ``text``.
+
+    Args:
+        text: Markdown source
+        find_image: Resolver from the image name in the link to a file path
+
+    Returns:
+        Resolved paths, in order of appearance (unresolved links are skipped)
+    """
+    found = []
+    for match in re.finditer(IMAGE_LINK_PATTERN, text, flags=re.MULTILINE):
+        image_file = find_image(match.group(2).strip())
+        if image_file:
+            found.append(image_file)
+    return found
+
+
+def target_width_px(width_in: float = DEFAULT_COLUMN_WIDTH_IN, dpi: int = DEFAULT_DPI) -> int:
+    """Return the pixel width of a derivative for the given physical width and DPI."""
+    return max(1, int(round(width_in * dpi)))
+
+
+def derivative_path(source: Path, derived_dir: Path, width_px: int, fmt: str = DEFAULT_FORMAT) -> Path:
+    """
+    Return the cache path of the derivative for ``source`` at ``width_px``.
+
+    The name combines the original stem (to keep LaTeX logs readable), a prefix
+    of the content hash and the target width, so edits to the source image or a
+    change in target size produce a new cache entry.
+    """
+    digest = file_digest(source)[:16]
+    return derived_dir / f"{source.stem}-{digest}-{width_px}w.{fmt}"
+
+
+def preprocess_image(
+    source: Path,
+    derived_dir: Path,
+    width_in: float = DEFAULT_COLUMN_WIDTH_IN,
+    dpi: int = DEFAULT_DPI,
+    fmt: str = DEFAULT_FORMAT,
+) -> Path:
+    """
+    Produce (or reuse) the column-width derivative of a single image.
+
+    Images that are already no wider than the target, non-raster inputs and
+    failures all fall back to the original path, so callers can always use the
+    returned path in ``\\includegraphics``.
+
+    Args:
+        source: Original image file
+        derived_dir: Directory holding cached derivatives
+        width_in: Target physical width in inches
+        dpi: Target resolution in dots per inch
+        fmt: Output format, ``'png'`` or ``'pdf'``
+
+    Returns:
+        Path to the derivative, or ``source`` if no derivative is needed
+    """
+    source = Path(source)
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported derivative format: {fmt}")
+    if source.suffix.lower() not in RASTER_SUFFIXES:
+        return source
+
+    width_px = target_width_px(width_in, dpi)
+    derived_dir = Path(derived_dir)
+    dest = derivative_path(source, derived_dir, width_px, fmt)
+    if dest.exists():
+        logger.debug(f"Image cache hit: {dest}")
+        return dest
+
+    # A teammate (or an earlier checkout) may already have produced it
+    cache = artifact_cache.default_cache()
+    cache_key = cache.key('image', [file_digest(source), str(width_px), str(dpi), fmt], _pillow_version())
+    if cache.get_files(cache_key, dest.parent) is not None:
+        logger.debug(f"Image restored from artifact cache: {dest}")
+        return dest
+
+    Image = _load_pillow()
+    if Image is None:
+        return source
+
+    try:
+        with Image.open(source) as img:
+            if img.width <= width_px and fmt == 'png':
+                # Already small enough; a lossless recompress rarely pays off.
+                return source
+            if img.width > width_px:
+                height_px = max(1, round(img.height * width_px / img.width))
+                img = img.resize((width_px, height_px), Image.LANCZOS)
+            if fmt == 'pdf' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+
+            derived_dir.mkdir(parents=True, exist_ok=True)
+            # Unique per thread: build_dag preprocesses the same images from several tasks at once
+            tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            if fmt == 'png':
+                img.save(tmp, format='PNG', optimize=True, dpi=(dpi, dpi))
+            else:
+                img.save(tmp, format='PDF', resolution=float(dpi))
+        if fmt == 'png' and tmp.stat().st_size >= source.stat().st_size:
+            # Downscaling did not help (e.g. a heavily optimised original)
+            shutil.copyfile(source, tmp)
+        # Atomic rename so concurrent builds never see a half-written file
+        os.replace(tmp, dest)
+    except Exception as e:
+        logger.error(f"Failed to preprocess image {source}: {e}")
+        return source
+
+    cache.put_files(cache_key, {dest.name: dest})
+    logger.info(f"Created image derivative {dest} ({width_px}px wide)")
+    return dest
+
+
+def preprocess_images(
+    sources: Iterable[Path],
+    derived_dir: Path,
+    width_in: float = DEFAULT_COLUMN_WIDTH_IN,
+    dpi: int = DEFAULT_DPI,
+    fmt: str = DEFAULT_FORMAT,
+    max_workers: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Preprocess several images in parallel.
+
+    Pillow releases the GIL while decoding, resampling and encoding, so a
+    thread pool is enough to keep all cores busy.
+
+    Args:
+        sources: Image files to process (duplicates are processed once)
+        derived_dir: Directory holding cached derivatives
+        width_in: Target physical width in inches
+        dpi: Target resolution in dots per inch
+        fmt: Output format, ``'png'`` or ``'pdf'``
+        max_workers: Thread pool size (default: executor default)
+
+    Returns:
+        dict: Mapping of each source path (as given) to the path to embed
+    """
+    unique = list(dict.fromkeys(str(s) for s in sources))
+    if not unique:
+        return {}
+
+    def work(src):
+        return str(preprocess_image(Path(src), Path(derived_dir), width_in, dpi, fmt))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(work, unique))
+    return dict(zip(unique, results))
+
+
+def restore_derivatives(
+    text: str,
+    latex: str,
+    find_image: Callable[[str], Optional[str]],
+    derived_dir: Path,
+    width_in: float = DEFAULT_COLUMN_WIDTH_IN,
+    dpi: int = DEFAULT_DPI,
+    fmt: str = DEFAULT_FORMAT,
+) -> bool:
+    """
+    Recreate the derivatives that cached LaTeX embeds (e.g. in a fresh checkout).
+
+    Args:
+        text: Markdown the LaTeX was converted from
+        latex: Converted LaTeX (e.g. restored from the section cache)
+        find_image: Resolves an image reference to a file path, or None
+        derived_dir: Directory holding cached derivatives
+
+    Returns:
+        False if a derivative the LaTeX refers to could not be recreated
+        (e.g. Pillow is missing and it is not in the artifact cache)
+    """
+    sources = referenced_images(text, find_image)
+    preprocess_images(sources, derived_dir, width_in, dpi, fmt)
+    width_px = target_width_px(width_in, dpi)
+    for source in map(Path, sources):
+        if source.suffix.lower() not in RASTER_SUFFIXES:
+            continue
+        dest = derivative_path(source, Path(derived_dir), width_px, fmt)
+        if dest.name in latex and not dest.exists():
+            return False
+    return True
+
+
+def main():
+    """Preprocess images from the command line and print the derivative paths."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Create column-width image derivatives for LaTeX')
+    parser.add_argument('images', nargs='*', help='Images to process (default: everything in images/)')
+    parser.add_argument('--derived-dir', default=os.path.join('images', DERIVED_SUBDIR),
+                        help='Directory for cached derivatives')
+    parser.add_argument('--width-in', type=float, default=DEFAULT_COLUMN_WIDTH_IN,
+                        help='Target width in inches (default: one column)')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help='Target resolution')
+    parser.add_argument('--format', choices=SUPPORTED_FORMATS, default=DEFAULT_FORMAT,
+                        help='Derivative format')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    sources = args.images or sorted(
+        str(p) for p in Path('images').iterdir() if p.suffix.lower() in RASTER_SUFFIXES
+    )
+    mapping = preprocess_images(sources, Path(args.derived_dir), args.width_in, args.dpi, args.format)
+    for src, dst in mapping.items():
+        print(f"{src} -> {dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Streaming consumer for pdflatex output.
+
+``pdflatex -interaction=nonstopmode`` keeps going after the first error and
+can print hundreds of cascading errors before it exits. This module reads the
+output line by line while the process runs, recognises fatal errors
+(undefined control sequences, missing files, runaway arguments, emergency
+stops) and kills the process at the first one. Only a bounded ring buffer of
+recent lines is kept for the error log, and warnings are collected as
+structured records. :func:`run_passes` repeats a compile until LaTeX stops
+asking for a rerun and the auxiliary files (``.aux``, ``.toc``, hyperref's
+``.out``, ...) no longer change between passes.
+
+Usage:
+    python3 latex_log.py main.log          # summarise an existing log file
+"""
+import hashlib
+import logging
+import os
+import re
+import subprocess
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger('md2latex.latex')
+
+DEFAULT_RING_SIZE = 200
+# Lines read after a fatal error before killing, so "l.<n> ..." context is kept
+DEFAULT_CONTEXT_AFTER = 4
+# Non-fatal errors tolerated before the run is stopped anyway
+DEFAULT_MAX_ERRORS = 20
+# Upper bound on the lines kept with each error
+MAX_ERROR_CONTEXT = 16
+# Files a pass writes and the next one reads back: labels, TOC, hyperref
+# bookmarks, lists of figures and tables (\include'd .aux files included)
+AUX_SUFFIXES = ('.aux', '.toc', '.out', '.lof', '.lot')
+
+# Error lines look like "! Undefined control sequence." or, with
+# -file-line-error, "./sections/intro.tex:12: Undefined control sequence."
+_FILE_LINE = r'(?P<file>[^:\s][^:]*\.(?:tex|sty|cls|aux|bbl|def|cfg)):(?P<fline>\d+):\s*'
+_ERROR_PREFIX = r'^(?:!\s*|' + _FILE_LINE + r')'
+
+FATAL_PATTERNS = [
+    ('undefined_control_sequence', re.compile(_ERROR_PREFIX + r'Undefined control sequence')),
+    ('missing_file', re.compile(_ERROR_PREFIX + r"LaTeX Error: File `(?P<name>[^']+)' not found")),
+    ('missing_file', re.compile(r"^! I can't find file `(?P<name>[^']+)'")),
+    ('runaway_argument', re.compile(r'^Runaway argument\?')),
+    ('emergency_stop', re.compile(_ERROR_PREFIX + r'Emergency stop')),
+    ('fatal_error', re.compile(r'^!\s*==> Fatal error occurred')),
+]
+ERROR_PATTERN = re.compile(_ERROR_PREFIX + r'(?P<message>.+)$')
+INPUT_LINE_PATTERN = re.compile(r'^l\.(?P<line>\d+)\s')
+
+WARNING_PATTERNS = [
+    ('citation', re.compile(r"^LaTeX Warning: Citation `(?P<key>[^']+)' .*?undefined(?: on input line (?P<line>\d+))?")),
+    ('reference', re.compile(r"^LaTeX Warning: Reference `(?P<key>[^']+)' .*?undefined(?: on input line (?P<line>\d+))?")),
+    # "Label(s) may have changed. Rerun ...", hyperref's "Rerun to get /PageLabels entry",
+    # rerunfilecheck's "File `main.out' has changed", longtable's "Rerun LaTeX". Undefined
+    # references only resolve on another pass if this one changed the .aux (see run_passes)
+    ('rerun', re.compile(r"^(?:LaTeX|Package \S+) Warning: (?:.*\bRerun\b|Label\(s\) may have changed"
+                         r"|File `[^']+' has changed)")),
+    ('package', re.compile(r'^Package (?P<package>\S+) Warning: (?P<message>.*?)(?: on input line (?P<line>\d+))?\.?$')),
+    ('latex', re.compile(r'^LaTeX Warning: (?P<message>.*?)(?: on input line (?P<line>\d+))?\.?$')),
+    ('overfull', re.compile(r'^Overfull \\[hv]box (?:.*?at lines? (?P<line>\d+))?')),
+    ('underfull', re.compile(r'^Underfull \\[hv]box (?:.*?at lines? (?P<line>\d+))?')),
+]
+
+
+@dataclass
+class LatexWarning:
+    """A warning reported by LaTeX or one of its packages."""
+    kind: str
+    message: str
+    line: Optional[int] = None
+    package: Optional[str] = None
+
+
+@dataclass
+class LatexError:
+    """An error reported by LaTeX, with the surrounding output lines."""
+    kind: str
+    message: str
+    line: Optional[int] = None
+    file: Optional[str] = None
+    context: List[str] = field(default_factory=list)
+
+    @property
+    def fatal(self) -> bool:
+        return self.kind != 'error'
+
+
+@dataclass
+class LatexRunResult:
+    """Outcome of a streamed pdflatex (or other command) run."""
+    returncode: Optional[int]
+    aborted: bool
+    duration: float
+    errors: List[LatexError]
+    warnings: List[LatexWarning]
+    tail: List[str]
+    lines_read: int = 0
+
+    @property
+    def fatal_error(self) -> Optional[LatexError]:
+        return next((e for e in self.errors if e.fatal), None)
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.aborted and not self.errors
+
+    @property
+    def needs_rerun(self) -> bool:
+        """True if LaTeX or a package asked for another pass (labels, references, outlines, ...)."""
+        return any(w.kind == 'rerun' for w in self.warnings)
+
+    def write_error_log(self, path: Path, header: str = '') -> None:
+        """
+        Write the first error, its context and the recent output to ``path``.
+
+        Args:
+            path: Destination log file
+            header: Optional first line (e.g. the failure summary)
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if header:
+                f.write(f"{header}\n")
+            if self.aborted:
+                f.write(f"Aborted after {self.duration:.1f}s at the first fatal error\n")
+            for error in self.errors[:1]:
+                where = f"{error.file or ''}:{error.line}" if error.line else ''
+                f.write(f"\n=== FIRST ERROR ({error.kind}) {where} ===\n{error.message}\n")
+                f.write(''.join(f"{line}\n" for line in error.context))
+            if len(self.errors) > 1:
+                f.write(f"\n({len(self.errors) - 1} further errors)\n")
+            if self.warnings:
+                f.write(f"\n=== WARNINGS ({len(self.warnings)}) ===\n")
+                for w in self.warnings:
+                    loc = f" (line {w.line})" if w.line else ''
+                    f.write(f"[{w.kind}] {w.message}{loc}\n")
+            f.write(f"\n=== LAST {len(self.tail)} LINES OF OUTPUT ===\n")
+            f.write(''.join(f"{line}\n" for line in self.tail))
+
+
+class LatexLogParser:
+    """
+    Incremental parser for pdflatex output.
+
+    Feed it one line at a time with :meth:`feed`; it keeps a bounded ring
+    buffer of recent lines and returns the error as soon as a fatal one is
+    seen, so the caller can stop the process.
+    """
+
+    def __init__(self, ring_size: int = DEFAULT_RING_SIZE, max_errors: int = DEFAULT_MAX_ERRORS):
+        self.ring: Deque[str] = deque(maxlen=ring_size)
+        self.errors: List[LatexError] = []
+        self.warnings: List[LatexWarning] = []
+        self.lines_read = 0
+        self.max_errors = max_errors
+        self._pending: Optional[LatexError] = None
+
+    def feed(self, line: str) -> Optional[LatexError]:
+        """
+        Consume one output line.
+
+        Args:
+            line: A line of output, with or without its trailing newline
+
+        Returns:
+            The error if this line started a fatal one, otherwise None
+        """
+        line = line.rstrip('\r\n')
+        self.lines_read += 1
+        self.ring.append(line)
+
+        if self._pending is not None:
+            self._pending.context.append(line)
+            match = INPUT_LINE_PATTERN.match(line)
+            if match and self._pending.line is None:
+                self._pending.line = int(match.group('line'))
+            if match or len(self._pending.context) >= MAX_ERROR_CONTEXT:
+                self._pending = None
+
+        for kind, pattern in FATAL_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                return self._add_error(kind, line, match)
+
+        match = ERROR_PATTERN.match(line)
+        if match:
+            self._add_error('error', line, match)
+            return None
+
+        if 'Warning' in line or line.startswith(('Overfull', 'Underfull')):
+            self._add_warning(line)
+        return None
+
+    def _add_error(self, kind: str, line: str, match: Optional[re.Match]) -> LatexError:
+        file_name = match.groupdict().get('file') if match else None
+        file_line = match.groupdict().get('fline') if match else None
+        # Context starts with the lines leading up to the error
+        context = list(self.ring)[-6:]
+        error = LatexError(kind=kind, message=line.lstrip('! '), file=file_name,
+                           line=int(file_line) if file_line else None, context=context)
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+        self._pending = error
+        return error
+
+    def _add_warning(self, line: str) -> None:
+        for kind, pattern in WARNING_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                groups = match.groupdict()
+                self.warnings.append(LatexWarning(
+                    kind=kind,
+                    message=groups.get('message') or line,
+                    line=int(groups['line']) if groups.get('line') else None,
+                    package=groups.get('package'),
+                ))
+                return
+
+
+def parse_log(lines: Iterable[str], ring_size: int = DEFAULT_RING_SIZE) -> LatexLogParser:
+    """Parse a complete log (e.g. an existing ``main.log``) without aborting."""
+    parser = LatexLogParser(ring_size=ring_size)
+    for line in lines:
+        parser.feed(line)
+    return parser
+
+
+def texinputs_env(*dirs: Union[str, Path]) -> Dict[str, str]:
+    """
+    The current environment with ``dirs`` searched, in order, before TeX's defaults.
+
+    Lets a build directory shadow individual sources (a driver, placeholder
+    figures) while everything else is read from the source tree.
+    """
+    env = dict(os.environ)
+    env['TEXINPUTS'] = os.pathsep.join([str(d) for d in dirs] + [env.get('TEXINPUTS', '')])
+    return env
+
+
+def run_streaming(
+    cmd: Union[Sequence[str], str],
+    cwd: Optional[Path] = None,
+    abort_on_fatal: bool = True,
+    ring_size: int = DEFAULT_RING_SIZE,
+    context_after: int = DEFAULT_CONTEXT_AFTER,
+    timeout: Optional[float] = None,
+    on_line: Optional[Callable[[str], None]] = None,
+    env: Optional[Mapping[str, str]] = None,
+) -> LatexRunResult:
+    """
+    Run a command, parsing its combined output line by line as it is produced.
+
+    Args:
+        cmd: Command to run (as string or list of args)
+        cwd: Working directory for the command
+        abort_on_fatal: Kill the process at the first fatal LaTeX error
+        ring_size: Number of recent output lines to keep
+        context_after: Lines to read after a fatal error before killing
+        timeout: Kill the process if it runs longer than this many seconds
+        on_line: Optional callback invoked for every output line
+        env: Environment for the command (default: inherit)
+
+    Returns:
+        LatexRunResult describing the run
+    """
+    parser = LatexLogParser(ring_size=ring_size)
+    start = time.monotonic()
+    aborted = False
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(cwd) if cwd else None,
+        env=dict(env) if env is not None else None,
+        shell=isinstance(cmd, str),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        bufsize=1,
+    )
+    try:
+        fatal_seen = None
+        for line in proc.stdout:
+            if on_line is not None:
+                on_line(line.rstrip('\r\n'))
+            error = parser.feed(line)
+            if error is not None and fatal_seen is None:
+                fatal_seen = parser.lines_read
+                logger.error(f"LaTeX fatal error ({error.kind}): {error.message}")
+            if fatal_seen is not None and abort_on_fatal and parser.lines_read - fatal_seen >= context_after:
+                aborted = True
+                break
+            if timeout is not None and time.monotonic() - start > timeout:
+                logger.error(f"Command exceeded {timeout}s, killing it")
+                aborted = True
+                break
+            if abort_on_fatal and len(parser.errors) >= parser.max_errors:
+                logger.error(f"Stopping after {parser.max_errors} LaTeX errors")
+                aborted = True
+                break
+        if fatal_seen is not None and abort_on_fatal:
+            aborted = True
+    finally:
+        if aborted and proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        returncode = proc.wait()
+
+    duration = time.monotonic() - start
+    # Each run is one pass in the build metrics (see build_metrics.py)
+    from build_metrics import metrics
+    program = Path(cmd.split()[0] if isinstance(cmd, str) else cmd[0]).name
+    failed = returncode != 0 or aborted
+    metrics().add(program, duration, {'status': 'failed'} if failed else None)
+
+    return LatexRunResult(
+        returncode=returncode,
+        aborted=aborted,
+        duration=duration,
+        errors=parser.errors,
+        warnings=parser.warnings,
+        tail=list(parser.ring),
+        lines_read=parser.lines_read,
+    )
+
+
+def aux_digests(directory: Union[str, Path], job: str) -> Dict[str, str]:
+    """Digests of ``job``'s auxiliary files and every ``.aux`` below ``directory``."""
+    directory = Path(directory)
+    paths = {directory / f"{job}{suffix}" for suffix in AUX_SUFFIXES} | set(directory.rglob('*.aux'))
+    return {str(path.relative_to(directory)): hashlib.sha256(path.read_bytes()).hexdigest()
+            for path in sorted(paths) if path.is_file()}
+
+
+def run_passes(
+    cmd: Sequence[str],
+    cwd: Path,
+    job: str,
+    out_dir: Optional[Path] = None,
+    max_passes: int = 3,
+    env: Optional[Mapping[str, str]] = None,
+    after_pass: Optional[Callable[[int, LatexRunResult], bool]] = None,
+) -> Tuple[LatexRunResult, int, bool]:
+    """
+    Run pdflatex passes until the document settles.
+
+    Another pass runs while LaTeX or a package asks for a rerun, or the pass
+    changed one of the auxiliary files the next pass reads back, so a first
+    build with hyperref bookmarks or a table of contents takes at least two.
+
+    Args:
+        cmd: pdflatex command line
+        cwd: Working directory for the command
+        job: Job name (basename of the ``.aux``)
+        out_dir: Directory the auxiliary files are written to (default: ``cwd``)
+        max_passes: Upper bound on passes
+        env: Environment for the command (default: inherit)
+        after_pass: Called with the pass number and result after each
+            successful pass (e.g. to run BibTeX); True forces another pass
+
+    Returns:
+        (result of the last pass, passes run, whether the document settled);
+        a failed pass is returned at once
+    """
+    out_dir = Path(out_dir or cwd)
+    for pass_number in range(1, max_passes + 1):
+        before = aux_digests(out_dir, job)
+        result = run_streaming(cmd, cwd=cwd, env=env)
+        if result.returncode != 0 or result.aborted:
+            return result, pass_number, False
+        needs_pass = result.needs_rerun or aux_digests(out_dir, job) != before
+        if after_pass is not None and after_pass(pass_number, result):
+            needs_pass = True
+        if not needs_pass:
+            return result, pass_number, True
+    logger.warning(f"{job} had not settled after {max_passes} passes")
+    return result, max_passes, False
+
+
+def main():
+    """Summarise errors and warnings from an existing LaTeX log file."""
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description='Summarise a pdflatex log file')
+    arg_parser.add_argument('log', help='Path to the .log file')
+    args = arg_parser.parse_args()
+
+    with open(args.log, 'r', encoding='utf-8', errors='replace') as f:
+        parser = parse_log(f)
+    for error in parser.errors:
+        print(f"ERROR [{error.kind}] {error.message}" + (f" (line {error.line})" if error.line else ''))
+    for w in parser.warnings:
+        print(f"WARNING [{w.kind}] {w.message}" + (f" (line {w.line})" if w.line else ''))
+    print(f"{len(parser.errors)} errors, {len(parser.warnings)} warnings")
+    return 1 if parser.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
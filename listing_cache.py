@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered code listings for the Markdown-to-LaTeX converters.
+
+The converters turn fenced code blocks into ``lstlisting`` environments,
+which ``listings`` re-tokenises and highlights on every pdflatex pass. This
+module highlights each block once with Pygments and writes the result as a
+``Verbatim`` fragment (``fvextra``, loaded by ``main.tex``) named after a
+hash of the code, language, caption, style and the fragment's directory, so
+converted sections only ``\\input`` it. The fragments match the
+``gasingcode`` listings style: footnote-size monospace, a frame, line
+numbers and line breaking, with the caption numbered in the listings'
+sequence.
+
+Fragments are also stored in the artifact cache, so a section restored from
+the cache can recreate fragments that were deleted since.
+
+Pygments is an optional dependency: when it is not installed, or the
+language has no lexer here, the converters keep emitting ``lstlisting`` and
+a single warning is logged.
+
+Usage:
+    python3 listing_cache.py [file ...] [--language Python] [--dir sections/listings]
+"""
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import artifact_cache
+
+logger = logging.getLogger('md2latex.listings')
+
+LISTINGS_SUBDIR = 'listings'
+DEFAULT_STYLE = 'bw'
+# listings language (as emitted by the converters) -> Pygments lexer
+LEXERS = {
+    'Python': 'python',
+    'Java': 'java',
+    'JavaScript': 'javascript',
+    'C': 'c',
+    'C++': 'cpp',
+    'bash': 'bash',
+    'Pseudocode': 'text',
+}
+# The gasingcode listings style of main.tex, in fancyvrb/fvextra terms
+VERBATIM_OPTIONS = ('fontsize=\\footnotesize,frame=single,numbers=left,numbersep=6pt,'
+                    'xleftmargin=1.5em,xrightmargin=0.5em,breaklines=true')
+
+# \input lines the converters emit for a fragment
+FRAGMENT_INPUT_PATTERN = re.compile(r'\\input\{([^}]*/lst-[0-9a-f]{16})\}')
+
+STYLE_SUPPORT = r"""\makeatletter
+\@ifundefined{c@lstlisting}{\newcounter{lstlisting}}{}
+\providecommand{\lstlistingname}{Listing}
+% A numbered listing caption, as listings typesets it above the code
+\newcommand{\cachedlistingcaption}[1]{%
+  \par\refstepcounter{lstlisting}%
+  \addcontentsline{lol}{lstlisting}{\protect\numberline{\thelstlisting}#1}%
+  \@makecaption{\lstlistingname~\thelstlisting}{#1}\nopagebreak}
+\makeatother
+\renewcommand{\theFancyVerbLine}{\tiny\arabic{FancyVerbLine}}
+"""
+
+_pygments_warned = False
+
+
+def _load_pygments():
+    """Import Pygments lazily, returning ``None`` (and warning once) if missing."""
+    global _pygments_warned
+    try:
+        import pygments
+        from pygments.formatters import LatexFormatter  # noqa: F401
+        from pygments.lexers import get_lexer_by_name  # noqa: F401
+    except ImportError:
+        if not _pygments_warned:
+            logger.warning("Pygments is not installed; code blocks stay lstlisting environments")
+            _pygments_warned = True
+        return None
+    return pygments
+
+
+def _pygments_version() -> str:
+    try:
+        import pygments
+    except ImportError:
+        return 'no-pygments'
+    return f"Pygments {pygments.__version__}"
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # Chunk workers and build_dag's threads may render the same block concurrently
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _fragment_cache_key(name: str) -> str:
+    return artifact_cache.ArtifactCache.key('listing', [name], _pygments_version())
+
+
+def style_name(style: str = DEFAULT_STYLE) -> str:
+    """Basename of the support file with a style's highlighting macros."""
+    return f"pygments-{style}"
+
+
+def write_style(listings_dir: Path, style: str = DEFAULT_STYLE) -> bool:
+    """
+    Write the style support file to ``listings_dir`` if it is missing.
+
+    Returns:
+        False if Pygments is not available
+    """
+    path = Path(listings_dir) / f"{style_name(style)}.tex"
+    if path.exists():
+        return True
+    if _load_pygments() is None:
+        return False
+    from pygments.formatters import LatexFormatter
+
+    defs = LatexFormatter(style=style, commandprefix='PYG').get_style_defs()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(path, f"% Pygments '{style}' style for listing_cache.py fragments\n{defs}\n{STYLE_SUPPORT}")
+    return True
+
+
+def render_listing(code: str, language: str, caption: str, listings_dir: str, ref_dir: str,
+                   style: str = DEFAULT_STYLE) -> Optional[str]:
+    """
+    Pre-render one code block and return the LaTeX that inputs it.
+
+    Args:
+        code: Code block contents
+        language: listings language name (see ``LEXERS``)
+        caption: Caption LaTeX (already escaped), or empty for none
+        listings_dir: Directory the fragments are written to
+        ref_dir: The same directory as LaTeX refers to it
+        style: Pygments style
+
+    Returns:
+        An ``\\input`` of the fragment, or None to fall back to ``lstlisting``
+    """
+    lexer_name = LEXERS.get(language)
+    if lexer_name is None or not write_style(listings_dir, style):
+        return None
+    code = code.rstrip()
+    ref_dir = ref_dir.replace(os.sep, '/')
+    key = artifact_cache.ArtifactCache.key(
+        'listing-fragment', [code, lexer_name, caption, style, VERBATIM_OPTIONS, ref_dir], _pygments_version())
+    name = f"lst-{key[:16]}"
+    path = Path(listings_dir) / f"{name}.tex"
+    if not path.exists():
+        cache = artifact_cache.default_cache()
+        fragment = cache.get_text(_fragment_cache_key(name))
+        if fragment is None:
+            fragment = _highlight(code, lexer_name, language, caption, ref_dir, style)
+            cache.put_text(_fragment_cache_key(name), fragment)
+        _write_atomic(path, fragment)
+    return f"\\input{{{ref_dir}/{name}}}"
+
+
+def _highlight(code: str, lexer_name: str, language: str, caption: str, ref_dir: str, style: str) -> str:
+    from pygments import highlight
+    from pygments.formatters import LatexFormatter
+    from pygments.lexers import get_lexer_by_name
+
+    formatter = LatexFormatter(style=style, commandprefix='PYG', verboptions=VERBATIM_OPTIONS)
+    lines = [f"% {language} listing pre-rendered by listing_cache.py ({_pygments_version()}, style {style})",
+             f"\\ifcsname cachedlistingcaption\\endcsname\\else\\input{{{ref_dir}/{style_name(style)}}}\\fi"]
+    if caption:
+        lines.append(f"\\cachedlistingcaption{{{caption}}}")
+    lines.append(highlight(code + '\n', get_lexer_by_name(lexer_name), formatter).rstrip())
+    return '\n'.join(lines) + '\n'
+
+
+def missing_fragments(latex: str, root: str = '.') -> List[str]:
+    """
+    Fragment ``\\input`` paths in ``latex`` that do not exist relative to ``root``.
+
+    Args:
+        latex: Converted LaTeX (a section or a whole document)
+        root: Directory pdflatex compiles the document in
+    """
+    return [match.group(1) for match in FRAGMENT_INPUT_PATTERN.finditer(latex)
+            if not (Path(root) / f"{match.group(1)}.tex").exists()]
+
+
+def restore_fragments(latex: str, root: str = '.', style: str = DEFAULT_STYLE) -> bool:
+    """
+    Recreate missing fragments referenced by converted LaTeX from the artifact cache.
+
+    Args:
+        latex: Converted section (e.g. restored from the section cache)
+        root: Directory the ``\\input`` paths are relative to
+        style: Pygments style of the fragments
+
+    Returns:
+        False if a fragment could not be restored and the section must be reconverted
+    """
+    cache = None
+    for match in FRAGMENT_INPUT_PATTERN.finditer(latex):
+        path = Path(root) / f"{match.group(1)}.tex"
+        if path.exists():
+            continue
+        cache = cache or artifact_cache.default_cache()
+        fragment = cache.get_text(_fragment_cache_key(path.stem))
+        if fragment is None or not write_style(path.parent, style):
+            return False
+        _write_atomic(path, fragment)
+    return True
+
+
+def main():
+    """Pre-render code files from the command line and print the LaTeX that inputs them."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Highlight code blocks once into cached LaTeX fragments')
+    parser.add_argument('files', nargs='+', help='Code files to render')
+    parser.add_argument('--language', default='Python', choices=sorted(LEXERS), help='listings language name')
+    parser.add_argument('--dir', default=os.path.join('sections', LISTINGS_SUBDIR), help='Fragment directory')
+    parser.add_argument('--style', default=DEFAULT_STYLE, help='Pygments style')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    for name in args.files:
+        code = Path(name).read_text(encoding='utf-8')
+        latex = render_listing(code, args.language, '', args.dir, args.dir, args.style)
+        print(f"{name} -> {latex or 'lstlisting (no Pygments)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Markdown to LaTeX conversion for the paper's sections.
+
+Submodules:
+
+* :mod:`md2latex.converter` - :class:`MarkdownToLatexConverter`
+* :mod:`md2latex.sections` - splitting a document into ``##`` sections
+* :mod:`md2latex.writer` - section files and the combined document body
+* :mod:`md2latex.validator` - structure checks and cleanup before conversion
+
+Importing the package or any submodule has no side effects (no logging
+configuration, no directories created) and loads nothing beyond the
+standard library's basics; the names below are imported on first access.
+``python3 -m md2latex.importtime`` checks that this stays cheap.
+
+Example:
+    >>> from md2latex import extract_sections
+    >>> [s.filename for s in extract_sections("## 1. Introduction\\nText\\n")]
+    ['introduction.tex']
+"""
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    'MarkdownToLatexConverter': 'converter',
+    'Section': 'sections',
+    'extract_sections': 'sections',
+    'section_title_to_filename': 'sections',
+    'strip_section_numbering': 'sections',
+    'document_body': 'writer',
+    'write_sections': 'writer',
+    'ValidationError': 'validator',
+    'basic_cleanup': 'validator',
+    'validate_markdown_structure': 'validator',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,456 @@
+"""
+Markdown to LaTeX conversion.
+
+:class:`MarkdownToLatexConverter` turns a Markdown document into one LaTeX
+file per ``##`` section (see :mod:`md2latex.sections`), applying an ordered
+table of regex rules to text and fenced code to listings pre-rendered once
+(``listing_cache.py``) or, as a fallback, ``lstlisting`` environments.
+Converted sections are cached by content (``artifact_cache.py``), very large
+ones are converted in parallel chunks and the others block by block, so an
+edit reconverts only the blocks it touched (``section_chunks.py``). Every
+section runs under the ``MD2LATEX_SECTION_BUDGET`` time budget.
+
+Importing this module does no work: the cache, image pipeline, listing and
+chunking modules are loaded, and directories created, only when a conversion needs
+them.
+"""
+import logging
+import os
+import re
+from functools import lru_cache, partial
+
+from prefilter import Prefilter
+from time_budget import section_budget, time_budget
+
+from . import writer
+from .sections import extract_sections, strip_section_numbering
+
+logger = logging.getLogger('md2latex.converter')
+
+# Fenced code blocks, with the language in group 1 and the code in group 2
+CODE_FENCE_PATTERN = r'```(?:([a-zA-Z0-9_+-]*))?\s*\n([\s\S]*?)```'
+
+
+@lru_cache(maxsize=None)
+def converter_version() -> str:
+    """Converted sections are cached against this converter's source (see artifact_cache.py)."""
+    import artifact_cache
+    import image_pipeline
+    import listing_cache
+    return artifact_cache.source_version(__file__, image_pipeline.__file__, listing_cache.__file__)
+
+
+class MarkdownToLatexConverter:
+    def __init__(self, md_file_path, sections_dir="sections", images_dir="images", preprocess_images=True,
+                 prerender_listings=True, base_output_dir=None):
+        self.md_file_path = md_file_path
+        self.sections_dir = sections_dir
+        self.images_dir = images_dir
+        # Column-width derivatives of large images (see image_pipeline.py)
+        self.preprocess_images = preprocess_images
+        # Code blocks highlighted once into cached fragments (see listing_cache.py)
+        self.prerender_listings = prerender_listings
+        # Directory pdflatex compiles main.tex in; image and listing paths are relative to it
+        self.base_output_dir = os.path.abspath(base_output_dir) if base_output_dir else os.path.dirname(os.path.abspath('main.tex'))
+        # (section, LaTeX) pairs of the last process_and_write_sections()
+        self.converted = []
+
+        # Define transformation rules: (pattern, replacement_or_handler, scope, order, triggers)
+        # Order can be used if sequence of application is critical for some rules.
+        # A rule is skipped for segments containing none of its trigger literals (see prefilter.py).
+        self.transformation_rules = [
+            # Text processing rules (applied to non-code segments)
+            # Headers - process deeper levels first
+            (r'^\s*#{3,}\s+(.+)$', lambda m: '\\paragraph{' + self._strip_section_numbering(m.group(1)) + '}', 'text', 10, ('#',)),
+            (r'^\s*#{2}\s+(.+)$', lambda m: '\\subsection{' + self._strip_section_numbering(m.group(1)) + '}', 'text', 20, ('#',)),
+            (r'^\s*#{1}\s+(.+)$', lambda m: '\\section{' + self._strip_section_numbering(m.group(1)) + '}', 'text', 30, ('#',)),
+            # Defensive header catch-all (if any missed)
+            (r'^\s*\\*#+\s+(.+)$', lambda m: '\\' + ('sub' * min(2, m.group(0).count('#')-1)) + 'section{' + self._strip_section_numbering(m.group(1).strip()) + '}', 'text', 40, ('#',)),
+            (r'^(?P<pre>[^\\][^#]*?)#', lambda m: m.group('pre') + r'\\#', 'text', 50, ('#',)), # Escape stray # not at start of line or after command
+            
+            # Bold and Italics
+            (r'\[\[([^\]]+)\]\]', r'\\textbf{\\textit{\1}}', 'text', 60, ('[[',)), # [[text]] for bold italics
+            (r'\*\*(.+?)\*\*', r'\\textbf{\1}', 'text', 70, ('*',)),
+            (r'\*(.+?)\*', r'\\emph{\1}', 'text', 80, ('*',)),
+
+            # Lists - Labeled dash bullets first
+            (r'(^|\n)[ \t]*-[ \t]*([^\n:]+):[ \t]*(.+)', r'\1\n\\noindent\\textbf{\2:} \3\n', 'text', 90, ('-',)),
+            # Regular dash bullets
+            (r'(^|\n)[ \t]*-[ \t]*(?!\\noindent)(.+)', r'\1\n\\noindent \2\n', 'text', 100, ('-',)),
+            
+            # Star bullets - Labeled with description and optional following content
+            (r'(^|\n)\s*\*\s+([^\n:]+):\s*([^\n]+)(?:\n+([^\n*][^\n]+(?:\n+(?!\s*\*\s+)[^\n]+)*))?', self._process_labeled_star_bullets, 'text', 110, ('*',)),
+            # Regular star bullets with optional following content
+            (r'(^|\n)\s*\*\s+([^\n:][^\n]*)(?:\n+([^\n*][^\n]+(?:\n+(?!\s*\*\s+)[^\n]+)*))?', self._process_regular_star_bullets, 'text', 120, ('*',)),
+            # Simple star bullets (no extensive following content)
+            (r'(^|\n)\s*\*\s+([^\n]+)(?!\n+(?!\s*\*\s+)[^\n]+)', self._process_simple_star_bullet, 'text', 130, ('*',)),
+
+            # mcfile tags
+            (r'<mcfile\s+name="([^"]+)"\s+path="([^"]+)"></mcfile>', 
+             lambda m: f'\\textit{{\\href{{file://{{{m.group(2)}}}}}{{{m.group(1)}}}}}', 'text', 140, ('<mcfile',)),
+            
+            # Em-dash spacing (ensure space after --- if not followed by space)
+            (r'---(?!\\s)', '--- ', 'text', 145, ('---',)),
+
+            # Inline code (must be processed carefully after other text elements)
+            (r'`([^`]+)`', self._process_inline_code_segment, 'text', 150, ('`',)),
+            
+            # General underscore escaping (late, to avoid interfering with specific syntax);
+            # inline code leaves __ESCAPED_SEQ_n__ placeholders behind for it to escape
+            (r'(?<!\\)_', r'\\_', 'text', 160, ('_', '`')),
+        ]
+        passes = {rule[0]: rule[4] for rule in self.transformation_rules if rule[2] == 'text'}
+        header_cleanup = ('#', '}', '\\section{', '\\subsection{', '\\subsubsection{', '\\paragraph{')
+        self.prefilter = Prefilter('refactored', {'clean_headers': header_cleanup, 'image_links': ('!',), **passes})
+
+    @property
+    def derived_images_dir(self):
+        import image_pipeline
+        return os.path.join(self.images_dir, image_pipeline.DERIVED_SUBDIR)
+
+    @property
+    def listings_dir(self):
+        import listing_cache
+        return os.path.join(self.sections_dir, listing_cache.LISTINGS_SUBDIR)
+
+    def _strip_section_numbering(self, header_text):
+        return strip_section_numbering(header_text)
+
+    def _clean_header_lines(self, text):
+        text = re.sub(r'^\\+(#+)\s+(.+)$', r'\1 \2', text, flags=re.MULTILINE)
+        text = re.sub(r'^\\##\s+##\s+(.+)$', r'#### \1', text, flags=re.MULTILINE)
+        text = re.sub(r'^(#+)\s+(.+)$', lambda m: '#' * len(m.group(1)) + ' ' + m.group(2), text, flags=re.MULTILINE)
+        text = re.sub(r'^\\(#+\s+.+)$', r'\1', text, flags=re.MULTILINE)
+        # Ensure section commands have proper closing braces
+        for cmd in ['section', 'subsection', 'subsubsection', 'paragraph']:
+            text = re.sub(r'^(\\' + cmd + r'\{[^}]*?)$', r'\1}', text, flags=re.MULTILINE)
+            text = re.sub(r'^(\\' + cmd + r'\{[^}]*[^}\n])$', r'\1}', text, flags=re.MULTILINE)
+        text = re.sub(r'^}\s*$', '', text, flags=re.MULTILINE) # Remove standalone closing braces
+        return text
+
+    def _find_image_file(self, image_name):
+        import glob
+        if not os.path.exists(self.images_dir):
+            return None
+        image_files = glob.glob(os.path.join(self.images_dir, '*'))
+        for file_path in image_files:
+            if os.path.basename(file_path) == image_name:
+                return file_path
+        image_name_lower = image_name.lower()
+        for file_path in image_files:
+            if os.path.basename(file_path).lower() == image_name_lower:
+                return file_path
+        return None
+
+    def _process_image_links(self, text):
+        import image_pipeline
+        pattern = image_pipeline.IMAGE_LINK_PATTERN
+
+        # Downscale all referenced images in parallel before building figure blocks
+        derivatives = {}
+        if self.preprocess_images:
+            image_files = image_pipeline.referenced_images(text, self._find_image_file)
+            derivatives = image_pipeline.preprocess_images(image_files, self.derived_images_dir)
+
+        def replace_image(match):
+            full_match, label, image_name = match.group(0), match.group(1).strip(), match.group(2).strip()
+            if not image_name:
+                return full_match
+            
+            image_file = self._find_image_file(image_name)
+            if not image_file:
+                logger.warning(f"Image '{image_name}' not found in {self.images_dir}")
+                return full_match
+            image_file = derivatives.get(image_file, image_file)
+            
+            try:
+                rel_path = os.path.relpath(os.path.abspath(image_file), self.base_output_dir)
+                rel_path = rel_path.replace('\\', '/').replace('//', '/')
+                base_name = os.path.splitext(os.path.basename(image_name))[0]
+                safe_label = re.sub(r'[^a-zA-Z0-9]', '', base_name).lower()
+                caption = label if label else base_name.replace('_', ' ').title()
+                
+                return (
+                    '\n\\begin{figure}[H]\n'
+                    '  \\centering\n'
+                    f'  \\includegraphics[width=\\linewidth]{{{rel_path}}}\n'
+                    f'  \\caption{{{caption}}}\n'
+                    f'  \\label{{fig:{safe_label}}}\n'
+                    '\\end{figure}\n'
+                )
+            except Exception as e:
+                logger.error(f"Error processing image {image_name}: {str(e)}")
+                return full_match
+        
+        return re.sub(pattern, replace_image, text, flags=re.MULTILINE)
+
+    def _process_inline_code_segment(self, match):
+        code_text = match.group(1)
+        if code_text is None: code_text = '' # Ensure code_text is a string
+
+        escaped_sequences = {}
+        def preserve_escapes(m):
+            placeholder = f"__ESCAPED_SEQ_{len(escaped_sequences)}__"
+            escaped_sequences[placeholder] = m.group(0)
+            return placeholder
+        code_text = re.sub(r'\\([\\%&$#_{}^~])', preserve_escapes, code_text)
+
+        math_patterns = [
+            (r'\(([^\)]+?)\^([^\)]+?)\s*-\s*([^\)]+?)\)', r'$(\1^{\2} - \3)$'),
+            (r'(\w+)\^(\w+)', r'$\1^{\2}$'),
+            (r'(\w+)_(\w+)', r'$\1_{\2}$'),
+        ]
+        for pattern, replacement in math_patterns:
+            code_text = re.sub(pattern, replacement, code_text)
+        
+        code_text = re.sub(r'\^(?![{\w])', r'\\^{}', code_text) # Caret escaping
+
+        def escape_outside_math(text_segment):
+            parts = re.split(r'(\$[^\$]*\$)', text_segment)
+            result = []
+            for i, part in enumerate(parts):
+                if i % 2 == 1: result.append(part)
+                else:
+                    escaped_part = part
+                    for char in ['%', '&', '#', '_', '~']:
+                        escaped_part = escaped_part.replace(char, f'\\{char}')
+                    result.append(escaped_part)
+            return ''.join(result)
+        
+        code_text = escape_outside_math(code_text)
+
+        for placeholder, original in escaped_sequences.items():
+            code_text = code_text.replace(placeholder, original)
+        
+        return f'\\texttt{{{code_text}}}'
+
+    # Bullet point handlers (from original script, adapted)
+    def _process_labeled_star_bullets(self, match):
+        prefix, label, description, following_content_raw = match.groups()
+        label = label.strip()
+        description = description.strip()
+        following_content = ""
+        if following_content_raw:
+            content_lines = [line.strip() for line in following_content_raw.strip().split('\n')]
+            content_text = ' '.join(content_lines)
+            following_content = f"\n\n\\vspace{{0.5em}}\n\\noindent\\hspace{{2em}}{content_text}\n\\vspace{{0.5em}}\n"
+        return f"{prefix or ''}\\begin{{itemize}}\n\\item \\textbf{{{label}:}} {description}{following_content}\n\\end{{itemize}}\n"
+
+    def _process_regular_star_bullets(self, match):
+        prefix, bullet_text, following_content_raw = match.groups()
+        bullet_text = bullet_text.strip()
+        following_content = ""
+        if following_content_raw:
+            content_lines = [line.strip() for line in following_content_raw.strip().split('\n')]
+            content_text = ' '.join(content_lines)
+            following_content = f"\n\n\\vspace{{0.5em}}\n\\noindent\\hspace{{2em}}{content_text}\n\\vspace{{0.5em}}\n"
+        return f"{prefix or ''}\\begin{{itemize}}\n\\item {bullet_text}{following_content}\n\\end{{itemize}}\n"
+
+    def _process_simple_star_bullet(self, match):
+        prefix, bullet = match.groups()
+        bullet = bullet.strip()
+        if ':' in bullet and not bullet.startswith('\\'):
+            label, desc = bullet.split(':', 1)
+            return f"{prefix or ''}\\begin{{itemize}}\n\\item \\textbf{{{label.strip()}:}} {desc.strip()}\n\\end{{itemize}}\n"
+        return f"{prefix or ''}\\begin{{itemize}}\n\\item {bullet}\n\\end{{itemize}}\n"
+
+    def _convert_text_segment(self, text_segment):
+        # Apply general text transformations based on rules
+        # Ensure headers are cleaned first
+        present = self.prefilter.scan(text_segment)
+        processed_segment = text_segment
+        if self.prefilter.wants('clean_headers', present):
+            processed_segment = self._clean_header_lines(processed_segment)
+        
+        # Apply ordered transformation rules
+        # Sort rules by 'order' if provided, else default to 0
+        sorted_rules = sorted([rule for rule in self.transformation_rules if rule[2] == 'text'], key=lambda r: r[3] if len(r) > 3 else 0)
+
+        for pattern, replacement_or_handler, scope, *_ in sorted_rules:
+            if not self.prefilter.wants(pattern, present):
+                continue
+            if callable(replacement_or_handler):
+                processed_segment = re.sub(pattern, replacement_or_handler, processed_segment, flags=re.MULTILINE)
+            else:
+                processed_segment = re.sub(pattern, replacement_or_handler, processed_segment, flags=re.MULTILINE)
+        return processed_segment
+
+    def convert_section_content_to_latex(self, md_content):
+        # Preprocessing: Handle image links first as they introduce block elements
+        if self.prefilter.wants('image_links', self.prefilter.scan(md_content)):
+            md_content = self._process_image_links(md_content)
+
+        # Split into code blocks and text segments
+        segments = []
+        last_end = 0
+        # Regex for code blocks ```lang\ncode``` or ```\ncode```
+        for match in re.finditer(CODE_FENCE_PATTERN, md_content):
+            if match.start() > last_end:
+                segments.append({'type': 'text', 'content': md_content[last_end:match.start()]})
+            
+            lang = match.group(1) or 'Python' # Default to Python
+            code = match.group(2)
+            segments.append({'type': 'code', 'content': code, 'language': lang})
+            last_end = match.end()
+        
+        if last_end < len(md_content):
+            segments.append({'type': 'text', 'content': md_content[last_end:]})
+
+        latex_parts = []
+        for segment in segments:
+            if segment['type'] == 'text':
+                latex_parts.append(self._convert_text_segment(segment['content']))
+            elif segment['type'] == 'code':
+                code_content = segment['content']
+                lang = segment['language']
+                listings_lang_map = {
+                    'python': 'Python', 'py': 'Python', 'java': 'Java', 
+                    'javascript': 'JavaScript', 'js': 'JavaScript', 'c': 'C', 
+                    'cpp': 'C++', 'c++': 'C++', 'bash': 'bash', 'sh': 'bash',
+                    'pseudocode': 'Pseudocode', # Added from original
+                }
+                listings_lang = listings_lang_map.get(lang.lower(), 'Python')
+                
+                caption = ''
+                # Simplified caption extraction from original script
+                if code_content.strip().startswith(('def ', 'function ', 'class ', '# ')):
+                    first_line = code_content.strip().split('\n')[0].strip()
+                    for prefix in ['def ', 'function ', 'class ', '# ']:
+                        if first_line.startswith(prefix):
+                            caption = first_line[len(prefix):].split('(')[0].strip() + ' Algorithm'
+                            break
+                escaped_caption = caption.replace('_', r'\_') if caption else ""
+                caption_text = f",caption={{{escaped_caption}}}" if caption else ""
+                
+                tex_code = None
+                if self.prerender_listings:
+                    import listing_cache
+                    tex_code = listing_cache.render_listing(
+                        code_content, listings_lang, escaped_caption, self.listings_dir,
+                        os.path.relpath(os.path.abspath(self.listings_dir), self.base_output_dir))
+                if tex_code is None:
+                    tex_code = f"\\begin{{lstlisting}}[language={listings_lang}{caption_text}]\n{code_content.rstrip()}\n\\end{{lstlisting}}"
+                latex_parts.append(tex_code)
+        
+        return "".join(latex_parts)
+
+    def _section_cache_key(self, md_content):
+        import artifact_cache
+        import image_pipeline
+        # Output depends on the Markdown, the referenced images, where figure
+        # paths are made relative to, and this converter's source
+        images = [artifact_cache.file_digest(p) for p in image_pipeline.referenced_images(md_content, self._find_image_file)]
+        return artifact_cache.ArtifactCache.key(
+            'section-refactored',
+            [md_content, os.path.relpath(os.path.abspath(self.images_dir), self.base_output_dir), str(self.preprocess_images),
+             os.path.relpath(os.path.abspath(self.listings_dir), self.base_output_dir), str(self.prerender_listings)] + images,
+            converter_version())
+
+    def _restore_outputs(self, md_content, latex_content):
+        """Recreate the listing fragments and image derivatives cached LaTeX refers to; False if one is gone."""
+        import image_pipeline
+        import listing_cache
+        if self.preprocess_images and not image_pipeline.restore_derivatives(
+                md_content, latex_content, self._find_image_file, self.derived_images_dir):
+            return False
+        return listing_cache.restore_fragments(latex_content, self.base_output_dir)
+
+    def convert_section_cached(self, md_content, title='section'):
+        """Convert one section, reusing the artifact cache when the inputs are unchanged.
+
+        Very large sections are converted as chunks in parallel, others block by
+        block with each block cached (see section_chunks.py).
+        Raises BudgetExceeded if conversion overruns the per-section time budget.
+        """
+        import artifact_cache
+        import section_chunks
+        from build_metrics import metrics
+        with metrics().stage('convert_section', section=title) as sample:
+            sample['bytes'] = len(md_content)
+            cache = artifact_cache.default_cache()
+            key = self._section_cache_key(md_content)
+            latex_content = cache.get_text(key)
+            # Pre-rendered listings and image derivatives it refers to may have been deleted since
+            if latex_content is not None and not self._restore_outputs(md_content, latex_content):
+                latex_content = None
+            sample['cache'] = 'hit' if latex_content is not None else 'miss'
+            if latex_content is None:
+                what = f"Converting section '{title}'"
+                if len(md_content) >= section_chunks.CHUNK_MIN_SECTION:
+                    chunks = section_chunks.split_chunks(md_content, fence_pattern=CODE_FENCE_PATTERN)
+                    if len(chunks) > 1:
+                        # The converter's rule table holds lambdas, so workers rebuild it from the settings
+                        convert = partial(_convert_chunk, self.sections_dir, self.images_dir, self.preprocess_images,
+                                          self.prerender_listings)
+                        latex_content = section_chunks.convert_chunks(
+                            chunks, convert, self._section_cache_key, section_budget(), what)
+                else:
+                    blocks = section_chunks.split_blocks(md_content, fence_pattern=CODE_FENCE_PATTERN)
+                    if len(blocks) > 1:
+                        # Unchanged blocks come from the cache; only edited ones are converted
+                        with time_budget(section_budget(), what):
+                            latex_content = section_chunks.convert_chunks(
+                                blocks, self.convert_section_content_to_latex, self._section_cache_key,
+                                what=what, jobs=1)
+                # Chunks and blocks restored from the cache may refer to since-deleted files too
+                if latex_content is not None and not self._restore_outputs(md_content, latex_content):
+                    latex_content = None
+                if latex_content is None:
+                    with time_budget(section_budget(), what):
+                        latex_content = self.convert_section_content_to_latex(md_content)
+                cache.put_text(key, latex_content)
+        return latex_content
+
+    def extract_sections_from_md(self, md_text):
+        # Top-level sections (##) and their content
+        return extract_sections(md_text)
+
+    def process_and_write_sections(self):
+        """Convert every ``##`` section of the Markdown file and write it to ``sections_dir``.
+
+        Returns True on success, False if the Markdown file cannot be read.
+        Raises BudgetExceeded if a section overruns its time budget.
+        """
+        try:
+            with open(self.md_file_path, 'r', encoding='utf-8') as f:
+                md_content = f.read()
+        except FileNotFoundError:
+            logger.error(f"Markdown file not found: {self.md_file_path}")
+            return False
+        except Exception as e:
+            logger.error(f"Error reading Markdown file {self.md_file_path}: {e}")
+            return False
+
+        from build_metrics import metrics
+        with metrics().stage('extraction') as sample:
+            sample['bytes'] = len(md_content)
+            sections = self.extract_sections_from_md(md_content)
+        if not sections:
+            # As the original script: no '##' sections means no section files
+            logger.warning("No sections found in the Markdown file.")
+            print(f"Processed 0 sections (no '##' headers found).")
+            self.converted = []
+            return True
+
+        os.makedirs(self.images_dir, exist_ok=True)
+        self.converted = []
+        for section in sections:
+            latex_content = self.convert_section_cached(section.content, section.title)
+            self.converted.append((section, latex_content))
+            writer.write_sections([(section, latex_content)], self.sections_dir)
+
+        import artifact_cache
+        cache = artifact_cache.default_cache()
+        logger.info(cache.summary())
+        cache.flush_stats()
+        print(f"Processed {len(sections)} sections.")
+        return True
+
+    def get_latex_content(self):
+        """The converted sections as one document body (after process_and_write_sections())."""
+        return writer.document_body(self.converted)
+
+def _convert_chunk(sections_dir, images_dir, preprocess_images, prerender_listings, md_content):
+    """Convert one chunk of a section in a worker process."""
+    converter = MarkdownToLatexConverter('', sections_dir, images_dir, preprocess_images, prerender_listings)
+    return converter.convert_section_content_to_latex(md_content)
@@ -0,0 +1,139 @@
+"""
+Import-time check for the md2latex package.
+
+Short command-line runs (validating a file, converting one section) should
+not pay for the whole build's dependencies. This imports the package's
+modules in a fresh interpreter under ``python -X importtime``, from an empty
+working directory, and fails if
+
+* the cumulative import time of the best of ``--runs`` exceeds ``--budget``
+  milliseconds,
+* a deferred module (``subprocess``, ``argparse``, ``glob``, the artifact
+  cache, ...) was imported, or
+* importing created anything in the working directory.
+
+Bytecode caching is left enabled in the child so the steady state is
+measured, not the first compile.
+
+Usage:
+    python3 -m md2latex.importtime [--budget 50] [--runs 5] [-v]
+"""
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Sequence
+
+MODULES = ('md2latex', 'md2latex.converter', 'md2latex.sections', 'md2latex.writer', 'md2latex.validator')
+# Loaded on first use only (conversion, caching, CLI parsing)
+DEFERRED = ('subprocess', 'argparse', 'glob', 'shutil', 'json', 'hashlib', 'tempfile',
+            'concurrent', 'multiprocessing', 'numpy', 'PIL', 'pygments',
+            'artifact_cache', 'build_metrics', 'image_pipeline', 'listing_cache', 'section_chunks')
+DEFAULT_BUDGET_MS = 50.0
+DEFAULT_RUNS = 5
+
+_MARKER = '-- md2latex import --'
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+class ImportProfile(NamedTuple):
+    """One ``-X importtime`` run of the package import."""
+
+    total_ms: float
+    # Module -> (self ms, cumulative ms, nesting depth), in import order
+    modules: Dict[str, tuple]
+
+
+def parse_importtime(stderr: str) -> ImportProfile:
+    """Profile of the imports logged after the marker (interpreter startup excluded)."""
+    modules: Dict[str, tuple] = {}
+    lines = stderr.splitlines()
+    if _MARKER in lines:
+        lines = lines[lines.index(_MARKER) + 1:]
+    for line in lines:
+        match = _LINE.match(line)
+        if match:
+            depth = len(match.group(3)) // 2
+            modules[match.group(4)] = (int(match.group(1)) / 1000, int(match.group(2)) / 1000, depth)
+    total = sum(cumulative for _, cumulative, depth in modules.values() if depth == 0)
+    return ImportProfile(total, modules)
+
+
+def deferred_imports(profile: ImportProfile, deferred: Sequence[str] = DEFERRED) -> List[str]:
+    """Deferred modules (or their submodules) that the import loaded."""
+    return [name for name in profile.modules
+            if any(name == d or name.startswith(d + '.') for d in deferred)]
+
+
+def profile_import(modules: Sequence[str] = MODULES, runs: int = DEFAULT_RUNS) -> tuple:
+    """
+    Import ``modules`` in ``runs`` fresh interpreters from an empty directory.
+
+    Returns:
+        (fastest ImportProfile, files the imports left in the working directory)
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    import subprocess
+    import tempfile
+
+    root = str(Path(__file__).resolve().parent.parent)
+    env = {k: v for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE'}
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    code = f"import sys; sys.stderr.write({_MARKER!r} + '\\n'); import " + ', '.join(modules)
+    best = None
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(max(runs, 1)):
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd, env=env,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+            profile = parse_importtime(result.stderr)
+            if best is None or profile.total_ms < best.total_ms:
+                best = profile
+        leftovers = sorted(os.listdir(cwd))
+    return best, leftovers
+
+
+def main() -> int:
+    """Check the package's import time and side effects."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check that importing md2latex stays cheap and side-effect free')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help='Import-time budget in ms')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Fresh interpreters to time (best is used)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='List the slowest modules imported')
+    args = parser.parse_args()
+
+    try:
+        profile, leftovers = profile_import(MODULES, args.runs)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+
+    for name in MODULES:
+        if name in profile.modules:
+            print(f"{name:<24} {profile.modules[name][1]:>7.1f} ms")
+    print(f"{'total':<24} {profile.total_ms:>7.1f} ms (budget {args.budget:g} ms, "
+          f"{len(profile.modules)} modules, best of {args.runs})")
+    if args.verbose:
+        slowest = sorted(profile.modules.items(), key=lambda item: -item[1][0])[:15]
+        for name, (own, _, _) in slowest:
+            print(f"  {name:<32} {own:>6.2f} ms self")
+
+    failures = []
+    if profile.total_ms > args.budget:
+        failures.append(f"import took {profile.total_ms:.1f} ms, over the {args.budget:g} ms budget")
+    loaded = deferred_imports(profile)
+    if loaded:
+        failures.append(f"deferred modules imported: {', '.join(loaded)}")
+    if leftovers:
+        failures.append(f"import created files in the working directory: {', '.join(leftovers)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
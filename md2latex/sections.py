@@ -0,0 +1,51 @@
+"""
+Section extraction.
+
+A source document is split into its top-level (``##``) sections; each
+becomes one ``sections/<name>.tex`` file, named after the title without its
+number.
+"""
+import re
+from typing import List, NamedTuple
+
+# A top-level section runs from its ``##`` heading to the next one
+SECTION_PATTERN = re.compile(r'^##\s+(.+?)\n([\s\S]*?)(?=^##\s+|\Z)', re.MULTILINE)
+
+
+class Section(NamedTuple):
+    """One ``##`` section of the source document."""
+
+    title: str
+    content: str
+    filename: str
+
+
+def section_title_to_filename(title: str) -> str:
+    """``'3. Performance Benchmarking'`` -> ``'performance_benchmarking.tex'``."""
+    title = re.sub(r"^\d+[. ]*", "", title.strip())
+    title = title.lower()
+    title = re.sub(r"[^a-z0-9]+", "_", title)
+    title = re.sub(r"_+", "_", title).strip('_')
+    return f"{title}.tex"
+
+
+def strip_section_numbering(header_text: str) -> str:
+    """Remove a numerical prefix: ``'3.2 Introduction'`` -> ``'Introduction'``."""
+    return re.sub(r'^(\d+(\.\d+)*)\s+(.+)$', r'\3', header_text)
+
+
+def extract_sections(md_text: str) -> List[Section]:
+    """
+    Split Markdown into its ``##`` sections.
+
+    Args:
+        md_text: Source document
+
+    Returns:
+        Sections in document order (text before the first ``##`` is dropped)
+    """
+    sections = []
+    for match in SECTION_PATTERN.finditer(md_text):
+        title = match.group(1).strip()
+        sections.append(Section(title, match.group(2).strip(), section_title_to_filename(title)))
+    return sections
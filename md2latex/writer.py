@@ -0,0 +1,54 @@
+"""
+Output of converted sections.
+
+:func:`write_sections` writes one ``.tex`` file per section for ``main.tex``
+to ``\\input``; :func:`document_body` joins them under ``\\section``
+headings for documents generated without a hand-written ``main.tex``.
+"""
+import logging
+import os
+import re
+from typing import List, Sequence, Tuple
+
+from .sections import Section
+
+logger = logging.getLogger('md2latex.writer')
+
+Converted = Tuple[Section, str]
+
+
+def write_sections(converted: Sequence[Converted], sections_dir: str) -> List[str]:
+    """
+    Write each section's LaTeX to ``<sections_dir>/<filename>``.
+
+    Args:
+        converted: (section, LaTeX) pairs
+        sections_dir: Output directory, created if missing
+
+    Returns:
+        Paths written; sections that could not be written are logged and skipped
+    """
+    os.makedirs(sections_dir, exist_ok=True)
+    written = []
+    for section, latex_content in converted:
+        out_path = os.path.join(sections_dir, section.filename)
+        try:
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(latex_content)
+            logger.info(f"Wrote {out_path} ({len(latex_content)} chars)")
+            written.append(out_path)
+        except OSError as e:
+            logger.error(f"Error writing LaTeX file {out_path}: {e}")
+    return written
+
+
+def _heading(title: str) -> str:
+    # '3. Results & Notes' -> 'Results \& Notes'
+    title = re.sub(r'^\d+(\.\d+)*\.?\s+', '', title)
+    return re.sub(r'(?<!\\)([&%#_])', r'\\\1', title)
+
+
+def document_body(converted: Sequence[Converted]) -> str:
+    """The sections' LaTeX in order, each under a ``\\section`` with its unnumbered title."""
+    return '\n\n'.join(f"\\section{{{_heading(section.title)}}}\n{latex_content}"
+                       for section, latex_content in converted)
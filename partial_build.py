@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Partial compile of the sections that changed since the last build.
+
+``main.tex`` pulls every section in with ``\\input``, so editing one section
+re-typesets the whole paper. This stage writes a driver,
+``build/partial/main.tex``, in which each ``\\section{...}`` /
+``\\input{sections/<name>}`` pair (and the appendix) becomes
+``\\include{units/<name>}``, and compiles it with ``\\includeonly`` listing
+only the units whose inputs changed. LaTeX reads the ``.aux`` files of the
+units left out, so their labels, citations, counters and page numbers are
+still known to the units that are typeset. The PDF holds the changed
+sections only; ``make`` remains the full build of the real document.
+
+A unit is stale when the digest of its section file and everything it
+inputs or includes (figures, images) differs from the one recorded in
+``build/partial/manifest.json``, or when its ``.aux`` is missing. Any change
+outside the units (preamble, title block, abstract, local packages) makes
+every unit stale. When a typeset unit ends on a different page or with
+different counters than before, the units after it are stale too and are
+typeset in another round.
+
+``\\include`` starts each unit on a new page, so the layout differs from the
+full build where sections run on; page numbers are those of the partial
+driver.
+
+Usage:
+    python3 partial_build.py [main] [--out build/partial] [--full] [--bibtex bibtex]
+"""
+import hashlib
+import json
+import logging
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set
+
+from artifact_cache import file_digest
+
+logger = logging.getLogger('md2latex.partial')
+
+DEFAULT_OUT_DIR = Path('build') / 'partial'
+UNITS_DIR = 'units'
+MANIFEST_NAME = 'manifest.json'
+# pdflatex passes per round (references, then the .bbl)
+MAX_PASSES = 3
+
+SECTION_LINE = re.compile(r'^\s*\\section\*?\{.*\}\s*$')
+SECTION_INPUT_LINE = re.compile(r'^\s*\\input\{(sections/[^}]+?)(?:\.tex)?\}\s*$')
+# Files a section pulls in: \input/\include, \includegraphics and local packages
+REFERENCE_PATTERN = re.compile(r'\\(input|include|includegraphics|usepackage)\s*(?:\[[^\]]*\])?\s*\{([^}]+)\}')
+CHECKPOINT_PATTERN = re.compile(r'\\@setckpt\{[^}]*\}\{(.*)\}', re.DOTALL)
+
+
+class Unit(NamedTuple):
+    """One section of ``main.tex`` compiled as an ``\\include`` unit."""
+
+    name: str
+    # Lines replaced by the \include (the \section heading, if any, and the \input)
+    lines: List[str]
+    source: str
+
+    @property
+    def include_name(self) -> str:
+        return f"{UNITS_DIR}/{self.name}"
+
+
+class Driver(NamedTuple):
+    """``main.tex`` with its sections split out as units."""
+
+    preamble: List[str]
+    body: List[str]
+    units: List[Unit]
+
+    def text(self, only: Optional[Sequence[str]] = None) -> str:
+        """The driver source, with ``\\includeonly`` listing ``only`` (default: all units)."""
+        names = [u.include_name for u in self.units if only is None or u.name in only]
+        lines = self.preamble + [f"\\includeonly{{{','.join(names)}}}"] + self.body
+        return ''.join(line if line.endswith('\n') else line + '\n' for line in lines)
+
+
+def parse_main(text: str) -> Driver:
+    """
+    Split ``main.tex`` into the frame and its section units.
+
+    A unit is an uncommented ``\\input{sections/<name>}`` after
+    ``\\begin{document}`` that follows a ``\\section`` line or ``\\appendix``
+    (blank lines aside). Other inputs, such as the abstract in the one-column
+    title block, stay in the frame since ``\\include`` would break the page.
+
+    Args:
+        text: Contents of ``main.tex``
+
+    Returns:
+        Driver whose body has ``\\include{units/<name>}`` in place of each unit
+    """
+    lines = text.splitlines(keepends=True)
+    begin = next((i for i, line in enumerate(lines) if line.strip().startswith('\\begin{document}')), None)
+    if begin is None:
+        raise ValueError("No \\begin{document} found")
+
+    body: List[str] = []
+    units: List[Unit] = []
+    for line in lines[begin:]:
+        match = SECTION_INPUT_LINE.match(line)
+        previous = next((i for i in range(len(body) - 1, -1, -1) if body[i].strip()), None)
+        heading = body[previous] if previous is not None else ''
+        if match and (SECTION_LINE.match(heading) or heading.strip() == '\\appendix'):
+            name = Path(match.group(1)).name
+            unit_lines = [line]
+            if SECTION_LINE.match(heading):
+                unit_lines.insert(0, body[previous])
+                del body[previous:]
+            units.append(Unit(name, unit_lines, match.group(1) + '.tex'))
+            body.append(f"\\include{{{UNITS_DIR}/{name}}}\n")
+        else:
+            body.append(line)
+    return Driver(lines[:begin], body, units)
+
+
+def _resolve(name: str, kind: str, root: Path) -> Optional[Path]:
+    name = name.replace('\\_', '_').strip()
+    candidates = [root / name]
+    if kind in ('input', 'include'):
+        candidates.append(root / f"{name}.tex")
+    elif kind == 'usepackage':
+        candidates = [root / f"{name}.sty"]
+    return next((p for p in candidates if p.is_file()), None)
+
+
+def dependencies(text: str, root: Path, seen: Optional[Set[Path]] = None) -> List[Path]:
+    """
+    Local files ``text`` inputs, includes or loads, followed recursively.
+
+    Args:
+        text: LaTeX source (comments are ignored)
+        root: Directory paths are relative to
+        seen: Files already collected (updated in place)
+
+    Returns:
+        Paths in first-reference order; packages and files outside ``root`` are skipped
+    """
+    seen = set() if seen is None else seen
+    found = []
+    for line in text.splitlines():
+        line = re.sub(r'(?<!\\)%.*', '', line)
+        for match in REFERENCE_PATTERN.finditer(line):
+            for name in match.group(2).split(','):
+                path = _resolve(name, match.group(1), root)
+                if path is None or path in seen:
+                    continue
+                seen.add(path)
+                found.append(path)
+                if path.suffix in ('.tex', '.sty'):
+                    found.extend(dependencies(path.read_text(encoding='utf-8', errors='replace'), root, seen))
+    return found
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def unit_digest(unit: Unit, root: Path) -> str:
+    """Digest of a unit's heading, section file and everything it references."""
+    source = root / unit.source
+    text = source.read_text(encoding='utf-8', errors='replace') if source.exists() else ''
+    files = [source] + dependencies(text, root, {source})
+    parts = ''.join(unit.lines) + ''.join(f"{p.relative_to(root)}:{file_digest(p)}\n" for p in files if p.exists())
+    return _digest(parts)
+
+
+def frame_digest(driver: Driver, root: Path) -> str:
+    """Digest of the driver outside the units and the files it references."""
+    text = ''.join(driver.preamble + driver.body)
+    parts = text + ''.join(f"{p.relative_to(root)}:{file_digest(p)}\n" for p in dependencies(text, root))
+    return _digest(parts)
+
+
+def checkpoint(out_dir: Path, unit: Unit) -> Optional[str]:
+    """Counters recorded at the end of a unit (page, section, figure, ...), or None."""
+    aux = out_dir / f"{unit.include_name}.aux"
+    if not aux.exists():
+        return None
+    match = CHECKPOINT_PATTERN.search(aux.read_text(encoding='utf-8', errors='replace'))
+    return match.group(1).strip() if match else None
+
+
+def _load_manifest(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def stale_units(driver: Driver, root: Path, out_dir: Path, manifest: dict) -> Dict[str, str]:
+    """
+    Units that need typesetting, with their current digests.
+
+    Args:
+        driver: Parsed driver
+        root: Directory holding ``main.tex``
+        out_dir: Partial build directory
+        manifest: Digests recorded by the last successful build
+
+    Returns:
+        Mapping of stale unit name -> current digest, in document order
+    """
+    recorded = manifest.get('units', {}) if manifest.get('frame') == frame_digest(driver, root) else {}
+    stale = {}
+    for unit in driver.units:
+        digest = unit_digest(unit, root)
+        if recorded.get(unit.name) != digest or not (out_dir / f"{unit.include_name}.aux").exists():
+            stale[unit.name] = digest
+    return stale
+
+
+def _compile(job: str, root: Path, out_dir: Path, bibtex: str) -> bool:
+    """Run pdflatex (and BibTeX when the citations changed) until references settle."""
+    from bibliography import update_bbl
+    from latex_log import run_passes, texinputs_env
+
+    cmd = ['pdflatex', '-interaction=nonstopmode', '-file-line-error', f'{job}.tex']
+    # The build directory first (driver, units), then the sources
+    env = texinputs_env('.', root.resolve())
+    result, pass_number, _ = run_passes(
+        cmd, out_dir, job, max_passes=MAX_PASSES, env=env,
+        after_pass=lambda n, _: n == 1 and update_bbl(job, out_dir, bib_dir=root, bibtex=bibtex))
+    if result.returncode != 0 or result.aborted:
+        message = (f"LaTeX compilation aborted on pass {pass_number}: {result.fatal_error.message}"
+                   if result.fatal_error else f"LaTeX compilation failed with return code {result.returncode}")
+        error_log = out_dir / 'latex_compile_error.log'
+        result.write_error_log(error_log, header=message)
+        logger.error(f"{message}; see {error_log}")
+        return False
+    return True
+
+
+def partial_build(main: str = 'main', out_dir: Path = DEFAULT_OUT_DIR, full: bool = False,
+                  bibtex: str = 'bibtex', root: Path = Path('.')) -> bool:
+    """
+    Typeset the units of ``<main>.tex`` that changed since the last build.
+
+    Args:
+        main: Job name of the document
+        out_dir: Build directory for the driver, units, ``.aux`` files and PDF
+        full: Typeset every unit regardless of the manifest
+        bibtex: BibTeX executable
+        root: Directory holding ``<main>.tex`` and the sources
+
+    Returns:
+        True if the build succeeded or nothing needed typesetting
+    """
+    root, out_dir = Path(root), Path(out_dir)
+    driver = parse_main((root / f"{main}.tex").read_text(encoding='utf-8'))
+    if not driver.units:
+        logger.error(f"No \\section/\\input units found in {main}.tex")
+        return False
+
+    (out_dir / UNITS_DIR).mkdir(parents=True, exist_ok=True)
+    for unit in driver.units:
+        (out_dir / f"{unit.include_name}.tex").write_text(''.join(unit.lines), encoding='utf-8')
+
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = {} if full else _load_manifest(manifest_path)
+    stale = stale_units(driver, root, out_dir, manifest)
+    if not stale:
+        logger.info(f"All {len(driver.units)} sections are up to date; nothing to typeset")
+        return True
+
+    order = [unit.name for unit in driver.units]
+    included = set(stale)
+    while True:
+        logger.info(f"Typesetting {len(included)} of {len(order)} sections: "
+                    f"{', '.join(n for n in order if n in included)}")
+        before = {unit.name: checkpoint(out_dir, unit) for unit in driver.units}
+        (out_dir / f"{main}.tex").write_text(driver.text(sorted(included, key=order.index)), encoding='utf-8')
+        if not _compile(main, root, out_dir, bibtex):
+            return False
+
+        # A unit ending on another page or with other counters shifts every
+        # unit after it, whose recorded .aux values are now out of date
+        shifted = next((i for i, unit in enumerate(driver.units)
+                        if unit.name in included and checkpoint(out_dir, unit) != before[unit.name]), None)
+        later = [] if shifted is None else [n for n in order[shifted + 1:] if n not in included]
+        if not later:
+            break
+        logger.info(f"Section '{order[shifted]}' changed the page or counters after it; "
+                    f"adding {len(later)} following sections")
+        stale.update({name: unit_digest(driver.units[order.index(name)], root) for name in later})
+        included.update(later)
+
+    units = dict(manifest.get('units', {})) if manifest.get('frame') == frame_digest(driver, root) else {}
+    units.update({name: stale[name] for name in included})
+    manifest_path.write_text(json.dumps({'frame': frame_digest(driver, root), 'units': units}, indent=2) + '\n')
+    logger.info(f"Partial PDF: {out_dir / f'{main}.pdf'}")
+    return True
+
+
+def main() -> int:
+    """Typeset the changed sections of the document."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compile only the sections that changed, via \\includeonly')
+    parser.add_argument('main', nargs='?', default='main', help='Job name of the document (default: main)')
+    parser.add_argument('--out', default=str(DEFAULT_OUT_DIR), help='Build directory for the partial driver')
+    parser.add_argument('--full', action='store_true', help='Typeset every section, refreshing all .aux files')
+    parser.add_argument('--bibtex', default='bibtex', help='BibTeX executable')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    return 0 if partial_build(args.main, Path(args.out), args.full, args.bibtex) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Digit-wise addition as a tensorized Petri net.
+
+Section 3.3 of ``Tensor_Numerical_Reasoning.md`` models digit positions as
+places and carry/sum as transitions. :func:`addition_net` builds that net
+for ``N``-digit operands:
+
+* places ``a<i>``, ``b<i>`` (operand digit ``i``, least significant first)
+  and ``s<i>`` (sum digit ``i``, with ``s<N>`` taking the final carry);
+  a digit's value is its token count
+* transitions ``ta<i>``/``tb<i>`` move one token from ``a<i>``/``b<i>`` into
+  ``s<i>`` (digit-wise addition), and ``carry<i>`` takes ``base`` tokens from
+  ``s<i>`` and puts one into ``s<i+1>`` (carry propagation and modular
+  reduction)
+
+No place feeds two transitions, so the net is conflict-free: it always
+reaches the same quiescent marking, in which the ``s`` places hold the sum.
+
+Two executors run it over a batch of additions at once:
+
+* :func:`net_add` - the generic engine: operands become a ``(n, 3N + 1)``
+  marking matrix and :func:`petri.simulate.run_to_quiescence` fires every
+  transition its full enabling degree per step, through the incidence
+  matrix.
+* :func:`tensor_add` - the same net with its incidence structure written
+  as array operations on the ``(n, N + 1)`` sum places: after the first step
+  (``s = a + b``) each step computes the carry transitions' enabling degree
+  ``s // base`` for all positions and applies it as one masked update,
+  restricted to the additions still carrying.
+
+Both return digit matrices in the layout of :mod:`gasing.digits`, so they
+can be checked and timed against ``gasing.batch_add`` (see
+``python3 -m petri.bench_addition``).
+"""
+from typing import Tuple
+
+import numpy as np
+
+from gasing.digits import DEFAULT_BASE, DIGIT_DTYPE, _check_base
+
+from .net import MARKING_DTYPE, PetriNet
+from .simulate import run_to_quiescence
+
+
+def addition_net(digits: int, base: int = DEFAULT_BASE) -> PetriNet:
+    """
+    Petri net adding two ``digits``-digit numbers.
+
+    Returns:
+        Net with places ``a0..``, ``b0..``, ``s0..s<digits>`` (in that order)
+        and transitions ``ta<i>``, ``tb<i>``, ``carry<i>``
+    """
+    _check_base(base)
+    places = ([f"a{i}" for i in range(digits)] + [f"b{i}" for i in range(digits)]
+              + [f"s{i}" for i in range(digits + 1)])
+    transitions, arcs = [], []
+    for i in range(digits):
+        transitions += [f"ta{i}", f"tb{i}", f"carry{i}"]
+        arcs += [(f"a{i}", f"ta{i}", 1), (f"ta{i}", f"s{i}", 1),
+                 (f"b{i}", f"tb{i}", 1), (f"tb{i}", f"s{i}", 1),
+                 (f"s{i}", f"carry{i}", base), (f"carry{i}", f"s{i + 1}", 1)]
+    return PetriNet.from_arcs(places, transitions, arcs)
+
+
+def _operands(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    a = np.asarray(a, dtype=DIGIT_DTYPE)
+    b = np.asarray(b, dtype=DIGIT_DTYPE)
+    a = a[None, :] if a.ndim == 1 else a
+    b = b[None, :] if b.ndim == 1 else b
+    if a.shape != b.shape:
+        raise ValueError(f"operand matrices differ in shape: {a.shape} and {b.shape}")
+    return a, b
+
+
+def to_marking(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Markings of :func:`addition_net` for ``(n, N)`` digit matrices (most significant first)."""
+    a, b = _operands(a, b)
+    n, width = a.shape
+    markings = np.zeros((n, 3 * width + 1), dtype=MARKING_DTYPE)
+    markings[:, :width] = a[:, ::-1]
+    markings[:, width:2 * width] = b[:, ::-1]
+    return markings
+
+
+def from_marking(markings: np.ndarray, digits: int) -> np.ndarray:
+    """The ``(n, digits + 1)`` sum digit matrix held by quiescent markings."""
+    return markings[:, 2 * digits:][:, ::-1].astype(DIGIT_DTYPE)
+
+
+def net_add(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE,
+            net: PetriNet = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Add digit matrices by running :func:`addition_net` to quiescence.
+
+    Args:
+        a, b: ``(n, N)`` digit matrices
+        base: Digit base
+        net: Prebuilt ``addition_net(N, base)`` (built if omitted)
+
+    Returns:
+        Tuple of (``(n, N + 1)`` sums, ``(n,)`` steps each addition took)
+    """
+    a, b = _operands(a, b)
+    net = net if net is not None else addition_net(a.shape[1], base)
+    markings, steps = run_to_quiescence(net, to_marking(a, b))
+    return from_marking(markings, a.shape[1]), steps
+
+
+def tensor_add(a: np.ndarray, b: np.ndarray, base: int = DEFAULT_BASE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Add digit matrices with the addition net's steps as masked tensor updates.
+
+    Args:
+        a, b: ``(n, N)`` digit matrices
+        base: Digit base
+
+    Returns:
+        Tuple of (``(n, N + 1)`` sums, ``(n,)`` steps each addition took)
+    """
+    _check_base(base)
+    a, b = _operands(a, b)
+    n, width = a.shape
+    # Step 1: every ta/tb fires fully, s = a + b (at most 2 * (base - 1))
+    sums = np.zeros((n, width + 1), dtype=np.int16)
+    sums[:, 1:] = a
+    sums[:, 1:] += b
+    steps = np.ones(n, dtype=np.int64)
+    active = np.flatnonzero((sums >= base).any(axis=1))
+    while active.size:
+        block = sums[active]
+        carry = block // base          # enabling degree of carry<i> (0 or 1)
+        block -= carry * base
+        block[:, :-1] += carry[:, 1:]  # s<i+1> sits one column to the left
+        sums[active] = block
+        steps[active] += 1
+        active = active[(block >= base).any(axis=1)]
+    return sums.astype(DIGIT_DTYPE), steps
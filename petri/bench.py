@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure batched Petri net simulation throughput.
+
+By default an example net (see :mod:`petri.examples`) is simulated for many
+runs and the firing rate is reported. ``--compare`` instead times the dense
+and sparse enabled-set tests on random nets of increasing density; the
+``SPARSE_MAX_*`` thresholds of :func:`petri.simulate.enabled` come from
+this comparison.
+
+Usage:
+    python3 -m petri.bench [--net dining_philosophers] [--size 5] [--runs 10000] [--steps 100]
+    python3 -m petri.bench --tikz figures/producer_consumer.tex
+    python3 -m petri.bench --compare [--size 64]
+"""
+import sys
+import time
+
+import numpy as np
+
+from gasing.bench_carry import best_time
+
+from .examples import EXAMPLES
+from .net import PetriNet
+from .simulate import ENABLED_METHODS, SEMANTICS, enabled, simulate
+
+
+def random_net(places: int, transitions: int, density: float, seed: int = 0) -> PetriNet:
+    """Net with unit input/output arcs set with probability ``density``."""
+    rng = np.random.default_rng(seed)
+    pre = rng.random((transitions, places)) < density
+    post = rng.random((transitions, places)) < density
+    return PetriNet(tuple(f"p{i}" for i in range(places)), tuple(f"t{i}" for i in range(transitions)),
+                    pre, post, rng.integers(0, 3, places))
+
+
+def main() -> int:
+    """Report simulation throughput or the enabled-set crossover."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark batched Petri net simulation')
+    parser.add_argument('--net', choices=sorted(EXAMPLES), default='dining_philosophers', help='Example net')
+    parser.add_argument('--tikz', default=None, help='Simulate the net drawn in this TikZ figure instead')
+    parser.add_argument('--size', type=int, default=None,
+                        help='Size parameter of the example (with --compare: places and transitions)')
+    parser.add_argument('--runs', type=int, default=10000, help='Independent runs')
+    parser.add_argument('--steps', type=int, default=100, help='Steps per run')
+    parser.add_argument('--semantics', choices=SEMANTICS, default='maximal', help='Step semantics')
+    parser.add_argument('--method', choices=ENABLED_METHODS, default='auto', help='Enabled-set method')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--compare', action='store_true', help='Time the dense and sparse enabled-set tests')
+    args = parser.parse_args()
+
+    if args.compare:
+        size = args.size or 64
+        markings = np.random.default_rng(args.seed).integers(0, 3, (args.runs, size))
+        print(f"{size} places x {size} transitions, {args.runs} markings")
+        print(f"{'density':>8} " + ' '.join(f"{m:>10}" for m in ENABLED_METHODS[1:]))
+        for density in (0.01, 0.03, 0.1, 0.2, 0.3, 0.5, 1.0):
+            net = random_net(size, size, density, args.seed)
+            times = [best_time(lambda: enabled(net, markings, m)) for m in ENABLED_METHODS[1:]]
+            print(f"{density:>8.2f} " + ' '.join(f"{t * 1e3:>8.3f}ms" for t in times), flush=True)
+        return 0
+
+    if args.tikz:
+        from .tikz import load_tikz
+        name, net = args.tikz, load_tikz(args.tikz)
+    else:
+        name = args.net
+        net = EXAMPLES[args.net]() if args.size is None else EXAMPLES[args.net](args.size)
+    print(f"{name}: {net.n_places} places, {net.n_transitions} transitions, density {net.density:.3f}")
+    start = time.perf_counter()
+    result = simulate(net, args.runs, args.steps, args.semantics, args.seed, method=args.method)
+    elapsed = time.perf_counter() - start
+    total = int(result.firings.sum())
+    print(f"{args.runs} runs x {args.steps} steps ({args.semantics}): {elapsed:.3f}s, "
+          f"{total / elapsed:,.0f} firings/s, {int(result.deadlocked.sum())} deadlocked")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
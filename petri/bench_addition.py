@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the digit-wise addition Petri net against GASing and Python ints.
+
+For each batch size, random operand pairs of increasing length are added
+four ways: the generic net engine (:func:`petri.arithmetic.net_add`), the
+specialised tensor executor (:func:`petri.arithmetic.tensor_add`),
+``gasing.batch_add`` and Python ``int`` addition over the same values. Every
+result is checked against the Python sums before it is timed. The steps
+column is the longest carry chain in the batch (quiescence step count).
+
+Usage:
+    python3 -m petri.bench_addition [--rows 1 64 4096] [--max-digits 1024]
+"""
+import sys
+from typing import Dict, Iterator
+
+import numpy as np
+
+from gasing.bench_carry import best_time, lengths_up_to
+from gasing.digits import from_digit_matrix
+from gasing.engine import batch_add
+
+from .arithmetic import addition_net, net_add, tensor_add
+
+METHODS = ('net', 'tensor', 'gasing', 'int')
+
+
+def run(rows: int, max_digits: int, base: int = 10, seed: int = 0,
+        max_cells: int = 1 << 22, worst_case: bool = False) -> Iterator[Dict[str, float]]:
+    """
+    Time every addition method for one batch size.
+
+    Args:
+        rows: Operand pairs per batch
+        max_digits: Longest operand length
+        base: Digit base
+        seed: Random seed
+        max_cells: Stop once a batch would exceed this many digits
+        worst_case: Add ``base^N - 1`` and 1 (carry through every digit)
+            instead of random operands
+
+    Raises:
+        AssertionError: If a method disagrees with Python ints
+
+    Yields:
+        One dict per length with ``digits``, ``steps`` and one key per method (seconds)
+    """
+    rng = np.random.default_rng(seed)
+    for digits in lengths_up_to(max_digits):
+        if rows * digits > max_cells:
+            break
+        if worst_case:
+            a = np.full((rows, digits), base - 1, dtype=np.uint8)
+            b = np.zeros((rows, digits), dtype=np.uint8)
+            b[:, -1] = 1
+        else:
+            a = rng.integers(0, base, (rows, digits), dtype=np.uint8)
+            b = rng.integers(0, base, (rows, digits), dtype=np.uint8)
+        x, y = from_digit_matrix(a, base), from_digit_matrix(b, base)
+        expected = [p + q for p, q in zip(x, y)]
+        net = addition_net(digits, base)
+
+        sums, steps = net_add(a, b, base, net=net)
+        assert from_digit_matrix(sums, base) == expected, f"net_add wrong at {digits} digits"
+        assert from_digit_matrix(tensor_add(a, b, base)[0], base) == expected, \
+            f"tensor_add wrong at {digits} digits"
+        assert from_digit_matrix(batch_add(a, b, base), base) == expected, f"batch_add wrong at {digits} digits"
+
+        yield {
+            'digits': digits,
+            'steps': int(steps.max()),
+            'net': best_time(lambda: net_add(a, b, base, net=net)),
+            'tensor': best_time(lambda: tensor_add(a, b, base)),
+            'gasing': best_time(lambda: batch_add(a, b, base)),
+            'int': best_time(lambda: [p + q for p, q in zip(x, y)]),
+        }
+
+
+def main() -> int:
+    """Print per-addition timings for each batch size."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the addition Petri net against GASing and int')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 64, 4096], help='Batch sizes')
+    parser.add_argument('--max-digits', type=int, default=1024, help='Longest operand length')
+    parser.add_argument('--base', type=int, default=10, help='Digit base')
+    parser.add_argument('--max-cells', type=int, default=1 << 22, help='Largest batch size in digits')
+    parser.add_argument('--worst-case', action='store_true',
+                        help='Add base^N - 1 and 1, so the carry crosses every digit')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"\nbatch of {rows} pair(s), time per addition")
+        print(f"{'digits':>8} {'steps':>6} " + ' '.join(f"{m:>11}" for m in METHODS) + f" {'fastest':>8}")
+        for row in run(rows, args.max_digits, args.base, args.seed, args.max_cells, args.worst_case):
+            timed = {m: row[m] for m in METHODS}
+            cells = [f"{row[m] / rows * 1e6:>9.3f}us" for m in METHODS]
+            print(f"{row['digits']:>8} {row['steps']:>6} " + ' '.join(cells)
+                  + f" {min(timed, key=timed.get):>8}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
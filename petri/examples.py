@@ -0,0 +1,82 @@
+"""
+The paper's example nets, built programmatically and scalable.
+
+Names follow the TikZ figures in ``figures/`` so markings read the same as
+the drawings: :func:`workflow` is ``petri_net_example.tex``,
+:func:`producer_consumer` is ``producer_consumer.tex``,
+:func:`dining_philosophers` with ``n=3`` is ``dining_philosophers.tex`` up
+to the numbering of the forks, and :func:`linear_chain` with ``n=3`` has
+the shape of ``linear_petri_net.tex``.
+"""
+from typing import Callable, Dict
+
+from .net import PetriNet
+
+
+def workflow() -> PetriNet:
+    """Start/Execute/Cancel/Finish workflow with a shared control place."""
+    arcs = [
+        ('p1', 't1', 1), ('t1', 'p2', 1), ('p3', 't1', 1), ('t1', 'p3', 1),
+        ('p2', 't2', 1), ('p3', 't2', 1), ('t2', 'p4', 1),
+        ('p3', 't3', 1), ('t3', 'p5', 1),
+        ('p4', 't4', 1), ('t4', 'p5', 1),
+    ]
+    return PetriNet.from_arcs(['p1', 'p2', 'p3', 'p4', 'p5'], ['t1', 't2', 't3', 't4'], arcs,
+                              {'p1': 2, 'p3': 1})
+
+
+def producer_consumer(capacity: int = 3) -> PetriNet:
+    """Producer and consumer sharing a buffer of ``capacity`` slots."""
+    arcs = [
+        ('producer', 'produce', 1), ('produce', 'producer', 1), ('produce', 'buffer', 1),
+        ('bufferCapacity', 'produce', 1),
+        ('buffer', 'consume', 1), ('consumer', 'consume', 1), ('consume', 'consumer', 1),
+        ('consume', 'bufferCapacity', 1),
+    ]
+    return PetriNet.from_arcs(['producer', 'buffer', 'consumer', 'bufferCapacity'], ['produce', 'consume'],
+                              arcs, {'producer': 1, 'consumer': 1, 'bufferCapacity': capacity})
+
+
+def dining_philosophers(n: int = 3, atomic: bool = True) -> PetriNet:
+    """
+    ``n`` philosophers around ``n`` forks.
+
+    Philosopher ``i`` thinks in ``p<i>``, eats in ``e<i>`` and needs forks
+    ``f<i>`` and ``f<i+1>`` (cyclically). With ``atomic=True`` both forks are
+    taken by one transition ``t<i>``, as in the figure, and the net is
+    deadlock-free. With ``atomic=False`` the left fork is taken first
+    (``l<i>``, into ``h<i>``) and the right one second (``t<i>``), which
+    deadlocks once every philosopher holds a left fork.
+    """
+    places, transitions, arcs = [], [], []
+    initial: Dict[str, int] = {}
+    for i in range(1, n + 1):
+        left, right = f"f{i}", f"f{i % n + 1}"
+        places += [f"p{i}", f"e{i}", left] + ([] if atomic else [f"h{i}"])
+        initial.update({f"p{i}": 1, left: 1})
+        if atomic:
+            transitions += [f"t{i}", f"r{i}"]
+            arcs += [(f"p{i}", f"t{i}", 1), (left, f"t{i}", 1), (right, f"t{i}", 1)]
+        else:
+            transitions += [f"l{i}", f"t{i}", f"r{i}"]
+            arcs += [(f"p{i}", f"l{i}", 1), (left, f"l{i}", 1), (f"l{i}", f"h{i}", 1),
+                     (f"h{i}", f"t{i}", 1), (right, f"t{i}", 1)]
+        arcs += [(f"t{i}", f"e{i}", 1), (f"e{i}", f"r{i}", 1),
+                 (f"r{i}", f"p{i}", 1), (f"r{i}", left, 1), (f"r{i}", right, 1)]
+    return PetriNet.from_arcs(places, transitions, arcs, initial)
+
+
+def linear_chain(n: int = 3, tokens: int = 1) -> PetriNet:
+    """Places ``s0 -> ... -> s<n>`` joined by ``n`` transitions, tokens starting at ``s0``."""
+    places = [f"s{i}" for i in range(n + 1)]
+    transitions = [f"f{i}" for i in range(n)]
+    arcs = [(f"s{i}", f"f{i}", 1) for i in range(n)] + [(f"f{i}", f"s{i + 1}", 1) for i in range(n)]
+    return PetriNet.from_arcs(places, transitions, arcs, {'s0': tokens})
+
+
+EXAMPLES: Dict[str, Callable[..., PetriNet]] = {
+    'workflow': workflow,
+    'producer_consumer': producer_consumer,
+    'dining_philosophers': dining_philosophers,
+    'linear_chain': linear_chain,
+}
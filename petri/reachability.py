@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Reachability, deadlock and boundedness analysis.
+
+The explorer enumerates the reachable markings of a net, storing them packed
+in a :class:`petri.states.StateSet`. The frontier is processed in batches:
+a batch of markings is decoded into one matrix, its enabled set computed
+with :func:`petri.simulate.enabled`, every (marking, enabled transition)
+successor built with one gather/add, and all successors inserted into the
+set at once. Breadth-first order takes batches from the front of the
+frontier, depth-first order from the top of a stack.
+
+Deadlocks are markings without an enabled transition; each is reported
+with a firing sequence from ``M0``. Boundedness: places are packed with as
+few bits as the markings seen so far need. When a successor outgrows them,
+the ancestors of that marking are searched for one it strictly covers,
+which proves the net unbounded (Karp-Miller); otherwise the stored states
+are repacked with wider fields and exploration continues.
+
+``reduction='stubborn'`` fires only a stubborn subset of the enabled
+transitions in each marking. This preserves every reachable deadlock while
+visiting far fewer markings in nets with independent components (such as
+the dining philosophers); the state count and bounds then describe the
+reduced space only.
+
+Usage:
+    python3 -m petri.reachability [--net dining_philosophers] [--size 3] [--two-phase] [--reduction stubborn]
+    python3 -m petri.reachability --tikz figures/petri_net_example.tex
+"""
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from .net import MARKING_DTYPE, PetriNet
+from .simulate import enabled
+from .states import PLACE_LIMIT, MarkingCodec, StateSet
+
+ORDERS = ('bfs', 'dfs')
+REDUCTIONS = (None, 'stubborn')
+
+DEFAULT_BATCH = 4096
+DEFAULT_MAX_STATES = 10_000_000
+
+
+@dataclass
+class ReachabilityResult:
+    """
+    Outcome of :func:`explore`.
+
+    Attributes:
+        net: The explored net
+        states: Packed reachable markings (``states.rows[:len(states)]``)
+        codec: Codec that packed them
+        parent: Index of the marking each state was first reached from (-1 for ``M0``)
+        via: Transition fired to reach each state from its parent (-1 for ``M0``)
+        edges: Number of (marking, transition) successors generated
+        deadlocks: Indices of markings without enabled transitions
+        max_tokens: ``(P,)`` largest token count seen per place
+        complete: Whether the whole (reduced) state space was explored
+        bounded: True if complete without reduction, False if an
+            unboundedness witness was found, None otherwise
+        unbounded_witness: ``(ancestor, state, transition)``: firing
+            ``transition`` in ``state`` gives a marking strictly covering ``ancestor``
+        elapsed: Seconds spent exploring
+        reduction: Partial-order reduction used, if any
+    """
+    net: PetriNet
+    states: StateSet
+    codec: MarkingCodec
+    parent: np.ndarray
+    via: np.ndarray
+    edges: int
+    deadlocks: np.ndarray
+    max_tokens: np.ndarray
+    complete: bool
+    bounded: Optional[bool]
+    unbounded_witness: Optional[tuple] = None
+    elapsed: float = 0.0
+    reduction: Optional[str] = None
+
+    @property
+    def n_states(self) -> int:
+        return len(self.states)
+
+    @property
+    def states_per_second(self) -> float:
+        return self.n_states / self.elapsed if self.elapsed else float('inf')
+
+    @property
+    def bytes_per_state(self) -> float:
+        """Memory per stored state: packed marking, hash, table slots and parent links."""
+        total = self.states.nbytes + self.parent.nbytes + self.via.nbytes
+        return total / max(1, self.n_states)
+
+    def marking(self, index: int) -> np.ndarray:
+        """Decoded marking of one state."""
+        return self.codec.decode(self.states.rows[index:index + 1])[0]
+
+    def path(self, index: int) -> List[str]:
+        """Transition names fired from ``M0`` to reach a state."""
+        names = []
+        while self.via[index] >= 0:
+            names.append(self.net.transitions[self.via[index]])
+            index = self.parent[index]
+        return names[::-1]
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    if size <= array.size:
+        return array
+    out = np.full(max(size, 2 * array.size), -1, dtype=array.dtype)
+    out[:array.size] = array
+    return out
+
+
+def stubborn_sets(net: PetriNet, markings: np.ndarray, en: np.ndarray) -> np.ndarray:
+    """
+    Deadlock-preserving stubborn subsets of the enabled transitions.
+
+    Starting from one enabled transition per marking, the set is closed
+    under two rules until nothing changes: an enabled member pulls in every
+    transition sharing one of its input places (anything that could disable
+    it), and a disabled member pulls in every transition that adds tokens to
+    one place where it is short (anything that could enable it).
+
+    Args:
+        net: Petri net
+        markings: ``(n, P)`` markings
+        en: ``(n, T)`` enabled set of ``markings``
+
+    Returns:
+        ``(n, T)`` mask of the transitions to fire (a subset of ``en``)
+    """
+    n, T = en.shape
+    pre = net.pre > 0
+    conflicts = (pre.astype(np.float64) @ pre.T.astype(np.float64)) > 0
+    producers = net.incidence.T > 0  # (P, T): transitions that add tokens to p
+
+    # Scapegoat place of each disabled transition: its first short input arc
+    short = markings[:, net.arc_place] < net.arc_weight
+    has_input = np.diff(net.arc_ptr) > 0
+    scapegoat = np.zeros((n, T), dtype=np.intp)
+    if has_input.any():
+        rank = short * (net.arc_place.size - np.arange(net.arc_place.size))
+        first = np.maximum.reduceat(rank, net.arc_ptr[:-1][has_input], axis=1)
+        arc = net.arc_place.size - np.maximum(first, 1)
+        scapegoat[:, has_input] = net.arc_place[arc]
+
+    # Seed with the enabled transition that has the fewest conflicts
+    cost = np.where(en, conflicts.sum(axis=1)[None, :], T + 1)
+    stubborn = np.zeros((n, T), dtype=bool)
+    live = en.any(axis=1)
+    stubborn[np.flatnonzero(live), cost[live].argmin(axis=1)] = True
+    processed = np.zeros((n, T), dtype=bool)
+    while True:
+        todo = stubborn & ~processed
+        if not todo.any():
+            break
+        processed |= todo
+        grow_enabled = (todo & en).astype(np.float64) @ conflicts.astype(np.float64) > 0
+        rows, ts = np.nonzero(todo & ~en)
+        grow_disabled = np.zeros((n, T), dtype=bool)
+        if rows.size:
+            np.logical_or.at(grow_disabled, rows, producers[scapegoat[rows, ts]])
+        stubborn |= grow_enabled | grow_disabled
+    return stubborn & en
+
+
+def _find_cover(parent: np.ndarray, codec: MarkingCodec, states: StateSet,
+                marking: np.ndarray, start: int) -> Optional[int]:
+    """Ancestor (``start`` or above) strictly covered by ``marking``, if any."""
+    chain = []
+    index = start
+    while index >= 0:
+        chain.append(index)
+        index = parent[index]
+    ancestors = codec.decode(states.rows[np.array(chain)])
+    covered = (marking >= ancestors).all(axis=1) & (marking > ancestors).any(axis=1)
+    hits = np.flatnonzero(covered)
+    return int(chain[hits[0]]) if hits.size else None
+
+
+def explore(net: PetriNet, order: str = 'bfs', reduction: Optional[str] = None,
+            bound: Optional[int] = None, max_states: int = DEFAULT_MAX_STATES,
+            batch: int = DEFAULT_BATCH, initial: Optional[np.ndarray] = None) -> ReachabilityResult:
+    """
+    Explore the reachable markings of a net.
+
+    Args:
+        net: Petri net
+        order: ``'bfs'`` or ``'dfs'``
+        reduction: None or ``'stubborn'`` (deadlock-preserving partial-order reduction)
+        bound: Fixed tokens-per-place capacity of the packed storage (rounded
+            up to a field of 1, 2, 4, 8 or 16 bits); exploration stops when a
+            marking exceeds it. None starts with the fewest bits holding
+            ``M0`` and widens them as needed.
+        max_states: Stop once this many markings are stored
+        batch: Frontier markings expanded per vectorised step
+        initial: Start marking (default ``M0``)
+
+    Returns:
+        ReachabilityResult instance
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown exploration order {order!r}; expected one of {ORDERS}")
+    if reduction not in REDUCTIONS:
+        raise ValueError(f"Unknown reduction {reduction!r}; expected one of {REDUCTIONS}")
+    start_time = time.perf_counter()
+    m0 = np.asarray(net.initial if initial is None else initial, dtype=MARKING_DTYPE)[None, :]
+    codec = MarkingCodec(net.n_places, bound or max(1, int(m0.max(initial=0))))
+    if m0.max(initial=0) > codec.bound:
+        raise ValueError(f"initial marking exceeds the storage bound {codec.bound}")
+    states = StateSet(codec.width)
+    states.add(codec.encode(m0))
+    parent = np.full(1024, -1, dtype=np.int64)
+    via = np.full(1024, -1, dtype=np.int32)
+    incidence = net.incidence
+    max_tokens = m0[0].copy()
+    deadlocks: List[np.ndarray] = []
+    edges = 0
+    complete, bounded, witness = True, None, None
+
+    # BFS: states are numbered in discovery order, so the frontier is just
+    # the index range after ``head``. DFS: new states go on a stack.
+    head = 0
+    stack = np.zeros(1024, dtype=np.int64)
+    top = 1
+    while True:
+        if order == 'bfs':
+            if head >= len(states):
+                break
+            current = np.arange(head, min(head + batch, len(states)))
+            head += current.size
+        else:
+            if top == 0:
+                break
+            low = max(0, top - batch)
+            current = stack[low:top].copy()
+            top = low
+        markings = codec.decode(states.rows[current])
+        en = enabled(net, markings)
+        fire = stubborn_sets(net, markings, en) if reduction else en
+        rows, ts = np.nonzero(fire)
+        successors = markings[rows] + incidence[ts]
+        np.maximum(max_tokens, successors.max(axis=0, initial=0), out=max_tokens)
+
+        over = (successors > codec.bound).any(axis=1)
+        if over.any():
+            k = int(np.flatnonzero(over)[0])
+            source = int(current[rows[k]])
+            ancestor = _find_cover(parent, codec, states, successors[k], source)
+            largest = int(successors.max())
+            if ancestor is not None:
+                bounded, witness = False, (ancestor, source, int(ts[k]))
+            elif bound is None and largest <= PLACE_LIMIT:
+                # Repack with wider fields (indices are kept) and redo the batch
+                wider = MarkingCodec(net.n_places, largest)
+                states = StateSet.from_rows(wider.encode(codec.decode(states.rows[:len(states)])))
+                codec = wider
+                if order == 'bfs':
+                    head -= current.size
+                else:
+                    top += current.size
+                continue
+            complete = False
+            break
+
+        dead = ~en.any(axis=1)
+        if dead.any():
+            deadlocks.append(current[dead])
+        edges += rows.size
+        index, new = states.add(codec.encode(successors))
+        parent = _grow(parent, len(states))
+        via = _grow(via, len(states))
+        parent[index[new]] = current[rows[new]]
+        via[index[new]] = ts[new]
+        if order == 'dfs':
+            stack = _grow(stack, top + int(new.sum()))
+            stack[top:top + int(new.sum())] = index[new]
+            top += int(new.sum())
+        if len(states) >= max_states:
+            complete = False
+            break
+
+    if complete and reduction is None:
+        bounded = True
+    result = ReachabilityResult(
+        net=net, states=states, codec=codec, parent=parent[:len(states)], via=via[:len(states)],
+        edges=edges, deadlocks=np.concatenate(deadlocks) if deadlocks else np.zeros(0, dtype=np.int64),
+        max_tokens=max_tokens, complete=complete, bounded=bounded, unbounded_witness=witness,
+        reduction=reduction)
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+
+def main() -> int:
+    """Explore an example net and print deadlocks, bounds and throughput."""
+    import argparse
+
+    from .examples import EXAMPLES
+
+    parser = argparse.ArgumentParser(description='Reachability and deadlock analysis of a Petri net')
+    parser.add_argument('--net', choices=sorted(EXAMPLES), default='dining_philosophers', help='Example net')
+    parser.add_argument('--tikz', default=None, help='Explore the net drawn in this TikZ figure instead')
+    parser.add_argument('--size', type=int, default=None, help='Size parameter of the example')
+    parser.add_argument('--two-phase', action='store_true',
+                        help='Dining philosophers take forks one at a time (deadlock-prone)')
+    parser.add_argument('--order', choices=ORDERS, default='bfs', help='Exploration order')
+    parser.add_argument('--reduction', choices=[r for r in REDUCTIONS if r], default=None,
+                        help='Partial-order reduction')
+    parser.add_argument('--bound', type=int, default=None,
+                        help='Fixed tokens-per-place limit (default: widen the packing as needed)')
+    parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES, help='State limit')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH, help='Frontier batch size')
+    parser.add_argument('--show', type=int, default=3, help='Deadlocks to print')
+    args = parser.parse_args()
+
+    if args.tikz:
+        from .tikz import load_tikz
+        name, net = args.tikz, load_tikz(args.tikz)
+    else:
+        size = () if args.size is None else (args.size,)
+        options = {'atomic': not args.two_phase} if args.net == 'dining_philosophers' else {}
+        name, net = args.net, EXAMPLES[args.net](*size, **options)
+    result = explore(net, args.order, args.reduction, args.bound, args.max_states, args.batch)
+
+    print(f"{name}: {net.n_places} places, {net.n_transitions} transitions")
+    status = 'complete' if result.complete else 'incomplete'
+    print(f"{result.n_states:,} states, {result.edges:,} edges ({status}"
+          f"{', stubborn-set reduced' if result.reduction else ''})")
+    print(f"{result.states_per_second:,.0f} states/s, {result.codec.width} bytes per packed marking "
+          f"({result.codec.bits} bits per place), {result.bytes_per_state:.1f} bytes per state in total")
+    peak = int(result.max_tokens.max(initial=0))
+    fullest = ', '.join(net.places[p] for p in np.flatnonzero(result.max_tokens == peak)[:5])
+    if result.bounded:
+        print(f"bounded: at most {peak} token(s) per place ({fullest})")
+    else:
+        state = 'unbounded' if result.bounded is False else 'boundedness unknown'
+        print(f"{state}: up to {peak} token(s) seen per place ({fullest})")
+    if result.unbounded_witness:
+        ancestor, state, transition = result.unbounded_witness
+        print(f"  firing {net.transitions[transition]} after {' '.join(result.path(state)) or 'M0'} "
+              f"strictly covers {net.describe(result.marking(ancestor))}")
+    print(f"{result.deadlocks.size} deadlock(s)")
+    for index in result.deadlocks[:args.show]:
+        print(f"  {net.describe(result.marking(index))} via {' '.join(result.path(index)) or 'M0'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Compact marking storage for state-space exploration.
+
+Markings are packed into fixed-width byte rows: with a per-place bound of
+1, 3, 15, 255 or 65535 tokens a place takes 1, 2, 4, 8 or 16 bits, so a
+safe (1-bounded) net with 64 places stores each marking in 8 bytes. The
+rows live in one growing ``(capacity, width)`` ``uint8`` array, and an
+open-addressing hash table of row indices (linear probing, load factor at
+most one half) maps markings to their index. Lookups and inserts take a
+whole batch of markings per call: each probe round is one vectorised
+gather/compare over all keys still unresolved. When a marking outgrows its
+fields, the rows are repacked wider into a new set
+(:meth:`StateSet.from_rows`), keeping their indices.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from .net import MARKING_DTYPE
+
+PLACE_BITS = (1, 2, 4, 8, 16)
+PLACE_LIMIT = (1 << PLACE_BITS[-1]) - 1
+
+_EMPTY = -1
+_FNV_PRIME = np.uint64(0x100000001B3)
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+
+
+class MarkingCodec:
+    """
+    Pack ``(n, P)`` marking matrices into ``(n, width)`` byte rows and back.
+
+    Args:
+        places: Number of places
+        bound: Largest token count per place that must be representable
+    """
+
+    def __init__(self, places: int, bound: int = 255):
+        if not 1 <= bound <= PLACE_LIMIT:
+            raise ValueError(f"bound must be between 1 and {PLACE_LIMIT}, got {bound}")
+        self.places = places
+        self.bits = next(b for b in PLACE_BITS if bound < 1 << b)
+        self.bound = (1 << self.bits) - 1
+        self.per_byte = max(1, 8 // self.bits)
+        self.width = -(-places * self.bits // 8)
+
+    def encode(self, markings: np.ndarray) -> np.ndarray:
+        """
+        Pack markings whose tokens are all within :attr:`bound`.
+
+        Returns:
+            ``(n, width)`` ``uint8`` rows
+        """
+        n = markings.shape[0]
+        if self.bits == 16:
+            return np.ascontiguousarray(markings, dtype='<u2').view(np.uint8).reshape(n, self.width)
+        if self.bits == 8:
+            return markings.astype(np.uint8)
+        padded = np.zeros((n, self.width * self.per_byte), dtype=np.uint8)
+        padded[:, :self.places] = markings
+        shifts = np.arange(self.per_byte, dtype=np.uint8) * np.uint8(self.bits)
+        groups = padded.reshape(n, self.width, self.per_byte) << shifts
+        return np.bitwise_or.reduce(groups, axis=2)
+
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        """Unpack ``(n, width)`` rows into a ``(n, P)`` marking matrix."""
+        n = rows.shape[0]
+        if self.bits == 16:
+            return np.ascontiguousarray(rows).view('<u2').astype(MARKING_DTYPE)
+        if self.bits == 8:
+            return rows.astype(MARKING_DTYPE)
+        shifts = np.arange(self.per_byte, dtype=np.uint8) * np.uint8(self.bits)
+        fields = (rows[:, :, None] >> shifts) & np.uint8(self.bound)
+        return fields.reshape(n, -1)[:, :self.places].astype(MARKING_DTYPE)
+
+
+def hash_rows(rows: np.ndarray) -> np.ndarray:
+    """64-bit FNV-1a-style hash of each byte row, mixed over 8-byte words."""
+    n, width = rows.shape
+    words = -(-width // 8)
+    padded = np.zeros((n, words * 8), dtype=np.uint8)
+    padded[:, :width] = rows
+    h = np.full(n, _FNV_OFFSET, dtype=np.uint64)
+    for word in padded.view(np.uint64).T:
+        h = (h ^ word) * _FNV_PRIME
+    # Final avalanche (splitmix64) so the low bits used for slots are mixed
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+class StateSet:
+    """
+    Set of packed markings with batched insertion.
+
+    Args:
+        width: Bytes per packed marking
+        capacity: Initial number of rows, rounded up to a power of two (grows by doubling)
+    """
+
+    def __init__(self, width: int, capacity: int = 1 << 10):
+        capacity = 1 << max(0, (capacity - 1).bit_length())
+        self.width = width
+        self.rows = np.zeros((capacity, width), dtype=np.uint8)
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.size = 0
+        self.table = np.full(2 * capacity, _EMPTY, dtype=np.int64)
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> 'StateSet':
+        """Set holding distinct ``rows`` at indices ``0 .. n-1``, in order."""
+        n, width = rows.shape
+        out = cls(width, max(n, 1 << 10))
+        out.rows[:n] = rows
+        out.hashes[:n] = hash_rows(rows)
+        out.size = n
+        out._place(np.arange(n), out.hashes[:n])
+        return out
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the rows, their hashes and the slot table."""
+        return self.rows.nbytes + self.hashes.nbytes + self.table.nbytes
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.rows.shape[0]
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.rows.shape[0]:
+            return
+        rows = np.zeros((capacity, self.width), dtype=np.uint8)
+        rows[:self.size] = self.rows[:self.size]
+        hashes = np.zeros(capacity, dtype=np.uint64)
+        hashes[:self.size] = self.hashes[:self.size]
+        self.rows, self.hashes = rows, hashes
+        # Rehash: stored rows are distinct, so only empty slots are probed
+        self.table = np.full(2 * capacity, _EMPTY, dtype=np.int64)
+        self._place(np.arange(self.size), hashes[:self.size])
+
+    def _place(self, indices: np.ndarray, hashes: np.ndarray) -> None:
+        mask = np.uint64(self.table.size - 1)
+        slots = (hashes & mask).astype(np.int64)
+        pending = np.arange(indices.size)
+        while pending.size:
+            slot = slots[pending]
+            free = self.table[slot] == _EMPTY
+            # Among keys racing for the same free slot the first one wins
+            candidates = pending[free]
+            _, first = np.unique(slots[candidates], return_index=True)
+            winners = candidates[first]
+            self.table[slots[winners]] = indices[winners]
+            done = np.zeros(indices.size, dtype=bool)
+            done[winners] = True
+            pending = pending[~done[pending]]
+            slots[pending] = (slots[pending] + 1) & int(mask)
+
+    def add(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Insert a batch of packed markings.
+
+        Duplicates within the batch and markings already in the set map to
+        one index; only the first occurrence of each new marking is inserted.
+
+        Args:
+            rows: ``(n, width)`` packed markings
+
+        Returns:
+            Tuple of (``(n,)`` state indices, ``(n,)`` mask of newly inserted rows)
+        """
+        n = rows.shape[0]
+        self._grow(self.size + n)
+        hashes = hash_rows(rows)
+        mask = self.table.size - 1
+        slots = (hashes & np.uint64(mask)).astype(np.int64)
+        index = np.full(n, _EMPTY, dtype=np.int64)
+        new = np.zeros(n, dtype=bool)
+        pending = np.arange(n)
+        while pending.size:
+            slot = slots[pending]
+            occupant = self.table[slot]
+            # Occupied slot: a match resolves the key, anything else probes on
+            filled = occupant != _EMPTY
+            hit = np.zeros(pending.size, dtype=bool)
+            if filled.any():
+                keys, held = pending[filled], occupant[filled]
+                same = (self.hashes[held] == hashes[keys]) & (self.rows[held] == rows[keys]).all(axis=1)
+                index[keys[same]] = held[same]
+                hit[np.flatnonzero(filled)[same]] = True
+            # Empty slot: the first key per slot claims it; the losers see
+            # the winner next round, as a match if they are the same marking
+            empty = np.flatnonzero(~filled)
+            if empty.size:
+                _, first = np.unique(slot[empty], return_index=True)
+                claim = empty[first]
+                keys = pending[claim]
+                ids = np.arange(self.size, self.size + keys.size)
+                self.rows[ids] = rows[keys]
+                self.hashes[ids] = hashes[keys]
+                self.table[slot[claim]] = ids
+                self.size += keys.size
+                index[keys] = ids
+                new[keys] = True
+                hit[claim] = True
+            moving = pending[~hit & filled]
+            slots[moving] = (slots[moving] + 1) & mask
+            pending = pending[~hit]
+        return index, new
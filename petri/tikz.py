@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Read Petri nets from the TikZ sources in ``figures/``.
+
+The figures draw nets with the ``petri`` library styles of
+``styles/custom.sty``:
+
+* places - ``\\placewithtokens{name}{x,y}{tokens}`` or
+  ``\\node[place, tokens=2] (name) ...``, plus one token per
+  ``\\node[token] at (name) {}``
+* transitions - ``\\node[transition, ...] (name) ...``
+* arcs - ``\\draw[pre] (p) -- (t);``, ``\\draw[post] (t) -- (p);``,
+  ``\\draw[->] (a) -- (b);`` and ``(a) edge[...] (b)`` paths; a numeric
+  label on the path (``-- node {2} (t)``) is the arc weight.
+
+``pre`` and ``post`` make the place the input or output of the transition
+whatever order the path is drawn in; other arcs follow their arrow tips
+(``->``, ``<-``, ``<->``, or forwards without tips). Paths through plain
+coordinates or non-net nodes (labels, titles) are ignored.
+
+Parsed nets are cached in the artifact cache by file content and parser
+version, so reloading an unchanged figure skips parsing.
+
+Usage:
+    python3 -m petri.tikz [figures/dining_philosophers.tex ...]
+"""
+import json
+import logging
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .net import Arc, PetriNet
+
+logger = logging.getLogger('md2latex.petri')
+
+FIGURES_DIR = Path('figures')
+
+_COMMENT = re.compile(r'(?<!\\)%.*')
+_PLACE_MACRO = re.compile(r'\\placewithtokens\s*\{([^{}]*)\}\s*\{[^{}]*\}\s*\{\s*(\d+)\s*\}')
+_NODE = re.compile(r'\\node\s*(?:\[(?P<before>[^\]]*)\])?\s*(?:\((?P<name>[^()]*)\))?'
+                   r'\s*(?:at\s*\((?P<at>[^()]*)\))?\s*(?:\[(?P<after>[^\]]*)\])?')
+_DRAW = re.compile(r'\\(?:draw|path)\b\s*(?:\[(?P<options>[^\]]*)\])?(?P<path>.*)', re.DOTALL)
+_PATH_ITEM = re.compile(r'\((?P<ref>[^()]*)\)'
+                        r'|\bnode\s*(?:\[[^\]]*\])?\s*(?:\([^()]*\))?\s*\{(?P<label>[^{}]*)\}'
+                        r'|\bedge\s*(?:\[(?P<edge>[^\]]*)\])?')
+_NUMBER = re.compile(r'^\$?\s*(\d+)\s*\$?$')
+_COMMAND = re.compile(r'\\(?:node|draw|path)\b')
+
+
+def _options(text: Optional[str]) -> Dict[str, str]:
+    """``key=value`` TikZ options as a dict (bare keys map to '')."""
+    out = {}
+    for item in (text or '').split(','):
+        key, _, value = item.partition('=')
+        if key.strip():
+            out[key.strip()] = value.strip()
+    return out
+
+
+def _direction(options: Dict[str, str]) -> str:
+    """``'pre'``, ``'post'``, ``'forward'``, ``'backward'`` or ``'both'`` for a path's options."""
+    for key in ('pre', 'post'):
+        if key in options:
+            return key
+    for key in options:
+        tips = key.replace(' ', '')
+        if re.fullmatch(r'<\S*-\S*>', tips):
+            return 'both'
+        if re.fullmatch(r'<\S*-', tips) or (re.fullmatch(r'\S+-', tips) and not tips.startswith('-')):
+            return 'backward'
+    return 'forward'
+
+
+def _statements(source: str) -> List[str]:
+    text = '\n'.join(_COMMENT.sub('', line) for line in source.splitlines())
+    return [s.strip() for s in text.split(';') if s.strip()]
+
+
+def parse_tikz(source: str) -> PetriNet:
+    """
+    Build a net from the TikZ source of one figure.
+
+    Args:
+        source: LaTeX/TikZ text
+
+    Raises:
+        ValueError: If the source has no places or no transitions
+
+    Returns:
+        PetriNet with places and transitions in drawing order
+    """
+    places: List[str] = []
+    transitions: List[str] = []
+    tokens: Dict[str, int] = {}
+    paths: List[Tuple[Dict[str, str], str]] = []
+
+    for statement in _statements(source):
+        for match in _PLACE_MACRO.finditer(statement):
+            name = match.group(1).strip()
+            places.append(name)
+            tokens[name] = tokens.get(name, 0) + int(match.group(2))
+        # Anything before the path command (\begin{tikzpicture}[...], macros) is not part of it
+        command = _COMMAND.search(statement)
+        if not command:
+            continue
+        statement = statement[command.start():]
+        if statement.startswith('\\node'):
+            match = _NODE.match(statement)
+            options = {**_options(match.group('before')), **_options(match.group('after'))}
+            name = (match.group('name') or '').strip()
+            if 'place' in options and name:
+                places.append(name)
+                count = options.get('tokens', '0')
+                tokens[name] = tokens.get(name, 0) + (int(count) if count.isdigit() else 0)
+            elif 'transition' in options and name:
+                transitions.append(name)
+            elif 'token' in options and match.group('at'):
+                owner = match.group('at').split('.')[0].strip()
+                tokens[owner] = tokens.get(owner, 0) + 1
+        elif statement.startswith(('\\draw', '\\path')):
+            match = _DRAW.match(statement)
+            paths.append((_options(match.group('options')), match.group('path')))
+
+    if not places or not transitions:
+        raise ValueError(f"no Petri net found ({len(places)} places, {len(transitions)} transitions)")
+    kinds = {**{p: 'place' for p in places}, **{t: 'transition' for t in transitions}}
+
+    arcs: List[Arc] = []
+    for options, path in paths:
+        for source, target, weight, direction in _path_arcs(options, path, kinds):
+            place, transition = (source, target) if kinds[source] == 'place' else (target, source)
+            if direction in ('pre', 'post'):
+                arcs.append((place, transition, weight) if direction == 'pre' else (transition, place, weight))
+            else:
+                if direction in ('forward', 'both'):
+                    arcs.append((source, target, weight))
+                if direction in ('backward', 'both'):
+                    arcs.append((target, source, weight))
+    return PetriNet.from_arcs(places, transitions, arcs, tokens)
+
+
+def _path_arcs(options: Dict[str, str], path: str, kinds: Dict[str, str]) -> List[Tuple[str, str, int, str]]:
+    """Place-transition arcs along one ``\\draw`` path as (source, target, weight, direction)."""
+    arcs: List[List] = []
+    previous: Optional[str] = None
+    edge_source: Optional[str] = None
+    edge_options: Optional[Dict[str, str]] = None
+    weight: Optional[int] = None
+    for item in _PATH_ITEM.finditer(path):
+        if item.group('ref') is not None:
+            name = item.group('ref').split('.')[0].strip()
+            if name not in kinds:
+                continue
+            source = edge_source if edge_options is not None else previous
+            if source is not None and kinds[source] != kinds[name]:
+                direction = _direction(edge_options if edge_options is not None else options)
+                arcs.append([source, name, weight or 1, direction])
+                weight = None
+            if edge_options is None:
+                previous = name
+            edge_options = None
+        elif item.group('label') is not None:
+            number = _NUMBER.match(item.group('label').strip())
+            if number:
+                weight = int(number.group(1))
+        else:
+            edge_source = previous
+            edge_options = {**options, **_options(item.group('edge'))}
+    # A weight label after the last target belongs to the last arc
+    if weight is not None and arcs:
+        arcs[-1][2] = weight
+    return [tuple(arc) for arc in arcs]
+
+
+def _parser_version() -> str:
+    from artifact_cache import source_version
+    return source_version(__file__, Path(__file__).with_name('net.py'))
+
+
+def _to_json(net: PetriNet) -> str:
+    return json.dumps({'places': net.places, 'transitions': net.transitions, 'arcs': net.arcs(),
+                       'initial': net.describe(net.initial)})
+
+
+def _from_json(text: str) -> PetriNet:
+    data = json.loads(text)
+    return PetriNet.from_arcs(data['places'], data['transitions'], [tuple(a) for a in data['arcs']],
+                              data['initial'])
+
+
+@lru_cache(maxsize=None)
+def _load(digest: str, path: str) -> PetriNet:
+    from artifact_cache import default_cache
+
+    cache = default_cache()
+    key = cache.key('petri-tikz', [digest], _parser_version())
+    cached = cache.get_text(key)
+    if cached is not None:
+        logger.debug(f"Parsed net for {path} restored from the artifact cache")
+        return _from_json(cached)
+    net = parse_tikz(Path(path).read_text(encoding='utf-8'))
+    cache.put_text(key, _to_json(net))
+    return net
+
+
+def load_tikz(path) -> PetriNet:
+    """
+    Parse a figure file into a net, cached by the file's content hash.
+
+    Raises:
+        ValueError: If the file draws no Petri net
+        OSError: If the file cannot be read
+    """
+    from artifact_cache import file_digest
+    return _load(file_digest(path), str(path))
+
+
+def figure_nets(directory: Path = FIGURES_DIR) -> Dict[str, PetriNet]:
+    """All nets drawn in ``directory/*.tex``, keyed by file stem; other figures are skipped."""
+    nets = {}
+    for path in sorted(Path(directory).glob('*.tex')):
+        try:
+            nets[path.stem] = load_tikz(path)
+        except ValueError:
+            continue
+    return nets
+
+
+def main() -> int:
+    """Print the nets parsed from TikZ figures."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Parse Petri nets from TikZ figures')
+    parser.add_argument('files', nargs='*', help=f'TikZ files (default: every net in {FIGURES_DIR}/)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print the arcs too')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(levelname)s: %(message)s')
+    if args.files:
+        nets = {}
+        for name in args.files:
+            try:
+                nets[Path(name).stem] = load_tikz(name)
+            except (OSError, ValueError) as e:
+                logger.error(f"{name}: {e}")
+                return 1
+    else:
+        nets = figure_nets()
+    for name, net in nets.items():
+        print(f"{name}: {net.n_places} places, {net.n_transitions} transitions, "
+              f"{len(net.arcs())} arcs, M0 = {net.describe(net.initial)}")
+        if args.verbose:
+            for source, target, weight in net.arcs():
+                print(f"  {source} -> {target}" + (f" ({weight})" if weight != 1 else ''))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
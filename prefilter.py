@@ -0,0 +1,96 @@
+"""
+Trigger-literal prefilters for the converters' regex passes.
+
+Most text segments contain no ``*``, backticks, image links, ``[[`` or
+``<mcfile>`` tags, yet every bullet, emphasis, image, inline-code and mcfile
+pass runs its regex over them. A :class:`Prefilter` knows, for each pass,
+the literals it cannot match without (its triggers). :meth:`Prefilter.scan`
+collects the segment's characters in one pass, confirms the multi-character
+triggers whose characters all occur with a substring search, and returns
+the triggers present as a bitmap; :meth:`Prefilter.wants` tells whether a
+pass can have any effect on that segment, so the converter skips it
+otherwise.
+
+Triggers are tested against the segment as scanned, before any pass ran, so
+a pass must also list the literals of earlier passes' output it reacts to
+(the header cleanup in ``md_to_latex`` triggers on ``#`` because the header
+passes produce the ``\\section{`` lines it fixes).
+
+Run and skip counts per pass are kept for the whole process; the parity
+harness (``converter_parity.py``) reports them and, with :func:`disabled`,
+checks that skipping passes never changes the output.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterable, Iterator, List, Mapping, Tuple
+
+# (filter name, pass name) -> [runs, skips]
+_counts: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+# Set by disabled(): every pass runs
+_disabled = False
+
+
+class Prefilter:
+    """Trigger literals of a converter's passes."""
+
+    def __init__(self, name: str, passes: Mapping[Hashable, Iterable[str]]):
+        """
+        Args:
+            name: Name of the filter in the counts (usually the converter)
+            passes: Pass name -> literals, at least one of which must occur in
+                the text for the pass to change it
+
+        Raises:
+            ValueError: If a pass has no triggers
+        """
+        self.name = name
+        triggers = {key: tuple(literals) for key, literals in passes.items()}
+        for key, literals in triggers.items():
+            if not literals or not all(literals):
+                raise ValueError(f"Pass {key!r} of prefilter {name!r} needs non-empty trigger literals")
+        literals = sorted({lit for lits in triggers.values() for lit in lits})
+        bit = {lit: 1 << i for i, lit in enumerate(literals)}
+        self._chars = {lit: bit[lit] for lit in literals if len(lit) == 1}
+        self._strings = [(lit, frozenset(lit), bit[lit]) for lit in literals if len(lit) > 1]
+        self._masks = {key: sum(bit[lit] for lit in lits) for key, lits in triggers.items()}
+
+    def scan(self, text: str) -> int:
+        """Bitmap of the trigger literals occurring in ``text``."""
+        chars = set(text)
+        present = 0
+        for char in chars.intersection(self._chars):
+            present |= self._chars[char]
+        for lit, needed, flag in self._strings:
+            if needed <= chars and lit in text:
+                present |= flag
+        return present
+
+    def wants(self, key: Hashable, present: int) -> bool:
+        """Whether pass ``key`` can change text with trigger bitmap ``present``; counts the run or skip."""
+        run = _disabled or bool(self._masks[key] & present)
+        _counts[(self.name, str(key))][0 if run else 1] += 1
+        return run
+
+
+def counts() -> Dict[str, Dict[str, Tuple[int, int]]]:
+    """Runs and skips so far: filter name -> pass name -> (runs, skips)."""
+    result: Dict[str, Dict[str, Tuple[int, int]]] = {}
+    for (name, key), (runs, skips) in _counts.items():
+        result.setdefault(name, {})[key] = (runs, skips)
+    return result
+
+
+@contextmanager
+def disabled() -> Iterator[None]:
+    """Run every pass regardless of its triggers (the unfiltered reference output)."""
+    global _disabled
+    previous, _disabled = _disabled, True
+    try:
+        yield
+    finally:
+        _disabled = previous
+
+
+def reset_counts() -> None:
+    """Forget all runs and skips."""
+    _counts.clear()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Draft preview build: one fast pdflatex pass for proofreading prose.
+
+The preview compiles a copy of the document in its own directory
+(``build/preview/`` by default), so its ``.aux``, ``.log`` and ``.pdf`` never
+touch the release build's, with
+
+* ``graphicx`` in draft mode: images are framed boxes of their real size
+  showing the file name, and are not embedded,
+* every standalone TikZ figure (``figures/*.tex`` holding a
+  ``tikzpicture``) replaced by its externalised PDF from ``build/figures/``
+  when that is newer than the source (drawn as a draft box of the figure's
+  size), or else by a placeholder box,
+* no BibTeX and a single pdflatex pass; citations and references resolve
+  from the previous preview's ``.aux`` and the reference list is the
+  release build's ``.bbl``, read but never rewritten.
+
+The replacements are files in the preview directory that shadow the sources
+through ``TEXINPUTS``; nothing in the source tree is modified.
+
+Usage:
+    python3 preview.py [main] [--out build/preview]
+"""
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger('md2latex.preview')
+
+DEFAULT_OUT_DIR = Path('build') / 'preview'
+# Standalone figure PDFs written by build_dag.py's figure tasks
+FIGURE_PDF_DIR = Path('build') / 'figures'
+PREVIEW_OPTIONS = '\\PassOptionsToPackage{draft}{graphicx}\n'
+PLACEHOLDER = ('\\fbox{\\parbox[c][%(height)s][c]{0.9\\linewidth}{\\centering\\ttfamily '
+               '\\detokenize{%(name)s}\\\\(figure omitted in preview)}}\n')
+PLACEHOLDER_HEIGHT = '4cm'
+
+
+def tikz_figures(figures_dir: Path) -> List[Path]:
+    """Standalone TikZ figures: ``.tex`` files with a ``tikzpicture`` that are not documents."""
+    figures = []
+    for source in sorted(Path(figures_dir).glob('*.tex')):
+        text = source.read_text(encoding='utf-8', errors='replace')
+        if '\\begin{tikzpicture}' in text and '\\documentclass' not in text:
+            figures.append(source)
+    return figures
+
+
+def figure_stub(source: Path, root: Path, pdf_dir: Path = FIGURE_PDF_DIR) -> str:
+    """
+    LaTeX standing in for a TikZ figure in the preview.
+
+    Args:
+        source: Figure source file
+        root: Directory of the main document
+        pdf_dir: Directory of externalised figure PDFs, relative to ``root``
+
+    Returns:
+        An ``\\includegraphics`` of an up-to-date externalised PDF, or a placeholder box
+    """
+    pdf = Path(root) / pdf_dir / f"{source.stem}.pdf"
+    if pdf.exists() and pdf.stat().st_mtime >= source.stat().st_mtime:
+        return f"\\includegraphics{{{pdf.resolve().as_posix()}}}\n"
+    return PLACEHOLDER % {'height': PLACEHOLDER_HEIGHT, 'name': f"figures/{source.name}"}
+
+
+def prepare_preview(tex_file: Path, out_dir: Path, figures_dir: Optional[Path] = None) -> Path:
+    """
+    Write the preview copy of ``tex_file`` and its figure stubs to ``out_dir``.
+
+    Args:
+        tex_file: Main document
+        out_dir: Preview build directory
+        figures_dir: TikZ figures, referenced as ``figures/<name>`` (default: next to ``tex_file``)
+
+    Returns:
+        Path of the preview document
+    """
+    root = tex_file.parent
+    figures_dir = Path(figures_dir) if figures_dir else root / 'figures'
+    stub_dir = out_dir / 'figures'
+    stub_dir.mkdir(parents=True, exist_ok=True)
+
+    figures = tikz_figures(figures_dir) if figures_dir.is_dir() else []
+    externalised = 0
+    for source in figures:
+        stub = figure_stub(source, root)
+        externalised += stub.startswith('\\includegraphics')
+        (stub_dir / source.name).write_text(stub, encoding='utf-8')
+    logger.info(f"Stubbed {len(figures)} TikZ figures ({externalised} from externalised PDFs)")
+
+    preview_tex = out_dir / tex_file.name
+    preview_tex.write_text(PREVIEW_OPTIONS + tex_file.read_text(encoding='utf-8'), encoding='utf-8')
+    return preview_tex
+
+
+def build_preview(tex_file: Path, out_dir: Path = DEFAULT_OUT_DIR, figures_dir: Optional[Path] = None) -> bool:
+    """
+    Compile a draft preview of ``tex_file`` with one pdflatex pass and no BibTeX.
+
+    Args:
+        tex_file: Main document
+        out_dir: Preview build directory (kept apart from the release outputs)
+        figures_dir: TikZ figures to stub (default: ``figures/`` next to ``tex_file``)
+
+    Returns:
+        True if the preview PDF was written
+    """
+    from latex_log import run_streaming, texinputs_env
+
+    tex_file, out_dir = Path(tex_file), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    preview_tex = prepare_preview(tex_file, out_dir, figures_dir)
+
+    cmd = ['pdflatex', '-interaction=nonstopmode', '-file-line-error', preview_tex.name]
+    # The preview directory shadows the document and figures; everything else comes from the sources
+    result = run_streaming(cmd, cwd=out_dir, env=texinputs_env('.', tex_file.parent.resolve()))
+    pdf_file = out_dir / f"{preview_tex.stem}.pdf"
+    if result.returncode != 0 or result.aborted or not pdf_file.exists():
+        if result.fatal_error:
+            message = f"Preview compilation aborted: {result.fatal_error.message}"
+        elif result.returncode != 0:
+            message = f"Preview compilation failed with return code {result.returncode}"
+        else:
+            message = f"Preview compilation did not write {pdf_file}"
+        error_log = out_dir / 'latex_compile_error.log'
+        result.write_error_log(error_log, header=message)
+        logger.error(f"{message}; see {error_log}")
+        return False
+    logger.info(f"Preview PDF ({result.duration:.1f}s, single pass, no BibTeX): {pdf_file}")
+    return True
+
+
+def main() -> int:
+    """Build a draft preview of the document."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='One-pass draft preview without images, TikZ or BibTeX')
+    parser.add_argument('main', nargs='?', default='main', help='Job name of the document (default: main)')
+    parser.add_argument('--out', default=str(DEFAULT_OUT_DIR), help='Preview build directory')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    tex_file = Path(f"{args.main}.tex")
+    if not tex_file.exists():
+        logger.error(f"{tex_file} not found")
+        return 1
+    return 0 if build_preview(tex_file, Path(args.out)) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Fuzz the conversion and validation regexes for super-linear matching time.
+
+Every regex literal in the conversion scripts is collected from their
+source (``re.*`` calls, pattern variables, the rule tables they loop over,
+and patterns built by concatenation over literal lists), together with its
+flags and source line. For each pattern the fuzzer builds adversarial
+inputs from the pattern's own alphabet: a short "pump" string repeated to
+size ``n`` plus a suffix that makes the match fail, drawn from single
+characters, Markdown fragments and random combinations.
+
+Each candidate input is screened at two sizes; the worst ones are timed
+over a doubling range of sizes (scanning every match, as ``re.sub`` does)
+and their growth exponent is fitted on a log-log scale. Patterns whose cost
+grows faster than ``n^--threshold``, or that overrun ``--sample-budget`` on
+a single input, are flagged.
+
+Usage:
+    python3 regex_fuzz.py [--max-size 16384] [--threshold 1.5] [--json build/regex_fuzz.json]
+
+Exits with status 1 if any pattern is flagged.
+"""
+import ast
+import json
+import logging
+import math
+import random
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from time_budget import BudgetExceeded, time_budget
+
+logger = logging.getLogger('md2latex.regex_fuzz')
+
+SCRIPTS = (
+    'auto_transcribe_md_to_tex.py',
+    'md2latex/converter.py',
+    'md2latex/sections.py',
+    'md2latex/validator.py',
+    'convert_gasing_arithmetic.py',
+    'image_pipeline.py',
+)
+
+DEFAULT_MIN_SIZE = 256
+DEFAULT_MAX_SIZE = 16384
+DEFAULT_THRESHOLD = 1.5
+DEFAULT_SAMPLE_BUDGET = 1.0
+DEFAULT_CANDIDATES = 48
+# Growth below this time at the largest size is noise, not a finding
+FLOOR_SECONDS = 1e-3
+# Candidates timed over the full size range per pattern
+WORST_CANDIDATES = 3
+
+# Flags argument position of each ``re`` function
+_FLAG_ARG = {'sub': 4, 'subn': 4, 'split': 3, 'match': 2, 'search': 2, 'fullmatch': 2,
+             'findall': 2, 'finditer': 2, 'compile': 1}
+
+# Markdown fragments the converters react to, tried as pumps for every pattern
+MARKDOWN_PUMPS = ('* ', '- ', '# ', '\\#', '\n', '\n\n', '**', '*a', '`', '[[', '(a^', 'a:', ' \n', '\n* a')
+SUFFIXES = ('', '\n', '\x00', '!')
+
+# Representative characters for escapes and classes
+_CLASS_CHARS = {'s': ' \t\n', 'S': 'a', 'w': 'a1_', 'W': ' !', 'd': '1', 'D': 'a', 'n': '\n', 't': '\t',
+                'b': '', 'B': '', 'A': '', 'Z': ''}
+
+
+# ---------------------------------------------------------------------------
+# Pattern extraction
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PatternSite:
+    """A regex literal and where it is used."""
+
+    pattern: str
+    flags: int
+    source: str
+    line: int
+    function: str
+    also: List[str] = field(default_factory=list)
+
+    @property
+    def location(self) -> str:
+        return f"{self.source}:{self.line}"
+
+
+Value = Tuple[str, int]  # (string, line)
+
+
+def _flags(node: Optional[ast.AST]) -> Optional[int]:
+    """Evaluate ``re.M | re.S``-style flag expressions (None if not static)."""
+    if node is None:
+        return 0
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 're':
+        value = getattr(re, node.attr, None)
+        return int(value) if isinstance(value, int) else None
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        left, right = _flags(node.left), _flags(node.right)
+        return None if left is None or right is None else left | right
+    return None
+
+
+def _strings(node: ast.AST, env: Dict[str, List[Value]], constants: Dict[str, str]) -> List[Value]:
+    """Every string ``node`` can evaluate to, given names bound to literals."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [(node.value, node.lineno)]
+    if isinstance(node, ast.Name):
+        if node.id in env:
+            return env[node.id]
+        return [(constants[node.id], node.lineno)] if node.id in constants else []
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        name = f"{node.value.id}.{node.attr}"
+        return [(constants[name], node.lineno)] if name in constants else []
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _strings(node.left, env, constants)
+        right = _strings(node.right, env, constants)
+        return [(a + b, line) for a, line in left for b, _ in right]
+    return []
+
+
+def _table(node: ast.AST) -> List[Value]:
+    """First elements of a list/tuple of tuples whose first element is a string literal."""
+    if not isinstance(node, (ast.List, ast.Tuple)):
+        return []
+    rows = [e.elts[0] for e in node.elts if isinstance(e, ast.Tuple) and e.elts]
+    values = [(r.value, r.lineno) for r in rows if isinstance(r, ast.Constant) and isinstance(r.value, str)]
+    return values if values and len(values) == len(node.elts) else []
+
+
+def _target_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _scopes(tree: ast.Module) -> Iterator[Tuple[str, List[ast.AST]]]:
+    """``(function name, nodes)`` per function, nested functions included; module code is ``<module>``."""
+    functions = [n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    inside = {id(n) for f in functions for n in ast.walk(f)}
+    yield '<module>', [n for n in ast.walk(tree) if id(n) not in inside]
+    for function in functions:
+        yield function.name, list(ast.walk(function))
+
+
+def _module_constants(tree: ast.Module, module: str) -> Dict[str, str]:
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = constants[f"{module}.{target.id}"] = node.value.value
+    return constants
+
+
+def extract_patterns(paths: Sequence[Path]) -> List[PatternSite]:
+    """
+    Collect the regex literals used with the ``re`` module in ``paths``.
+
+    Patterns are deduplicated by ``(pattern, flags)``; further uses are
+    listed in :attr:`PatternSite.also`. Rule-table patterns whose call site
+    flags cannot be resolved are fuzzed with ``re.MULTILINE``, the flag the
+    converters' rule loops apply.
+
+    Raises:
+        SyntaxError: If a script does not parse
+        OSError: If a script cannot be read
+    """
+    trees = {Path(p).name: ast.parse(Path(p).read_text(encoding='utf-8'), str(p)) for p in paths}
+    constants: Dict[str, str] = {}
+    for name, tree in trees.items():
+        constants.update({k: v for k, v in _module_constants(tree, Path(name).stem).items() if '.' in k})
+
+    sites: Dict[Tuple[str, int], PatternSite] = {}
+
+    def record(value: Value, flags: int, source: str, function: str) -> None:
+        pattern, line = value
+        key = (pattern, flags)
+        if key in sites:
+            location = f"{source}:{line}"
+            if location != sites[key].location and location not in sites[key].also:
+                sites[key].also.append(location)
+        else:
+            sites[key] = PatternSite(pattern, flags, source, line, function)
+
+    for source, tree in trees.items():
+        local = {**constants, **_module_constants(tree, Path(source).stem)}
+        # Rule tables anywhere in the module, by variable or attribute name
+        tables: Dict[str, List[Value]] = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign):
+                values = _table(node.value)
+                for target in node.targets:
+                    if values and _target_name(target):
+                        tables[_target_name(target)] = values
+        used_tables = set()
+
+        for function, nodes in _scopes(tree):
+            env: Dict[str, List[Value]] = {}
+            aliases: Dict[str, str] = {}
+            # Names derived from a table (``sorted_rules = sorted(... self.rules ...)``)
+            for node in nodes:
+                if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                    for sub in ast.walk(node.value):
+                        name = _target_name(sub) if isinstance(sub, (ast.Name, ast.Attribute)) else None
+                        if name in tables:
+                            aliases[node.targets[0].id] = name
+            for node in nodes:
+                if isinstance(node, ast.Assign):
+                    values = _strings(node.value, env, local)
+                    for target in node.targets:
+                        if isinstance(target, ast.Name) and values:
+                            env.setdefault(target.id, []).extend(values)
+                elif isinstance(node, ast.For):
+                    iterable = node.iter
+                    if isinstance(node.target, ast.Name) and isinstance(iterable, (ast.List, ast.Tuple)):
+                        words = [(e.value, e.lineno) for e in iterable.elts
+                                 if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+                        if words:
+                            env.setdefault(node.target.id, []).extend(words)
+                    elif isinstance(node.target, ast.Tuple) and isinstance(node.target.elts[0], ast.Name):
+                        name = _target_name(iterable)
+                        table = tables.get(aliases.get(name, name))
+                        if table:
+                            env.setdefault(node.target.elts[0].id, []).extend(table)
+                            used_tables.add(aliases.get(name, name))
+            # Concatenations over loop variables resolve once the loop is seen
+            for node in nodes:
+                if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                        and isinstance(node.func.value, ast.Name) and node.func.value.id == 're'
+                        and node.func.attr in _FLAG_ARG and node.args):
+                    continue
+                flag_node = next((k.value for k in node.keywords if k.arg == 'flags'), None)
+                position = _FLAG_ARG[node.func.attr]
+                if flag_node is None and len(node.args) > position:
+                    flag_node = node.args[position]
+                flags = _flags(flag_node)
+                for value in _strings(node.args[0], env, local):
+                    record(value, re.MULTILINE if flags is None else flags, source, function)
+
+        for name, table in tables.items():
+            if name not in used_tables:
+                for value in table:
+                    record(value, re.MULTILINE, source, name)
+
+    return list(sites.values())
+
+
+# ---------------------------------------------------------------------------
+# Inputs and timing
+# ---------------------------------------------------------------------------
+
+def alphabet(pattern: str) -> List[str]:
+    """Characters an input targeting ``pattern`` is built from (its literals, metacharacters and class members)."""
+    chars = set('a \n')
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            chars.update(_CLASS_CHARS.get(escaped, escaped))
+            i += 2
+            continue
+        chars.add(char)
+        i += 1
+    return sorted(chars)
+
+
+def candidates(pattern: str, count: int = DEFAULT_CANDIDATES, seed: int = 0) -> List[Tuple[str, str]]:
+    """``(pump, suffix)`` pairs: single characters, Markdown fragments and random strings of the alphabet."""
+    rng = random.Random(f"{seed}:{pattern}")
+    chars = alphabet(pattern)
+    out = {(c, '\x00') for c in chars}
+    out.update((p, s) for p in MARKDOWN_PUMPS for s in ('', '\x00'))
+    for _ in range(count):
+        pump = ''.join(rng.choice(chars) for _ in range(rng.randint(2, 4)))
+        out.add((pump, rng.choice(SUFFIXES)))
+    return sorted(out)
+
+
+def attack(pump: str, suffix: str, size: int) -> str:
+    """``pump`` repeated to about ``size`` characters, then ``suffix``."""
+    return pump * max(1, size // len(pump)) + suffix
+
+
+def scan_time(compiled: re.Pattern, text: str, repeats: int = 3, budget: float = DEFAULT_SAMPLE_BUDGET) -> float:
+    """
+    Best time to find every match in ``text`` (as ``re.sub`` scans).
+
+    Raises:
+        BudgetExceeded: If one scan takes longer than ``budget`` seconds
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with time_budget(budget, 'regex scan'):
+            for _ in compiled.finditer(text):
+                pass
+        best = min(best, time.perf_counter() - start)
+        if best > 0.1:
+            break
+    return best
+
+
+def growth_exponent(sizes: Sequence[int], times: Sequence[float]) -> float:
+    """Least-squares slope of ``log(time)`` against ``log(size)``."""
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var if var else 0.0
+
+
+@dataclass
+class PatternResult:
+    """Worst growth found for one pattern."""
+
+    site: PatternSite
+    pump: str = ''
+    suffix: str = ''
+    sizes: List[int] = field(default_factory=list)
+    times: List[float] = field(default_factory=list)
+    exponent: float = 0.0
+    timed_out: bool = False
+    error: Optional[str] = None
+
+    def flagged(self, threshold: float) -> bool:
+        return self.timed_out or (self.exponent > threshold and bool(self.times) and self.times[-1] >= FLOOR_SECONDS)
+
+
+def _curve(compiled: re.Pattern, pump: str, suffix: str, sizes: Sequence[int],
+           budget: float) -> Tuple[List[int], List[float], bool]:
+    done_sizes, times = [], []
+    for size in sizes:
+        try:
+            times.append(scan_time(compiled, attack(pump, suffix, size), budget=budget))
+        except BudgetExceeded:
+            return done_sizes, times, True
+        done_sizes.append(size)
+    return done_sizes, times, False
+
+
+def fuzz_pattern(site: PatternSite, min_size: int = DEFAULT_MIN_SIZE, max_size: int = DEFAULT_MAX_SIZE,
+                 count: int = DEFAULT_CANDIDATES, budget: float = DEFAULT_SAMPLE_BUDGET,
+                 seed: int = 0) -> PatternResult:
+    """
+    Find the input family on which ``site``'s pattern scales worst.
+
+    Every candidate is timed at ``min_size`` and ``4 * min_size``; the
+    :data:`WORST_CANDIDATES` with the steepest growth (and the slowest one)
+    are timed at every doubling up to ``max_size``.
+    """
+    result = PatternResult(site)
+    try:
+        compiled = re.compile(site.pattern, site.flags)
+    except re.error as e:
+        result.error = f"does not compile: {e}"
+        return result
+
+    screened = []
+    for pump, suffix in candidates(site.pattern, count, seed):
+        sizes, times, timed_out = _curve(compiled, pump, suffix, (min_size, 4 * min_size), budget)
+        if timed_out:
+            result.pump, result.suffix, result.sizes, result.times = pump, suffix, sizes, times
+            result.exponent, result.timed_out = float('inf'), True
+            return result
+        screened.append((growth_exponent(sizes, times), times[-1], pump, suffix))
+    worst = sorted(screened, reverse=True)[:WORST_CANDIDATES]
+    slowest = max(screened, key=lambda s: s[1])
+    if slowest not in worst:
+        worst.append(slowest)
+
+    full_sizes = []
+    size = min_size
+    while size <= max_size:
+        full_sizes.append(size)
+        size *= 2
+    for _, _, pump, suffix in worst:
+        sizes, times, timed_out = _curve(compiled, pump, suffix, full_sizes, budget)
+        # Growth up to the overrun; a candidate overrunning at once has no finite estimate
+        exponent = growth_exponent(sizes, times) if len(sizes) > 1 else float('inf')
+        if timed_out or exponent > result.exponent or not result.times:
+            result.pump, result.suffix, result.sizes, result.times = pump, suffix, sizes, times
+            result.exponent, result.timed_out = exponent, timed_out
+        if timed_out:
+            break
+    return result
+
+
+def _short(text: str, width: int) -> str:
+    text = repr(text)[1:-1]
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def print_results(results: Sequence[PatternResult], threshold: float) -> None:
+    """Table of patterns by growth exponent, flagged ones marked."""
+    print(f"{'exponent':>8} {'time':>10} {'size':>6}  {'verdict':<11} {'location':<40} {'input':<16} pattern")
+    for r in sorted(results, key=lambda r: (r.timed_out, r.exponent), reverse=True):
+        if r.error:
+            print(f"{'-':>8} {'-':>10} {'-':>6}  {'ERROR':<11} {r.site.location:<40} {'':<16} {r.error}")
+            continue
+        verdict = 'TIMEOUT' if r.timed_out else 'SUPERLINEAR' if r.flagged(threshold) else 'ok'
+        size = r.sizes[-1] if r.sizes else 0
+        elapsed = f"{r.times[-1] * 1e3:.3f}ms" if r.times else '-'
+        exponent = f"{r.exponent:.2f}"
+        print(f"{exponent:>8} {elapsed:>10} {size:>6}  {verdict:<11} {r.site.location:<40} "
+              f"{_short(r.pump + '|' + r.suffix, 16):<16} {_short(r.site.pattern, 60)}")
+
+
+def main() -> int:
+    """Extract every pattern, fuzz it and report the growth of the worst inputs."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fuzz the conversion regexes for super-linear matching time')
+    parser.add_argument('scripts', nargs='*', default=list(SCRIPTS), help='Python sources to scan for patterns')
+    parser.add_argument('--min-size', type=int, default=DEFAULT_MIN_SIZE, help='Smallest input size (characters)')
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE, help='Largest input size (characters)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Flag patterns whose time grows faster than size^threshold')
+    parser.add_argument('--sample-budget', type=float, default=DEFAULT_SAMPLE_BUDGET,
+                        help='Flag a pattern when one input takes longer than this (seconds)')
+    parser.add_argument('--candidates', type=int, default=DEFAULT_CANDIDATES, help='Random inputs per pattern')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--match', help='Only fuzz patterns containing this substring')
+    parser.add_argument('--json', help='Write the results as JSON to this file')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log each pattern as it is fuzzed')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(levelname)s: %(message)s')
+    try:
+        sites = extract_patterns([Path(s) for s in args.scripts])
+    except (OSError, SyntaxError) as e:
+        logger.error(f"Cannot read patterns: {e}")
+        return 2
+    if args.match:
+        sites = [s for s in sites if args.match in s.pattern]
+    print(f"Fuzzing {len(sites)} patterns from {len(args.scripts)} scripts")
+
+    results = []
+    for site in sites:
+        logger.info(f"{site.location}: {site.pattern}")
+        results.append(fuzz_pattern(site, args.min_size, args.max_size, args.candidates, args.sample_budget,
+                                    args.seed))
+    print_results(results, args.threshold)
+
+    flagged = [r for r in results if r.flagged(args.threshold)]
+    print(f"\n{len(flagged)} of {len(results)} patterns grow faster than n^{args.threshold:g}"
+          + (f" or exceed {args.sample_budget:g}s on one input" if any(r.timed_out for r in flagged) else ''))
+    if args.json:
+        data = [{**asdict(r), 'flagged': r.flagged(args.threshold)} for r in results]
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(data, indent=2) + '\n', encoding='utf-8')
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Chunked and block-level conversion of sections.
+
+Sections are the unit of caching and parallelism in the build, which does
+not help when one section (a generated appendix, say) is most of the
+document, or when a one-word edit reconverts a long section. :func:`split_chunks`
+cuts a section's Markdown at block boundaries where converting the pieces
+separately and concatenating the LaTeX gives exactly the whole-section
+output, and :func:`convert_chunks` converts the pieces in parallel worker
+processes, caching each by content hash. :func:`split_blocks` cuts at every
+such boundary, so sections of ordinary size are cached paragraph by
+paragraph and an edit reconverts only the blocks it touched.
+
+A boundary is a run of blank lines that is
+
+* outside fenced code blocks, with an even number of ``$`` before it (the
+  converters pair ``$...$`` across the whole section);
+* outside inline code, ``[[...]]``, image link and ``<mcfile>`` spans, which
+  may contain blank lines;
+* followed by a line starting with a letter or digit, so no header, bullet
+  or stray-``#`` pattern can start in the blank lines and reach past it;
+* preceded by a line with more than ``#``, ``*``, ``\\``, ``}`` and spaces,
+  so no header-cleanup pattern runs on into the next block;
+* not after a ``*`` bullet in the same stretch of text between code fences:
+  a star bullet absorbs every following paragraph up to the next bullet as
+  its indented continuation, so the whole group stays in one chunk.
+
+Cuts are content-defined (a block ends a chunk when its hash says so, within
+size limits), so editing one paragraph leaves the other chunks' cache keys
+unchanged.
+"""
+import logging
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from time_budget import time_budget
+
+logger = logging.getLogger('md2latex.chunks')
+
+# Sections shorter than this are converted whole
+CHUNK_MIN_SECTION = 1 << 17
+# Chunks are cut at boundaries between CHUNK_TARGET / 2 and 2 * CHUNK_TARGET characters
+CHUNK_TARGET = 1 << 15
+# One block in (mask + 1) ends a chunk once the minimum size is reached
+_CUT_MASK = 3
+
+FENCE_PATTERN = r'```(?:([a-zA-Z]*))?\s*\n([\s\S]*?)```'
+_BLANK_RUN = re.compile(r'\n(?:[ \t]*\n)+')
+_SPAN_PATTERNS = [re.compile(p) for p in (
+    r'`([^`]+)`',
+    r'\[\[([^\]]+)\]\]',
+    r'!\s*\[([^\]]*)\]\s*\(\s*([^)\s]+)\s*\)',
+    r'<mcfile\s+name="([^"]+)"\s+path="([^"]+)"></mcfile>',
+)]
+_STAR_BULLET = re.compile(r'^[ \t]*\*[ \t\n]', re.MULTILINE)
+_BARE_LINE = re.compile(r'[\s\\#*}]*')
+_PLAIN_START = re.compile(r'[A-Za-z0-9]')
+
+
+def _spans(text: str, pattern: re.Pattern, offset: int = 0) -> List[Tuple[int, int]]:
+    return [(offset + m.start(), offset + m.end()) for m in pattern.finditer(text)]
+
+
+def safe_boundaries(md: str, fence_pattern: str = FENCE_PATTERN) -> List[int]:
+    """Offsets where ``md`` can be cut without changing the converted LaTeX (see the module docstring)."""
+    fences = _spans(md, re.compile(fence_pattern))
+    # Stretches of text between fences, with their inline spans and first star bullet
+    texts, start = [], 0
+    for fence_start, fence_end in fences + [(len(md), len(md))]:
+        segment = md[start:fence_start]
+        spans = [s for p in _SPAN_PATTERNS for s in _spans(segment, p, start)]
+        bullet = _STAR_BULLET.search(segment)
+        texts.append((start, fence_start, spans, start + bullet.start() if bullet else fence_start))
+        start = fence_end
+
+    dollars = 0
+    counted = 0
+    boundaries = []
+    for start, end, spans, first_bullet in texts:
+        for run in _BLANK_RUN.finditer(md, start, end):
+            cut = run.end()
+            if cut >= end or cut > first_bullet or not _PLAIN_START.match(md, cut):
+                continue
+            line_start = md.rfind('\n', 0, run.start()) + 1
+            if _BARE_LINE.fullmatch(md, line_start, run.start()):
+                continue
+            if any(s < cut < e for s, e in spans):
+                continue
+            dollars += md.count('$', counted, cut)
+            counted = cut
+            if dollars % 2 == 0:
+                boundaries.append(cut)
+    return boundaries
+
+
+def split_chunks(md: str, target: int = CHUNK_TARGET, fence_pattern: str = FENCE_PATTERN) -> List[str]:
+    """
+    Cut ``md`` into chunks whose conversions concatenate to the whole conversion.
+
+    Args:
+        md: Section Markdown
+        target: Typical chunk size in characters
+        fence_pattern: The converter's fenced-code regex
+
+    Returns:
+        Chunks in order (``[md]`` if there is no safe boundary)
+    """
+    chunks, start, previous = [], 0, 0
+    for cut in safe_boundaries(md, fence_pattern):
+        size = cut - start
+        block_hash = zlib.crc32(md[previous:cut].encode('utf-8'))
+        previous = cut
+        if size >= 2 * target or (size >= target // 2 and block_hash & _CUT_MASK == 0):
+            chunks.append(md[start:cut])
+            start = cut
+    chunks.append(md[start:])
+    return chunks
+
+
+def split_blocks(md: str, fence_pattern: str = FENCE_PATTERN) -> List[str]:
+    """
+    Cut ``md`` at every safe boundary: paragraphs, lists and code blocks.
+
+    Args:
+        md: Section Markdown
+        fence_pattern: The converter's fenced-code regex
+
+    Returns:
+        Blocks in order, concatenating to ``md`` (``[md]`` if there is no safe boundary)
+    """
+    cuts = safe_boundaries(md, fence_pattern)
+    return [md[start:end] for start, end in zip([0] + cuts, cuts + [len(md)])]
+
+
+def _run_chunk(convert: Callable[[str], str], chunk: str, budget: float, what: str) -> str:
+    with time_budget(budget, what):
+        return convert(chunk)
+
+
+def convert_chunks(chunks: Sequence[str], convert: Callable[[str], str], cache_key: Callable[[str], str],
+                   budget: float = 0, what: str = 'section', jobs: Optional[int] = None) -> str:
+    """
+    Convert chunks in parallel processes, reusing cached chunk conversions.
+
+    Args:
+        chunks: Output of :func:`split_chunks`
+        convert: Picklable (module-level) Markdown-to-LaTeX function
+        cache_key: Artifact cache key for one chunk
+        budget: Time budget per chunk in seconds (0: none), enforced in the worker
+        what: Description of the section for budget errors
+        jobs: Worker processes (default: one per CPU, at most one per chunk);
+            1 converts in this process, so ``convert`` need not be picklable
+
+    Raises:
+        BudgetExceeded: If a chunk overruns ``budget``
+
+    Returns:
+        The concatenated LaTeX
+    """
+    from artifact_cache import default_cache
+
+    cache = default_cache()
+    keys = [cache_key(chunk) for chunk in chunks]
+    outputs = [cache.get_text(key) for key in keys]
+    missing = [i for i, out in enumerate(outputs) if out is None]
+    logger.debug(f"{what}: {len(chunks)} chunks, {len(chunks) - len(missing)} cached")
+    if len(missing) == 1 or jobs == 1:
+        for i in missing:
+            outputs[i] = _run_chunk(convert, chunks[i], budget, what)
+    elif missing:
+        workers = min(len(missing), jobs or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {i: pool.submit(_run_chunk, convert, chunks[i], budget,
+                                      f"{what} (chunk {i + 1}/{len(chunks)})")
+                       for i in missing}
+            for i, future in futures.items():
+                outputs[i] = future.result()
+    for i in missing:
+        cache.put_text(keys[i], outputs[i])
+    return ''.join(outputs)
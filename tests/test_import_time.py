@@ -0,0 +1,24 @@
+"""Importing md2latex stays within its time budget and defers the heavy modules."""
+import pytest
+
+from md2latex.importtime import DEFAULT_BUDGET_MS, deferred_imports, profile_import
+
+
+@pytest.fixture(scope='module')
+def import_profile():
+    return profile_import()
+
+
+def test_import_within_budget(import_profile):
+    profile, _ = import_profile
+    assert profile.total_ms <= DEFAULT_BUDGET_MS, f"import took {profile.total_ms:.1f} ms"
+
+
+def test_deferred_modules_not_imported(import_profile):
+    profile, _ = import_profile
+    assert deferred_imports(profile) == []
+
+
+def test_import_has_no_side_effects(import_profile):
+    _, leftovers = import_profile
+    assert leftovers == []
@@ -0,0 +1,104 @@
+"""
+Wall-clock budgets for conversion steps.
+
+A single pathological paragraph can make one of the converters' regexes
+backtrack for minutes. :func:`time_budget` bounds a block of work: on POSIX
+systems in the main thread it arms ``SIGALRM``, which interrupts even a
+running regex match, and raises :class:`BudgetExceeded` naming the source
+line that was executing. Elsewhere (Windows, worker threads) the block
+cannot be interrupted, so the overrun is reported when it finishes; callers
+running conversions off the main thread (``build_dag.py``) hand them to a
+process of their own.
+
+The converters apply :func:`section_budget` (``MD2LATEX_SECTION_BUDGET``
+seconds, 0 to disable) to every section they convert.
+"""
+import contextlib
+import os
+import re
+import signal
+import threading
+import time
+from typing import Iterator, Optional
+
+ENV_SECTION_BUDGET = 'MD2LATEX_SECTION_BUDGET'
+DEFAULT_SECTION_BUDGET = 30.0
+
+_RE_DIR = os.path.dirname(re.__file__)
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised when a budgeted block runs longer than allowed."""
+
+    def __init__(self, what: str, seconds: float, location: Optional[str] = None):
+        self.what = what
+        self.seconds = seconds
+        self.location = location
+        message = f"{what} exceeded its {seconds:g}s time budget"
+        if location:
+            message += f" (interrupted in {location})"
+        super().__init__(message)
+
+    def __reduce__(self):
+        # Rebuild from the fields when raised in a worker process
+        return type(self), (self.what, self.seconds, self.location)
+
+
+def section_budget() -> float:
+    """Per-section budget in seconds from ``MD2LATEX_SECTION_BUDGET`` (0 disables)."""
+    value = os.environ.get(ENV_SECTION_BUDGET, '')
+    try:
+        return float(value) if value else DEFAULT_SECTION_BUDGET
+    except ValueError:
+        return DEFAULT_SECTION_BUDGET
+
+
+def _location(frame) -> Optional[str]:
+    """``file:line (function)`` of the innermost frame outside the ``re`` module."""
+    while frame is not None and os.path.dirname(frame.f_code.co_filename) == _RE_DIR:
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+
+def _can_interrupt() -> bool:
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+@contextlib.contextmanager
+def time_budget(seconds: float, what: str = 'operation') -> Iterator[None]:
+    """
+    Run the block under a wall-clock budget.
+
+    Args:
+        seconds: Allowed time; 0 or less disables the budget
+        what: Description used in the error message
+
+    Raises:
+        BudgetExceeded: If the block runs longer than ``seconds``
+    """
+    if seconds <= 0:
+        yield
+        return
+    if not _can_interrupt():
+        start = time.perf_counter()
+        yield
+        if time.perf_counter() - start > seconds:
+            raise BudgetExceeded(what, seconds)
+        return
+
+    def expire(signum, frame):
+        raise BudgetExceeded(what, seconds, _location(frame))
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    outer = signal.setitimer(signal.ITIMER_REAL, seconds)[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        # Re-arm an enclosing budget with whatever it has left
+        if outer:
+            signal.setitimer(signal.ITIMER_REAL, max(outer - (time.perf_counter() - start), 1e-3))